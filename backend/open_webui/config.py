@@ -2,6 +2,8 @@ import json
 import logging
 import os
 import shutil
+import threading
+import time
 import base64
 import redis
 
@@ -224,8 +226,12 @@ class PersistentConfig(Generic[T]):
 class AppConfig:
     _redis: Union[redis.Redis, redis.cluster.RedisCluster] = None
     _redis_key_prefix: str
+    _redis_pubsub_thread = None
 
     _state: dict[str, PersistentConfig]
+    # Keys whose in-memory value is known to match Redis
+    _synced: set[str]
+    _sync_locks: dict[str, threading.Lock]
 
     def __init__(
         self,
@@ -234,6 +240,10 @@ class AppConfig:
         redis_cluster: Optional[bool] = False,
         redis_key_prefix: str = "open-webui",
     ):
+        super().__setattr__("_state", {})
+        super().__setattr__("_synced", set())
+        super().__setattr__("_sync_locks", {})
+
         if redis_url:
             super().__setattr__("_redis_key_prefix", redis_key_prefix)
             super().__setattr__(
@@ -245,8 +255,58 @@ class AppConfig:
                     decode_responses=True,
                 ),
             )
+            self._subscribe()
 
-        super().__setattr__("_state", {})
+    def _subscribe(self):
+        # Values are served from memory, instances announce changes on this channel
+        try:
+            pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(
+                **{f"{self._redis_key_prefix}:config:updates": self._on_update}
+            )
+            super().__setattr__(
+                "_redis_pubsub_thread",
+                pubsub.run_in_thread(
+                    sleep_time=1, daemon=True, exception_handler=self._on_error
+                ),
+            )
+        except Exception as e:
+            log.warning(
+                f"Config change notifications are unavailable, reading from Redis on every access: {e}"
+            )
+
+    def _on_update(self, message):
+        key = message.get("data")
+        if key in self._state:
+            self._synced.discard(key)
+            self._sync(key)
+
+    def _on_error(self, e, pubsub, thread):
+        # Changes published while disconnected are lost, read every key again
+        log.warning(f"Config change notifications interrupted: {e}")
+        self._synced.clear()
+        time.sleep(1)
+
+    def _sync(self, key):
+        # Reads of a key are serialized so an older value read by a request can't
+        # overwrite a newer one applied by the notification thread in the meantime
+        with self._sync_locks.setdefault(key, threading.Lock()):
+            redis_key = f"{self._redis_key_prefix}:config:{key}"
+            redis_value = self._redis.get(redis_key)
+
+            if redis_value is not None:
+                try:
+                    decoded_value = json.loads(redis_value)
+
+                    # Update the in-memory value if different
+                    if self._state[key].value != decoded_value:
+                        self._state[key].value = decoded_value
+                        log.info(f"Updated {key} from Redis: {decoded_value}")
+
+                except json.JSONDecodeError:
+                    log.error(f"Invalid JSON format in Redis for {key}: {redis_value}")
+
+            self._synced.add(key)
 
     def __setattr__(self, key, value):
         if isinstance(value, PersistentConfig):
@@ -258,27 +318,18 @@ class AppConfig:
             if self._redis:
                 redis_key = f"{self._redis_key_prefix}:config:{key}"
                 self._redis.set(redis_key, json.dumps(self._state[key].value))
+                self._redis.publish(f"{self._redis_key_prefix}:config:updates", key)
 
     def __getattr__(self, key):
         if key not in self._state:
             raise AttributeError(f"Config key '{key}' not found")
 
-        # If Redis is available, check for an updated value
-        if self._redis:
-            redis_key = f"{self._redis_key_prefix}:config:{key}"
-            redis_value = self._redis.get(redis_key)
-
-            if redis_value is not None:
-                try:
-                    decoded_value = json.loads(redis_value)
-
-                    # Update the in-memory value if different
-                    if self._state[key].value != decoded_value:
-                        self._state[key].value = decoded_value
-                        log.info(f"Updated {key} from Redis: {decoded_value}")
-
-                except json.JSONDecodeError:
-                    log.error(f"Invalid JSON format in Redis for {key}: {redis_value}")
+        # If Redis is available, check for an updated value unless the cached one
+        # is kept current by change notifications
+        if self._redis and (
+            self._redis_pubsub_thread is None or key not in self._synced
+        ):
+            self._sync(key)
 
         return self._state[key].value
 
@@ -348,6 +348,22 @@ DATABASE_ENABLE_SQLITE_WAL = (
     os.environ.get("DATABASE_ENABLE_SQLITE_WAL", "False").lower() == "true"
 )
 
+# Compression of large JSON columns (file, knowledge and channel message data),
+# either "zlib" or "zstd", disabled when empty
+DATABASE_JSON_COMPRESSION = os.environ.get("DATABASE_JSON_COMPRESSION", "").lower()
+if DATABASE_JSON_COMPRESSION not in ("zlib", "zstd"):
+    DATABASE_JSON_COMPRESSION = ""
+
+# Serialized size in bytes below which JSON values are stored uncompressed
+DATABASE_JSON_COMPRESSION_MIN_SIZE = os.environ.get(
+    "DATABASE_JSON_COMPRESSION_MIN_SIZE", 4096
+)
+
+try:
+    DATABASE_JSON_COMPRESSION_MIN_SIZE = int(DATABASE_JSON_COMPRESSION_MIN_SIZE)
+except Exception:
+    DATABASE_JSON_COMPRESSION_MIN_SIZE = 4096
+
 DATABASE_USER_ACTIVE_STATUS_UPDATE_INTERVAL = os.environ.get(
     "DATABASE_USER_ACTIVE_STATUS_UPDATE_INTERVAL", None
 )
@@ -359,6 +375,51 @@ if DATABASE_USER_ACTIVE_STATUS_UPDATE_INTERVAL is not None:
     except Exception:
         DATABASE_USER_ACTIVE_STATUS_UPDATE_INTERVAL = 0.0
 
+# Last active timestamps are collected in memory and written in one batch per interval
+DATABASE_USER_ACTIVE_STATUS_FLUSH_INTERVAL = os.environ.get(
+    "DATABASE_USER_ACTIVE_STATUS_FLUSH_INTERVAL", 10
+)
+
+try:
+    DATABASE_USER_ACTIVE_STATUS_FLUSH_INTERVAL = float(
+        DATABASE_USER_ACTIVE_STATUS_FLUSH_INTERVAL
+    )
+except Exception:
+    DATABASE_USER_ACTIVE_STATUS_FLUSH_INTERVAL = 10.0
+
+# Authenticated users are cached per instance for this many seconds, 0 disables it
+AUTH_USER_CACHE_TTL = os.environ.get("AUTH_USER_CACHE_TTL", 10)
+
+try:
+    AUTH_USER_CACHE_TTL = float(AUTH_USER_CACHE_TTL)
+except Exception:
+    AUTH_USER_CACHE_TTL = 10.0
+
+AUTH_USER_CACHE_SIZE = os.environ.get("AUTH_USER_CACHE_SIZE", 10000)
+
+try:
+    AUTH_USER_CACHE_SIZE = int(AUTH_USER_CACHE_SIZE)
+except Exception:
+    AUTH_USER_CACHE_SIZE = 10000
+
+# Group ids and permissions of users are cached per instance for this many seconds,
+# group and membership changes evict them on every instance, 0 disables it
+AUTH_PERMISSIONS_CACHE_TTL = os.environ.get("AUTH_PERMISSIONS_CACHE_TTL", 60)
+
+try:
+    AUTH_PERMISSIONS_CACHE_TTL = float(AUTH_PERMISSIONS_CACHE_TTL)
+except Exception:
+    AUTH_PERMISSIONS_CACHE_TTL = 60.0
+
+# The model registry built from base models, models and functions is rebuilt when
+# they change, and at least once per this many seconds, 0 rebuilds it every time
+MODEL_REGISTRY_CACHE_TTL = os.environ.get("MODEL_REGISTRY_CACHE_TTL", 3600)
+
+try:
+    MODEL_REGISTRY_CACHE_TTL = float(MODEL_REGISTRY_CACHE_TTL)
+except Exception:
+    MODEL_REGISTRY_CACHE_TTL = 3600.0
+
 RESET_CONFIG_ON_START = (
     os.environ.get("RESET_CONFIG_ON_START", "False").lower() == "true"
 )
@@ -367,8 +428,30 @@ ENABLE_REALTIME_CHAT_SAVE = (
     os.environ.get("ENABLE_REALTIME_CHAT_SAVE", "False").lower() == "true"
 )
 
+# Realtime saves are buffered per message and written at most once per interval,
+# or earlier when the content grew by more than the given number of characters
+REALTIME_CHAT_SAVE_INTERVAL = os.environ.get("REALTIME_CHAT_SAVE_INTERVAL", "1")
+
+try:
+    REALTIME_CHAT_SAVE_INTERVAL = float(REALTIME_CHAT_SAVE_INTERVAL)
+except Exception:
+    REALTIME_CHAT_SAVE_INTERVAL = 1.0
+
+REALTIME_CHAT_SAVE_MAX_SIZE = os.environ.get("REALTIME_CHAT_SAVE_MAX_SIZE", "8192")
+
+try:
+    REALTIME_CHAT_SAVE_MAX_SIZE = int(REALTIME_CHAT_SAVE_MAX_SIZE)
+except Exception:
+    REALTIME_CHAT_SAVE_MAX_SIZE = 8192
+
 ENABLE_QUERIES_CACHE = os.environ.get("ENABLE_QUERIES_CACHE", "False").lower() == "true"
 
+# Store single message updates in the chat_message table instead of rewriting the
+# chat document, which picks them up again on the next full save of the chat
+ENABLE_CHAT_MESSAGE_TABLE = (
+    os.environ.get("ENABLE_CHAT_MESSAGE_TABLE", "False").lower() == "true"
+)
+
 ####################################
 # REDIS
 ####################################
@@ -536,6 +619,85 @@ else:
     except Exception:
         MODELS_CACHE_TTL = 1
 
+# Model lists of connections are refreshed in the background once they are older
+# than this many seconds, the previous list is served meanwhile. 0 fetches them on
+# every request
+MODELS_REFRESH_INTERVAL = os.environ.get("MODELS_REFRESH_INTERVAL", "60")
+
+try:
+    MODELS_REFRESH_INTERVAL = float(MODELS_REFRESH_INTERVAL)
+except Exception:
+    MODELS_REFRESH_INTERVAL = 60.0
+
+# Upper bound of the delay between retries of a failing connection
+MODELS_REFRESH_MAX_BACKOFF = os.environ.get("MODELS_REFRESH_MAX_BACKOFF", "600")
+
+try:
+    MODELS_REFRESH_MAX_BACKOFF = float(MODELS_REFRESH_MAX_BACKOFF)
+except Exception:
+    MODELS_REFRESH_MAX_BACKOFF = 600.0
+
+# How requests for a model served by several connections are distributed:
+# least_outstanding, round_robin (weighted), latency (EWMA) or random
+MODELS_ROUTING_STRATEGY = os.environ.get(
+    "MODELS_ROUTING_STRATEGY", "least_outstanding"
+).lower()
+
+if MODELS_ROUTING_STRATEGY not in (
+    "least_outstanding",
+    "round_robin",
+    "latency",
+    "random",
+):
+    MODELS_ROUTING_STRATEGY = "least_outstanding"
+
+# Consecutive failed requests after which a connection is taken out of rotation
+MODELS_ROUTING_FAILURE_THRESHOLD = os.environ.get(
+    "MODELS_ROUTING_FAILURE_THRESHOLD", "3"
+)
+
+try:
+    MODELS_ROUTING_FAILURE_THRESHOLD = int(MODELS_ROUTING_FAILURE_THRESHOLD)
+except Exception:
+    MODELS_ROUTING_FAILURE_THRESHOLD = 3
+
+# Seconds a failing connection stays out of rotation before it is tried again
+MODELS_ROUTING_COOLDOWN = os.environ.get("MODELS_ROUTING_COOLDOWN", "30")
+
+try:
+    MODELS_ROUTING_COOLDOWN = float(MODELS_ROUTING_COOLDOWN)
+except Exception:
+    MODELS_ROUTING_COOLDOWN = 30.0
+
+# Seconds a model is assumed to stay loaded on an Ollama connection after a request
+# was routed to it, until the loaded models of the connection are refreshed
+MODELS_RESIDENCY_TTL = os.environ.get("MODELS_RESIDENCY_TTL", "300")
+
+try:
+    MODELS_RESIDENCY_TTL = float(MODELS_RESIDENCY_TTL)
+except Exception:
+    MODELS_RESIDENCY_TTL = 300.0
+
+# Requests in flight to each connection having a model loaded above which requests
+# for the model go to a connection without it instead, 0 to always prefer them
+MODELS_RESIDENCY_MAX_OUTSTANDING = os.environ.get(
+    "MODELS_RESIDENCY_MAX_OUTSTANDING", "4"
+)
+
+try:
+    MODELS_RESIDENCY_MAX_OUTSTANDING = int(MODELS_RESIDENCY_MAX_OUTSTANDING)
+except Exception:
+    MODELS_RESIDENCY_MAX_OUTSTANDING = 4
+
+# Requests in flight to the Ollama connections having a model loaded from which the
+# model is loaded on another connection as well, 0 to never pre-warm models
+OLLAMA_PREWARM_THRESHOLD = os.environ.get("OLLAMA_PREWARM_THRESHOLD", "0")
+
+try:
+    OLLAMA_PREWARM_THRESHOLD = int(OLLAMA_PREWARM_THRESHOLD)
+except Exception:
+    OLLAMA_PREWARM_THRESHOLD = 0
+
 
 ####################################
 # CHAT
@@ -568,6 +730,86 @@ else:
     except Exception:
         CHAT_RESPONSE_MAX_TOOL_CALL_RETRIES = 30
 
+# Chat completions generated at the same time, overall, per model and per user,
+# 0 for no limit. Requests over a limit wait in a queue shared by all instances
+# when Redis is configured, users with fewer requests in the queue go first
+CHAT_COMPLETION_MAX_CONCURRENCY = os.environ.get("CHAT_COMPLETION_MAX_CONCURRENCY", "0")
+
+try:
+    CHAT_COMPLETION_MAX_CONCURRENCY = int(CHAT_COMPLETION_MAX_CONCURRENCY)
+except Exception:
+    CHAT_COMPLETION_MAX_CONCURRENCY = 0
+
+CHAT_COMPLETION_MAX_CONCURRENCY_PER_MODEL = os.environ.get(
+    "CHAT_COMPLETION_MAX_CONCURRENCY_PER_MODEL", "0"
+)
+
+try:
+    CHAT_COMPLETION_MAX_CONCURRENCY_PER_MODEL = int(
+        CHAT_COMPLETION_MAX_CONCURRENCY_PER_MODEL
+    )
+except Exception:
+    CHAT_COMPLETION_MAX_CONCURRENCY_PER_MODEL = 0
+
+CHAT_COMPLETION_MAX_CONCURRENCY_PER_USER = os.environ.get(
+    "CHAT_COMPLETION_MAX_CONCURRENCY_PER_USER", "0"
+)
+
+try:
+    CHAT_COMPLETION_MAX_CONCURRENCY_PER_USER = int(
+        CHAT_COMPLETION_MAX_CONCURRENCY_PER_USER
+    )
+except Exception:
+    CHAT_COMPLETION_MAX_CONCURRENCY_PER_USER = 0
+
+# Seconds a chat completion waits in the queue before it is rejected with a 429
+CHAT_COMPLETION_QUEUE_TIMEOUT = os.environ.get("CHAT_COMPLETION_QUEUE_TIMEOUT", "60")
+
+try:
+    CHAT_COMPLETION_QUEUE_TIMEOUT = float(CHAT_COMPLETION_QUEUE_TIMEOUT)
+except Exception:
+    CHAT_COMPLETION_QUEUE_TIMEOUT = 60.0
+
+# Chat completions waiting in the queue at most, 0 for no limit
+CHAT_COMPLETION_MAX_QUEUE_SIZE = os.environ.get("CHAT_COMPLETION_MAX_QUEUE_SIZE", "0")
+
+try:
+    CHAT_COMPLETION_MAX_QUEUE_SIZE = int(CHAT_COMPLETION_MAX_QUEUE_SIZE)
+except Exception:
+    CHAT_COMPLETION_MAX_QUEUE_SIZE = 0
+
+# Generations of background tasks (titles, tags, follow-ups, autocompletion, emojis)
+# run in a lower priority lane: they wait while chat completions are queued, or
+# while at least TASK_GENERATION_DEFER_THRESHOLD of them run on the instance, and
+# are dropped after TASK_GENERATION_QUEUE_TIMEOUT seconds. 0 for no limit.
+TASK_GENERATION_MAX_CONCURRENCY = os.environ.get("TASK_GENERATION_MAX_CONCURRENCY", "0")
+
+try:
+    TASK_GENERATION_MAX_CONCURRENCY = int(TASK_GENERATION_MAX_CONCURRENCY)
+except Exception:
+    TASK_GENERATION_MAX_CONCURRENCY = 0
+
+TASK_GENERATION_DEFER_THRESHOLD = os.environ.get("TASK_GENERATION_DEFER_THRESHOLD", "0")
+
+try:
+    TASK_GENERATION_DEFER_THRESHOLD = int(TASK_GENERATION_DEFER_THRESHOLD)
+except Exception:
+    TASK_GENERATION_DEFER_THRESHOLD = 0
+
+TASK_GENERATION_QUEUE_TIMEOUT = os.environ.get("TASK_GENERATION_QUEUE_TIMEOUT", "30")
+
+try:
+    TASK_GENERATION_QUEUE_TIMEOUT = float(TASK_GENERATION_QUEUE_TIMEOUT)
+except Exception:
+    TASK_GENERATION_QUEUE_TIMEOUT = 30.0
+
+TASK_GENERATION_MAX_QUEUE_SIZE = os.environ.get("TASK_GENERATION_MAX_QUEUE_SIZE", "0")
+
+try:
+    TASK_GENERATION_MAX_QUEUE_SIZE = int(TASK_GENERATION_MAX_QUEUE_SIZE)
+except Exception:
+    TASK_GENERATION_MAX_QUEUE_SIZE = 0
+
 
 ####################################
 # WEBSOCKET SUPPORT
@@ -644,6 +886,32 @@ AIOHTTP_CLIENT_SESSION_TOOL_SERVER_SSL = (
     os.environ.get("AIOHTTP_CLIENT_SESSION_TOOL_SERVER_SSL", "True").lower() == "true"
 )
 
+# Maximum number of open connections to each upstream connection, 0 for no limit
+AIOHTTP_CLIENT_POOL_SIZE = os.environ.get("AIOHTTP_CLIENT_POOL_SIZE", "0")
+
+try:
+    AIOHTTP_CLIENT_POOL_SIZE = int(AIOHTTP_CLIENT_POOL_SIZE)
+except Exception:
+    AIOHTTP_CLIENT_POOL_SIZE = 0
+
+# Seconds idle connections to upstream connections are kept open for reuse
+AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT = os.environ.get(
+    "AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT", "30"
+)
+
+try:
+    AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT = float(AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT)
+except Exception:
+    AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT = 30.0
+
+# Seconds resolved host names of upstream connections are cached for
+AIOHTTP_CLIENT_DNS_CACHE_TTL = os.environ.get("AIOHTTP_CLIENT_DNS_CACHE_TTL", "300")
+
+try:
+    AIOHTTP_CLIENT_DNS_CACHE_TTL = int(AIOHTTP_CLIENT_DNS_CACHE_TTL)
+except Exception:
+    AIOHTTP_CLIENT_DNS_CACHE_TTL = 300
+
 
 ####################################
 # SENTENCE TRANSFORMERS
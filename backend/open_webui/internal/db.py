@@ -1,6 +1,8 @@
 import os
 import json
+import base64
 import logging
+import zlib
 from contextlib import contextmanager
 from typing import Any, Optional
 
@@ -15,8 +17,11 @@ from open_webui.env import (
     DATABASE_POOL_SIZE,
     DATABASE_POOL_TIMEOUT,
     DATABASE_ENABLE_SQLITE_WAL,
+    DATABASE_JSON_COMPRESSION,
+    DATABASE_JSON_COMPRESSION_MIN_SIZE,
 )
 from peewee_migrate import Router
+import sqlalchemy as sa
 from sqlalchemy import Dialect, create_engine, MetaData, event, types
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import scoped_session, sessionmaker
@@ -24,6 +29,11 @@ from sqlalchemy.pool import QueuePool, NullPool
 from sqlalchemy.sql.type_api import _T
 from typing_extensions import Self
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["DB"])
 
@@ -50,6 +60,79 @@ class JSONField(types.TypeDecorator):
             return json.loads(value)
 
 
+# Key of the envelope CompressedJSONField stores compressed values in
+COMPRESSED_JSON_KEY = "__compressed__"
+
+
+def compress_json(value: Any, method: Optional[str] = None) -> Any:
+    """
+    Wrap value in a compressed envelope if its serialized size reaches
+    DATABASE_JSON_COMPRESSION_MIN_SIZE, otherwise return it unchanged.
+    """
+    method = method or DATABASE_JSON_COMPRESSION
+    if not method or value is None or is_compressed_json(value):
+        return value
+
+    data = json.dumps(value, separators=(",", ":")).encode()
+    if len(data) < DATABASE_JSON_COMPRESSION_MIN_SIZE:
+        return value
+
+    if method == "zstd" and zstandard is not None:
+        data = zstandard.ZstdCompressor(level=3).compress(data)
+    else:
+        method = "zlib"
+        data = zlib.compress(data, 6)
+
+    return {COMPRESSED_JSON_KEY: method, "data": base64.b64encode(data).decode()}
+
+
+def is_compressed_json(value: Any) -> bool:
+    return (
+        isinstance(value, dict)
+        and len(value) == 2
+        and COMPRESSED_JSON_KEY in value
+        and "data" in value
+    )
+
+
+def decompress_json(value: Any) -> Any:
+    if not is_compressed_json(value):
+        return value
+
+    method = value[COMPRESSED_JSON_KEY]
+    data = base64.b64decode(value["data"])
+    if method == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd compressed data")
+        data = zstandard.ZstdDecompressor().decompress(data)
+    elif method == "zlib":
+        data = zlib.decompress(data)
+    else:
+        raise ValueError(f"Unsupported JSON compression: {method}")
+
+    return json.loads(data)
+
+
+class CompressedJSONField(types.TypeDecorator):
+    """
+    JSON column that stores large values compressed when DATABASE_JSON_COMPRESSION
+    is set. Compressed values are kept as valid JSON, wrapped in an envelope, so the
+    column type is unchanged and plain and compressed rows can be mixed.
+
+    Compressed rows are opaque to SQL JSON functions, only use it for columns that
+    are read and written whole, like the data of files and knowledge bases.
+    """
+
+    impl = types.JSON
+    cache_ok = True
+
+    def process_bind_param(self, value: Optional[_T], dialect: Dialect) -> Any:
+        return compress_json(value)
+
+    def process_result_value(self, value: Optional[_T], dialect: Dialect) -> Any:
+        return decompress_json(value)
+
+
 # Workaround to handle the peewee migration
 # This is required to ensure the peewee migration is handled before the alembic migration
 def handle_peewee_migration(DATABASE_URL):
@@ -162,3 +245,96 @@ def get_session():
 
 
 get_db = contextmanager(get_session)
+
+
+def rewrite_json_column(
+    conn,
+    table_name: str,
+    column_name: str,
+    rewrite,
+    where=None,
+    schema: Optional[str] = None,
+    batch_size: int = 100,
+) -> int:
+    """
+    Replace each value of a JSON column with rewrite(value), committing a batch
+    of rows by id at a time. A row is only written if it did not change since it
+    was read, so this is safe to run while the application is serving requests.
+    Returns the number of rewritten rows.
+    """
+    target = sa.table(
+        table_name,
+        sa.column("id", sa.String()),
+        sa.column(column_name, sa.JSON()),
+        schema=schema,
+    )
+    raw_value = sa.cast(target.c[column_name], sa.Text)
+
+    count = 0
+    last_id = None
+    while True:
+        query = sa.select(target.c.id, raw_value).order_by(target.c.id)
+        if where is not None:
+            query = query.where(where(target.c[column_name], raw_value))
+        if last_id is not None:
+            query = query.where(target.c.id > last_id)
+
+        rows = conn.execute(query.limit(batch_size)).fetchall()
+        if not rows:
+            break
+
+        for id, raw in rows:
+            if raw is None:
+                continue
+
+            value = json.loads(raw)
+            rewritten = rewrite(value)
+            if rewritten is not value:
+                result = conn.execute(
+                    sa.update(target)
+                    .where(target.c.id == id, raw_value == raw)
+                    .values({column_name: rewritten})
+                )
+                count += result.rowcount
+
+        conn.commit()
+        last_id = rows[-1][0]
+
+    return count
+
+
+def compress_json_columns() -> None:
+    """
+    Compress the existing rows of every CompressedJSONField column when
+    DATABASE_JSON_COMPRESSION is set. Rows that are compressed already or too
+    small are skipped, so this can run on every start and picks up rows written
+    before compression was enabled.
+    """
+    if not DATABASE_JSON_COMPRESSION:
+        return
+
+    def is_uncompressed(column, raw_value):
+        return sa.and_(
+            sa.func.length(raw_value) >= DATABASE_JSON_COMPRESSION_MIN_SIZE,
+            raw_value.notlike(f'{{"{COMPRESSED_JSON_KEY}"%'),
+        )
+
+    for table in Base.metadata.sorted_tables:
+        for column in table.columns:
+            if not isinstance(column.type, CompressedJSONField):
+                continue
+
+            try:
+                with engine.connect() as conn:
+                    count = rewrite_json_column(
+                        conn,
+                        table.name,
+                        column.name,
+                        compress_json,
+                        where=is_uncompressed,
+                        schema=table.schema,
+                    )
+                if count:
+                    log.info(f"Compressed {count} rows of {table.name}.{column.name}")
+            except Exception as e:
+                log.error(f"Failed to compress {table.name}.{column.name}: {e}")
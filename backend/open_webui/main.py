@@ -103,7 +103,7 @@ from open_webui.routers.retrieval import (
     get_rf,
 )
 
-from open_webui.internal.db import Session, engine
+from open_webui.internal.db import Session, compress_json_columns, engine
 
 from open_webui.models.functions import Functions
 from open_webui.models.models import Models
@@ -472,7 +472,10 @@ from open_webui.utils.chat import (
 )
 from open_webui.utils.embeddings import generate_embeddings
 from open_webui.utils.middleware import process_chat_payload, process_chat_response
-from open_webui.utils.access_control import has_access
+from open_webui.utils.access_control import has_access, permissions_scope
+from open_webui.utils.model_lists import MODEL_LISTS
+from open_webui.utils.http_sessions import HTTP_SESSIONS
+from open_webui.utils.admission import AdmissionRejected, CHAT_COMPLETION_ADMISSION
 
 from open_webui.utils.auth import (
     get_license_data,
@@ -489,6 +492,7 @@ from open_webui.utils.oauth import (
     OAuthClientInformationFull,
 )
 from open_webui.utils.security_headers import SecurityHeadersMiddleware
+from open_webui.utils.pagination import NEXT_CURSOR_HEADER
 from open_webui.utils.redis import get_redis_connection
 
 from open_webui.tasks import (
@@ -582,6 +586,23 @@ async def lifespan(app: FastAPI):
 
     asyncio.create_task(periodic_usage_pool_cleanup())
 
+    # Compress rows written before DATABASE_JSON_COMPRESSION was enabled
+    app.state.json_compression_backfill = asyncio.create_task(
+        asyncio.to_thread(compress_json_columns)
+    )
+
+    # Refresh the model lists of connections in the background
+    MODEL_LISTS.redis = app.state.redis
+
+    # Share the chat completion slots and queue between instances
+    CHAT_COMPLETION_ADMISSION.redis = app.state.redis
+    app.state.model_lists_refresher = asyncio.create_task(MODEL_LISTS.run())
+
+    # Write the last active timestamps of users in batches
+    app.state.last_active_flusher = asyncio.create_task(
+        Users.run_last_active_flush()
+    )
+
     if app.state.config.ENABLE_BASE_MODELS_CACHE:
         await get_all_models(
             Request(
@@ -625,6 +646,15 @@ async def lifespan(app: FastAPI):
     if hasattr(app.state, "redis_task_command_listener"):
         app.state.redis_task_command_listener.cancel()
 
+    app.state.model_lists_refresher.cancel()
+    app.state.last_active_flusher.cancel()
+
+    # Close the pooled connections to the upstream connections
+    await HTTP_SESSIONS.close()
+
+    # Write last active timestamps still pending
+    Users.flush_user_last_active()
+
 
 app = FastAPI(
     title="Open WebUI",
@@ -727,6 +757,7 @@ app.state.SCIM_TOKEN = SCIM_TOKEN
 
 app.state.config.ENABLE_BASE_MODELS_CACHE = ENABLE_BASE_MODELS_CACHE
 app.state.BASE_MODELS = []
+app.state.BASE_MODELS_FUNCTIONS_VERSION = None
 
 ########################################
 #
@@ -1196,6 +1227,7 @@ app.state.config.AUTOCOMPLETE_GENERATION_INPUT_MAX_LENGTH = (
 ########################################
 
 app.state.MODELS = {}
+app.state.MODELS_REGISTRY = None
 
 
 class RedirectMiddleware(BaseHTTPMiddleware):
@@ -1262,7 +1294,8 @@ async def check_url(request: Request, call_next):
     )
 
     request.state.enable_api_key = app.state.config.ENABLE_API_KEY
-    response = await call_next(request)
+    with permissions_scope():
+        response = await call_next(request)
     process_time = int(time.time()) - start_time
     response.headers["X-Process-Time"] = str(process_time)
     return response
@@ -1292,6 +1325,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 
@@ -1550,12 +1584,45 @@ async def chat_completion(
             detail=str(e),
         )
 
+    # Processed in the background, results and errors are sent over the socket
+    background = bool(
+        metadata.get("session_id")
+        and metadata.get("chat_id")
+        and metadata.get("message_id")
+    )
+
     async def process_chat(request, form_data, user, metadata, model):
+        ticket = None
         try:
             form_data, metadata, events = await process_chat_payload(
                 request, form_data, user, metadata, model
             )
 
+            async def on_queue_position(position: int):
+                await get_event_emitter(metadata)(
+                    {
+                        "type": "status",
+                        "data": {
+                            "action": "queue",
+                            "description": f"Waiting in queue (position {position})",
+                            "done": False,
+                        },
+                    }
+                )
+
+            ticket = await CHAT_COMPLETION_ADMISSION.acquire(
+                user.id,
+                model.get("info", {}).get("base_model_id") or model_id,
+                on_position=on_queue_position if metadata.get("session_id") else None,
+            )
+            if ticket.queued and metadata.get("session_id"):
+                await get_event_emitter(metadata)(
+                    {
+                        "type": "status",
+                        "data": {"action": "queue", "done": True, "hidden": True},
+                    }
+                )
+
             response = await chat_completion_handler(request, form_data, user)
             if metadata.get("chat_id") and metadata.get("message_id"):
                 try:
@@ -1570,9 +1637,14 @@ async def chat_completion(
                 except:
                     pass
 
-            return await process_chat_response(
+            response = await process_chat_response(
                 request, response, form_data, user, metadata, model, events, tasks
             )
+
+            # Streamed responses hold the slot until the stream is sent
+            if CHAT_COMPLETION_ADMISSION.release_after(response, ticket):
+                ticket = None
+            return response
         except asyncio.CancelledError:
             log.info("Chat processing was cancelled")
             try:
@@ -1584,6 +1656,12 @@ async def chat_completion(
                 pass
         except Exception as e:
             log.debug(f"Error processing chat payload: {e}")
+            if isinstance(e, AdmissionRejected) and not background:
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail=str(e),
+                )
+
             if metadata.get("chat_id") and metadata.get("message_id"):
                 # Update the chat message with the error
                 try:
@@ -1610,6 +1688,8 @@ async def chat_completion(
                 except:
                     pass
         finally:
+            await CHAT_COMPLETION_ADMISSION.release(ticket)
+
             try:
                 if mcp_clients := metadata.get("mcp_clients"):
                     for client in mcp_clients.values():
@@ -1618,11 +1698,7 @@ async def chat_completion(
                 log.debug(f"Error cleaning up: {e}")
                 pass
 
-    if (
-        metadata.get("session_id")
-        and metadata.get("chat_id")
-        and metadata.get("message_id")
-    ):
+    if background:
         # Asynchronous Chat Processing
         task_id, _ = await create_task(
             request.app.state.redis,
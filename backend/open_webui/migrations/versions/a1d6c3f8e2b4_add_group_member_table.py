@@ -0,0 +1,78 @@
+"""Add group_member table
+
+Revision ID: a1d6c3f8e2b4
+Revises: f3b7d9e1c4a6
+Create Date: 2025-10-17 09:41:27.306218
+
+"""
+
+import time
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.sql import table, column
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a1d6c3f8e2b4"
+down_revision: Union[str, None] = "f3b7d9e1c4a6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+group = table("group", column("id", sa.Text()), column("user_ids", sa.JSON()))
+group_member = table(
+    "group_member",
+    column("group_id", sa.Text()),
+    column("user_id", sa.Text()),
+    column("created_at", sa.BigInteger()),
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "group_member",
+        sa.Column("group_id", sa.Text(), nullable=False),
+        sa.Column("user_id", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.BigInteger(), nullable=True),
+        sa.PrimaryKeyConstraint("group_id", "user_id"),
+    )
+    op.create_index("group_member_user_id_idx", "group_member", ["user_id"])
+
+    conn = op.get_bind()
+    now = int(time.time())
+
+    for row in conn.execute(sa.select(group.c.id, group.c.user_ids)).fetchall():
+        if not isinstance(row.user_ids, list):
+            continue
+
+        members = [
+            {"group_id": row.id, "user_id": user_id, "created_at": now}
+            for user_id in dict.fromkeys(row.user_ids)
+            if isinstance(user_id, str)
+        ]
+        if members:
+            conn.execute(sa.insert(group_member), members)
+
+    with op.batch_alter_table("group") as batch_op:
+        batch_op.drop_column("user_ids")
+
+
+def downgrade() -> None:
+    op.add_column("group", sa.Column("user_ids", sa.JSON(), nullable=True))
+
+    conn = op.get_bind()
+
+    user_ids = {}
+    for row in conn.execute(
+        sa.select(group_member.c.group_id, group_member.c.user_id)
+    ).fetchall():
+        user_ids.setdefault(row.group_id, []).append(row.user_id)
+
+    for group_id, ids in user_ids.items():
+        conn.execute(
+            sa.update(group).where(group.c.id == group_id).values(user_ids=ids)
+        )
+
+    op.drop_index("group_member_user_id_idx", table_name="group_member")
+    op.drop_table("group_member")
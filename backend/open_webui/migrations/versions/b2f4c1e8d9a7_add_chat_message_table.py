@@ -0,0 +1,47 @@
+"""Add chat_message table
+
+Revision ID: b2f4c1e8d9a7
+Revises: a5c220713937
+Create Date: 2025-10-16 10:12:41.503218
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b2f4c1e8d9a7"
+down_revision: Union[str, None] = "a5c220713937"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Rows are written by single message updates when ENABLE_CHAT_MESSAGE_TABLE
+    # is set, existing chats keep their messages in the chat document
+    op.create_table(
+        "chat_message",
+        sa.Column("chat_id", sa.String(), nullable=False),
+        sa.Column("message_id", sa.String(), nullable=False),
+        sa.Column("parent_id", sa.String(), nullable=True),
+        sa.Column("role", sa.String(), nullable=True),
+        sa.Column("content", sa.Text(), nullable=True),
+        sa.Column("data", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.BigInteger(), nullable=True),
+        sa.Column("updated_at", sa.BigInteger(), nullable=True),
+        sa.PrimaryKeyConstraint("chat_id", "message_id"),
+    )
+
+    op.create_index(
+        "chat_message_chat_id_parent_id_idx",
+        "chat_message",
+        ["chat_id", "parent_id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("chat_message_chat_id_parent_id_idx", table_name="chat_message")
+    op.drop_table("chat_message")
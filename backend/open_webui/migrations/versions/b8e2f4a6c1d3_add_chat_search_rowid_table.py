@@ -0,0 +1,53 @@
+"""Add chat_search_rowid table
+
+Revision ID: b8e2f4a6c1d3
+Revises: a1d6c3f8e2b4
+Create Date: 2025-10-17 15:12:48.920341
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b8e2f4a6c1d3"
+down_revision: Union[str, None] = "a1d6c3f8e2b4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The FTS5 chat_search table can only look rows up by rowid, the rowid of each
+    # chat is kept here so updates and deletes don't scan the index
+    conn = op.get_bind()
+    if conn.dialect.name != "sqlite" or not sa.inspect(conn).has_table("chat_search"):
+        return
+
+    conn.execute(
+        sa.text(
+            "CREATE TABLE IF NOT EXISTS chat_search_rowid ("
+            "id INTEGER PRIMARY KEY, chat_id TEXT NOT NULL UNIQUE)"
+        )
+    )
+    conn.execute(
+        sa.text(
+            "INSERT OR IGNORE INTO chat_search_rowid (id, chat_id) "
+            "SELECT rowid, chat_id FROM chat_search"
+        )
+    )
+    # Duplicate rows of a chat, only the first one is kept
+    conn.execute(
+        sa.text(
+            "DELETE FROM chat_search WHERE rowid NOT IN "
+            "(SELECT id FROM chat_search_rowid)"
+        )
+    )
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    if conn.dialect.name == "sqlite":
+        conn.execute(sa.text("DROP TABLE IF EXISTS chat_search_rowid"))
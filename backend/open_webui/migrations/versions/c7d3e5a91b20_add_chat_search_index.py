@@ -0,0 +1,151 @@
+"""Add chat_search full-text index
+
+Revision ID: c7d3e5a91b20
+Revises: b2f4c1e8d9a7
+Create Date: 2025-10-16 14:37:05.118926
+
+"""
+
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.sql import table, column
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c7d3e5a91b20"
+down_revision: Union[str, None] = "b2f4c1e8d9a7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 500
+CONTENT_MAX_BYTES = 250_000
+
+
+def get_search_content(chat) -> str:
+    if isinstance(chat, str):
+        try:
+            chat = json.loads(chat)
+        except Exception:
+            return ""
+    if not isinstance(chat, dict):
+        return ""
+
+    messages = list((chat.get("history", {}).get("messages", {}) or {}).values())
+    if not messages:
+        messages = chat.get("messages", []) or []
+
+    contents = []
+    for message in messages:
+        content = message.get("content", "") if isinstance(message, dict) else ""
+        if isinstance(content, list):
+            content = " ".join(
+                item.get("text", "")
+                for item in content
+                if isinstance(item, dict) and item.get("type") == "text"
+            )
+        if isinstance(content, str) and content:
+            contents.append(content)
+
+    content = "\n".join(contents).replace("\x00", "").encode()
+    return content[:CONTENT_MAX_BYTES].decode(errors="ignore")
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    dialect_name = conn.dialect.name
+
+    if dialect_name == "sqlite":
+        try:
+            conn.execute(
+                sa.text(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS chat_search USING fts5("
+                    "chat_id UNINDEXED, user_id UNINDEXED, title, content, "
+                    "tokenize = 'unicode61 remove_diacritics 2')"
+                )
+            )
+        except Exception as e:
+            # SQLite built without FTS5, search keeps scanning the chat table
+            print(f"Skipping chat search index: {e}")
+            return
+    elif dialect_name == "postgresql":
+        conn.execute(
+            sa.text(
+                "CREATE TABLE IF NOT EXISTS chat_search ("
+                "chat_id TEXT PRIMARY KEY, "
+                "user_id TEXT NOT NULL, "
+                "title TEXT, "
+                "content TEXT, "
+                "search_vector TSVECTOR GENERATED ALWAYS AS ("
+                "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+                "setweight(to_tsvector('simple', coalesce(content, '')), 'B')"
+                ") STORED)"
+            )
+        )
+        conn.execute(
+            sa.text(
+                "CREATE INDEX IF NOT EXISTS chat_search_vector_idx "
+                "ON chat_search USING GIN (search_vector)"
+            )
+        )
+        conn.execute(
+            sa.text(
+                "CREATE INDEX IF NOT EXISTS chat_search_user_id_idx "
+                "ON chat_search (user_id)"
+            )
+        )
+    else:
+        return
+
+    chat = table(
+        "chat",
+        column("id", sa.String()),
+        column("user_id", sa.String()),
+        column("title", sa.Text()),
+        column("chat", sa.Text()),
+    )
+    chat_search = table(
+        "chat_search",
+        column("chat_id", sa.String()),
+        column("user_id", sa.String()),
+        column("title", sa.Text()),
+        column("content", sa.Text()),
+    )
+
+    # Backfill in batches, shared copies of chats are not searchable
+    last_id = ""
+    while True:
+        rows = conn.execute(
+            sa.select(chat.c.id, chat.c.user_id, chat.c.title, chat.c.chat)
+            .where(chat.c.id > last_id)
+            .where(sa.not_(chat.c.user_id.like("shared-%")))
+            .order_by(chat.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+
+        conn.execute(
+            sa.insert(chat_search),
+            [
+                {
+                    "chat_id": row.id,
+                    "user_id": row.user_id,
+                    "title": (row.title or "").replace("\x00", ""),
+                    "content": get_search_content(row.chat),
+                }
+                for row in rows
+            ],
+        )
+        last_id = rows[-1].id
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    if conn.dialect.name == "postgresql":
+        conn.execute(sa.text("DROP INDEX IF EXISTS chat_search_user_id_idx"))
+        conn.execute(sa.text("DROP INDEX IF EXISTS chat_search_vector_idx"))
+    if conn.dialect.name in ("sqlite", "postgresql"):
+        conn.execute(sa.text("DROP TABLE IF EXISTS chat_search"))
@@ -0,0 +1,37 @@
+"""Add keyset pagination indexes
+
+Revision ID: d4a8b6f2e317
+Revises: c7d3e5a91b20
+Create Date: 2025-10-16 16:05:22.740163
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d4a8b6f2e317"
+down_revision: Union[str, None] = "c7d3e5a91b20"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "user_id_updated_at_id_idx",
+        "chat",
+        ["user_id", "updated_at", "id"],
+    )
+    op.create_index(
+        "message_channel_id_parent_id_created_at_idx",
+        "message",
+        ["channel_id", "parent_id", "created_at", "id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("message_channel_id_parent_id_created_at_idx", table_name="message")
+    op.drop_index("user_id_updated_at_id_idx", table_name="chat")
@@ -0,0 +1,69 @@
+"""Add api_key table with hashed API keys
+
+Revision ID: f3b7d9e1c4a6
+Revises: d4a8b6f2e317
+Create Date: 2025-10-16 20:02:13.584410
+
+"""
+
+import hashlib
+import time
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.sql import table, column
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f3b7d9e1c4a6"
+down_revision: Union[str, None] = "d4a8b6f2e317"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Not named user_api_key, the index on user.api_key has that name already
+    op.create_table(
+        "api_key",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("user_id", sa.String(), nullable=False),
+        sa.Column("hint", sa.String(), nullable=True),
+        sa.Column("created_at", sa.BigInteger(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("user_id"),
+    )
+
+    # Move existing keys to the new table, only their hash is kept
+    conn = op.get_bind()
+    user = table("user", column("id", sa.String()), column("api_key", sa.String()))
+    api_key = table(
+        "api_key",
+        column("id", sa.String()),
+        column("user_id", sa.String()),
+        column("hint", sa.String()),
+        column("created_at", sa.BigInteger()),
+    )
+
+    rows = conn.execute(
+        sa.select(user.c.id, user.c.api_key).where(user.c.api_key.isnot(None))
+    ).fetchall()
+    api_keys = [
+        {
+            "id": hashlib.sha256(row.api_key.encode()).hexdigest(),
+            "user_id": row.id,
+            "hint": f"{row.api_key[:3]}...{row.api_key[-4:]}",
+            "created_at": int(time.time()),
+        }
+        for row in rows
+        if row.api_key
+    ]
+    if api_keys:
+        conn.execute(sa.insert(api_key), api_keys)
+
+    conn.execute(sa.update(user).values(api_key=None))
+
+
+def downgrade() -> None:
+    # Hashed keys cannot be restored, users have to create new keys
+    op.drop_table("api_key")
@@ -1,18 +1,33 @@
 import logging
 import json
+import re
 import time
 import uuid
-from typing import Optional
+from collections import defaultdict
+from contextlib import nullcontext
+from typing import Iterator, Optional
 
 from open_webui.internal.db import Base, get_db
 from open_webui.models.tags import TagModel, Tag, Tags
 from open_webui.models.folders import Folders
-from open_webui.env import SRC_LOG_LEVELS
+from open_webui.env import SRC_LOG_LEVELS, ENABLE_CHAT_MESSAGE_TABLE
+from open_webui.utils.pagination import apply_keyset_pagination
 
 from pydantic import BaseModel, ConfigDict
-from sqlalchemy import BigInteger, Boolean, Column, String, Text, JSON, Index
-from sqlalchemy import or_, func, select, and_, text
-from sqlalchemy.sql import exists
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    String,
+    Text,
+    JSON,
+    Index,
+    Integer,
+    PrimaryKeyConstraint,
+)
+from sqlalchemy import or_, func, select, and_, text, inspect, delete, Float
+from sqlalchemy.orm import defer
+from sqlalchemy.sql import exists, table, column
 from sqlalchemy.sql.expression import bindparam
 
 ####################
@@ -51,11 +66,35 @@ class Chat(Base):
         Index("user_id_archived_idx", "user_id", "archived"),
         # WHERE user_id = ... ORDER BY updated_at DESC
         Index("updated_at_user_id_idx", "updated_at", "user_id"),
+        # WHERE user_id = ... AND (updated_at, id) < (...) ORDER BY updated_at DESC, id DESC
+        Index("user_id_updated_at_id_idx", "user_id", "updated_at", "id"),
         # WHERE folder_id = ... AND user_id = ...
         Index("folder_id_user_id_idx", "folder_id", "user_id"),
     )
 
 
+class ChatMessage(Base):
+    __tablename__ = "chat_message"
+
+    chat_id = Column(String, nullable=False)
+    message_id = Column(String, nullable=False)
+
+    parent_id = Column(String, nullable=True)
+    role = Column(String, nullable=True)
+    content = Column(Text, nullable=True)
+    # Every other field of the message (files, sources, statusHistory, ...)
+    data = Column(JSON, nullable=True)
+
+    created_at = Column(BigInteger)
+    updated_at = Column(BigInteger)
+
+    __table_args__ = (
+        PrimaryKeyConstraint("chat_id", "message_id"),
+        # WHERE chat_id = ... AND parent_id = ...
+        Index("chat_message_chat_id_parent_id_idx", "chat_id", "parent_id"),
+    )
+
+
 class ChatModel(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
@@ -75,6 +114,58 @@ class ChatModel(BaseModel):
     folder_id: Optional[str] = None
 
 
+class ChatListModel(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    user_id: str
+    title: str
+
+    created_at: int  # timestamp in epoch
+    updated_at: int  # timestamp in epoch
+
+    share_id: Optional[str] = None
+    archived: bool = False
+    pinned: Optional[bool] = False
+
+    meta: dict = {}
+    folder_id: Optional[str] = None
+
+
+# Rows fetched per round trip when streaming chat exports
+CHAT_EXPORT_BATCH_SIZE = 100
+
+# Chats whose chat_message rows are read in a single query, below the bound
+# parameter limits of the databases
+CHAT_MESSAGE_BATCH_SIZE = 500
+
+# Upper bound of indexed message text per chat in UTF-8 bytes. tsvector values are
+# limited to 1MB and a lexeme with its positions can take more than its text.
+CHAT_SEARCH_CONTENT_MAX_BYTES = 250_000
+
+
+def get_chat_search_content(chat: dict) -> str:
+    """Concatenate the text of all messages of a chat for the search index."""
+    messages = list((chat.get("history", {}).get("messages", {}) or {}).values())
+    if not messages:
+        messages = chat.get("messages", []) or []
+
+    contents = []
+    for message in messages:
+        content = message.get("content", "")
+        if isinstance(content, list):
+            content = " ".join(
+                item.get("text", "")
+                for item in content
+                if isinstance(item, dict) and item.get("type") == "text"
+            )
+        if isinstance(content, str) and content:
+            contents.append(content)
+
+    content = "\n".join(contents).replace("\x00", "").encode()
+    return content[:CHAT_SEARCH_CONTENT_MAX_BYTES].decode(errors="ignore")
+
+
 ####################
 # Forms
 ####################
@@ -123,6 +214,203 @@ class ChatTitleIdResponse(BaseModel):
 
 
 class ChatTable:
+    # Whether the chat_search index exists, checked once per process
+    _chat_search_available: Optional[bool] = None
+
+    ####################
+    # Chat search index
+    ####################
+    #
+    # chat_search holds the title and message text of every chat: an FTS5 table on
+    # SQLite, a table with a GIN indexed tsvector column on PostgreSQL. FTS5 rows
+    # are only found by rowid, chat_search_rowid maps chat ids to them.
+    #
+    # Chats are indexed by update_chat_search_by_id() once a message is done, and
+    # on full writes that change the title, not on every save of the chat.
+
+    def _get_chat_search_table(self, db) -> Optional[str]:
+        if db.bind.dialect.name not in ("sqlite", "postgresql"):
+            return None
+
+        if self._chat_search_available is None:
+            try:
+                ChatTable._chat_search_available = inspect(db.bind).has_table(
+                    "chat_search", schema=Chat.__table__.schema
+                )
+            except Exception as e:
+                log.debug(f"Error checking for the chat search index: {e}")
+                ChatTable._chat_search_available = False
+
+        if not self._chat_search_available:
+            return None
+
+        schema = Chat.__table__.schema
+        return f"{schema}.chat_search" if schema else "chat_search"
+
+    def _chat_search_savepoint(self, db):
+        # A failed statement aborts the whole transaction on PostgreSQL
+        if db.bind.dialect.name == "postgresql":
+            return db.begin_nested()
+        return nullcontext()
+
+    def _upsert_chat_search(
+        self, db, id: str, user_id: str, title: str, chat: dict
+    ) -> None:
+        table = self._get_chat_search_table(db)
+        if table is None:
+            return
+
+        params = {
+            "chat_id": id,
+            "user_id": user_id,
+            "title": (title or "").replace("\x00", ""),
+            "content": get_chat_search_content(chat),
+        }
+        try:
+            with self._chat_search_savepoint(db):
+                if db.bind.dialect.name == "sqlite":
+                    db.execute(
+                        text(
+                            f"INSERT OR IGNORE INTO {table}_rowid (chat_id) "
+                            "VALUES (:chat_id)"
+                        ),
+                        params,
+                    )
+                    db.execute(
+                        text(
+                            f"DELETE FROM {table} WHERE rowid = "
+                            f"(SELECT id FROM {table}_rowid WHERE chat_id = :chat_id)"
+                        ),
+                        params,
+                    )
+                    db.execute(
+                        text(
+                            f"INSERT INTO {table} "
+                            "(rowid, chat_id, user_id, title, content) "
+                            "SELECT id, :chat_id, :user_id, :title, :content "
+                            f"FROM {table}_rowid WHERE chat_id = :chat_id"
+                        ),
+                        params,
+                    )
+                else:
+                    db.execute(
+                        text(
+                            f"INSERT INTO {table} (chat_id, user_id, title, content) "
+                            "VALUES (:chat_id, :user_id, :title, :content) "
+                            "ON CONFLICT (chat_id) DO UPDATE SET "
+                            "user_id = EXCLUDED.user_id, title = EXCLUDED.title, "
+                            "content = EXCLUDED.content"
+                        ),
+                        params,
+                    )
+        except Exception as e:
+            # A failing index update must not fail the chat write
+            log.warning(f"Error updating the search index of chat {id}: {e}")
+
+    def _refresh_chat_search(self, db, id: str) -> None:
+        # Partial writes don't have the whole chat at hand, read it back
+        if self._get_chat_search_table(db) is None:
+            return
+
+        chat = db.get(Chat, id)
+        if chat is None:
+            return
+
+        self._upsert_chat_search(
+            db,
+            id,
+            chat.user_id,
+            chat.title,
+            self._merge_chat_messages(db, id, chat.chat or {}),
+        )
+        db.commit()
+
+    def _delete_chat_search(self, db, chat_ids) -> None:
+        """Remove chats from the index, chat_ids is a list of ids or a select of them."""
+        if self._get_chat_search_table(db) is None:
+            return
+
+        chat_search = table(
+            "chat_search",
+            column("rowid", Integer),
+            column("chat_id", String),
+            schema=Chat.__table__.schema,
+        )
+        try:
+            with self._chat_search_savepoint(db):
+                if db.bind.dialect.name == "sqlite":
+                    chat_search_rowid = table(
+                        "chat_search_rowid",
+                        column("id", Integer),
+                        column("chat_id", String),
+                        schema=Chat.__table__.schema,
+                    )
+                    db.execute(
+                        delete(chat_search).where(
+                            chat_search.c.rowid.in_(
+                                select(chat_search_rowid.c.id).where(
+                                    chat_search_rowid.c.chat_id.in_(chat_ids)
+                                )
+                            )
+                        )
+                    )
+                    db.execute(
+                        delete(chat_search_rowid).where(
+                            chat_search_rowid.c.chat_id.in_(chat_ids)
+                        )
+                    )
+                else:
+                    db.execute(
+                        delete(chat_search).where(chat_search.c.chat_id.in_(chat_ids))
+                    )
+        except Exception as e:
+            log.warning(f"Error deleting chats from the search index: {e}")
+
+    def _get_chat_search_subquery(self, db, user_id: str, search_text: str):
+        """
+        Ranked (chat_id, rank) matches of search_text for a user, higher rank first,
+        or None when the index is not available for the query.
+        """
+        table = self._get_chat_search_table(db)
+        words = re.findall(r"\w+", search_text)
+        if table is None or not words:
+            return None
+
+        if db.bind.dialect.name == "sqlite":
+            # Prefix match of every word, title matches weigh more than content
+            search_query = " AND ".join(f'"{word}"*' for word in words)
+            statement = text(
+                f"SELECT chat_id, -bm25({table}, 0.0, 0.0, 10.0, 1.0) AS rank "
+                f"FROM {table} "
+                f"WHERE {table} MATCH :search_query AND user_id = :search_user_id"
+            )
+        else:
+            search_query = " & ".join(f"{word}:*" for word in words)
+            statement = text(
+                "SELECT chat_id, "
+                "ts_rank(search_vector, to_tsquery('simple', :search_query)) AS rank "
+                f"FROM {table} "
+                "WHERE user_id = :search_user_id "
+                "AND search_vector @@ to_tsquery('simple', :search_query)"
+            )
+
+        return (
+            statement.bindparams(search_query=search_query, search_user_id=user_id)
+            .columns(chat_id=String, rank=Float)
+            .subquery("chat_search_match")
+        )
+
+    def update_chat_search_by_id(self, id: str) -> None:
+        """
+        Index a chat again after partial writes of a message, e.g. once a response
+        is complete rather than on every save while it streams.
+        """
+        try:
+            with get_db() as db:
+                self._refresh_chat_search(db, id)
+        except Exception as e:
+            log.warning(f"Error updating the search index of chat {id}: {e}")
+
     def insert_new_chat(self, user_id: str, form_data: ChatForm) -> Optional[ChatModel]:
         with get_db() as db:
             id = str(uuid.uuid4())
@@ -181,6 +469,7 @@ class ChatTable:
 
             result = Chat(**chat.model_dump())
             db.add(result)
+            self._upsert_chat_search(db, id, user_id, chat.title, chat.chat)
             db.commit()
             db.refresh(result)
             return ChatModel.model_validate(result) if result else None
@@ -189,9 +478,16 @@ class ChatTable:
         try:
             with get_db() as db:
                 chat_item = db.get(Chat, id)
+                previous_title = chat_item.title
                 chat_item.chat = chat
                 chat_item.title = chat["title"] if "title" in chat else "New Chat"
                 chat_item.updated_at = int(time.time())
+                # The document now holds every message
+                self._delete_chat_messages(db, [id])
+                if chat_item.title != previous_title:
+                    self._upsert_chat_search(
+                        db, id, chat_item.user_id, chat_item.title, chat
+                    )
                 db.commit()
                 db.refresh(chat_item)
 
@@ -246,23 +542,427 @@ class ChatTable:
     def get_message_by_id_and_message_id(
         self, id: str, message_id: str
     ) -> Optional[dict]:
+        if ENABLE_CHAT_MESSAGE_TABLE:
+            try:
+                with get_db() as db:
+                    chat_message = db.get(ChatMessage, (id, message_id))
+                    if chat_message is not None:
+                        return self._chat_message_to_message(chat_message)
+
+                    found, message = self._get_message_from_chat_json(
+                        db, id, message_id
+                    )
+                    if not found:
+                        return None
+                    return message or {}
+            except Exception as e:
+                log.debug(f"Error reading message {message_id} of chat {id}: {e}")
+
         chat = self.get_chat_by_id(id)
         if chat is None:
             return None
 
         return chat.chat.get("history", {}).get("messages", {}).get(message_id, {})
 
-    def upsert_message_to_chat_by_id_and_message_id(
-        self, id: str, message_id: str, message: dict
-    ) -> Optional[ChatModel]:
-        chat = self.get_chat_by_id(id)
-        if chat is None:
+    def _get_message_json_path(self, *keys: str) -> Optional[str]:
+        # SQLite JSON path with quoted labels, which cannot contain double quotes
+        if any('"' in key for key in keys):
             return None
+        return "$." + ".".join(f'"{key}"' for key in keys)
+
+    def _patch_message_to_chat_by_id_and_message_id(
+        self, id: str, message_id: str, message: dict
+    ) -> bool:
+        """
+        Merge message into history.messages.<message_id> and set history.currentId
+        in place (jsonb_set on PostgreSQL, json_set on SQLite), so the rest of the
+        chat document is neither loaded nor rewritten. Returns False when the
+        dialect is not supported or no row was updated.
+        """
+        with get_db() as db:
+            dialect_name = db.bind.dialect.name
+
+            if dialect_name == "postgresql":
+                chat_expr = text(
+                    "CAST(jsonb_set("
+                    "    jsonb_set("
+                    "        CAST(chat AS jsonb),"
+                    "        ARRAY['history', 'messages', CAST(:message_id AS text)],"
+                    "        COALESCE("
+                    "            CAST(chat AS jsonb) #> ARRAY['history', 'messages', CAST(:message_id AS text)],"
+                    "            '{}'::jsonb"
+                    "        ) || CAST(:message AS jsonb),"
+                    "        true"
+                    "    ),"
+                    "    '{history,currentId}',"
+                    "    to_jsonb(CAST(:message_id AS text)),"
+                    "    true"
+                    ") AS json)"
+                ).bindparams(message_id=message_id, message=json.dumps(message))
+
+                # jsonb_set only creates the last path element
+                condition = text(
+                    "CAST(chat AS jsonb) #> '{history,messages}' IS NOT NULL"
+                )
+            elif dialect_name == "sqlite":
+                message_path = self._get_message_json_path(
+                    "history", "messages", message_id
+                )
+                field_paths = [
+                    self._get_message_json_path("history", "messages", message_id, key)
+                    for key in message.keys()
+                ]
+                if message_path is None or None in field_paths:
+                    return False
+
+                # Existing messages are merged field by field, new ones inserted whole
+                params = {
+                    "message_id": message_id,
+                    "message": json.dumps(message),
+                    "message_path": message_path,
+                }
+                field_args = []
+                for idx, (path, value) in enumerate(zip(field_paths, message.values())):
+                    params[f"field_path_{idx}"] = path
+                    params[f"field_value_{idx}"] = json.dumps(value)
+                    field_args.append(f":field_path_{idx}, json(:field_value_{idx}), ")
+
+                chat_expr = text(
+                    "CASE WHEN json_type(chat, :message_path) = 'object' "
+                    f"THEN json_set(chat, {''.join(field_args)}'$.history.currentId', :message_id) "
+                    "ELSE json_set(chat, :message_path, json(:message), '$.history.currentId', :message_id) "
+                    "END"
+                ).bindparams(**params)
+
+                # json_set only creates the last path element
+                condition = text("json_type(chat, '$.history.messages') = 'object'")
+            else:
+                return False
+
+            result = (
+                db.query(Chat)
+                .filter_by(id=id)
+                .filter(condition)
+                .update(
+                    {"chat": chat_expr, "updated_at": int(time.time())},
+                    synchronize_session=False,
+                )
+            )
+            db.commit()
+
+            return result > 0
+
+    def _patch_message_status_to_chat_by_id_and_message_id(
+        self, id: str, message_id: str, status: dict
+    ) -> bool:
+        """
+        Append status to history.messages.<message_id>.statusHistory in place.
+        Returns False when the dialect is not supported or no row was updated.
+        """
+        with get_db() as db:
+            dialect_name = db.bind.dialect.name
+
+            if dialect_name == "postgresql":
+                chat_expr = text(
+                    "CAST(jsonb_set("
+                    "    CAST(chat AS jsonb),"
+                    "    ARRAY['history', 'messages', CAST(:message_id AS text), 'statusHistory'],"
+                    "    COALESCE("
+                    "        CAST(chat AS jsonb) #> ARRAY['history', 'messages', CAST(:message_id AS text), 'statusHistory'],"
+                    "        '[]'::jsonb"
+                    "    ) || jsonb_build_array(CAST(:status AS jsonb)),"
+                    "    true"
+                    ") AS json)"
+                ).bindparams(message_id=message_id, status=json.dumps(status))
+                condition = text(
+                    "jsonb_typeof(CAST(chat AS jsonb) #> ARRAY['history', 'messages', CAST(:message_id AS text)]) = 'object'"
+                ).bindparams(message_id=message_id)
+            elif dialect_name == "sqlite":
+                message_path = self._get_message_json_path(
+                    "history", "messages", message_id
+                )
+                if message_path is None:
+                    return False
+
+                status_path = f'{message_path}."statusHistory"'
+                chat_expr = text(
+                    "CASE WHEN json_type(chat, :status_path) = 'array' "
+                    "THEN json_insert(chat, :status_path || '[#]', json(:status)) "
+                    "ELSE json_set(chat, :status_path, json_array(json(:status))) "
+                    "END"
+                ).bindparams(status_path=status_path, status=json.dumps(status))
+                condition = text(
+                    "json_type(chat, :message_path) = 'object'"
+                ).bindparams(message_path=message_path)
+            else:
+                return False
+
+            result = (
+                db.query(Chat)
+                .filter_by(id=id)
+                .filter(condition)
+                .update(
+                    {"chat": chat_expr, "updated_at": int(time.time())},
+                    synchronize_session=False,
+                )
+            )
+            db.commit()
+
+            return result > 0
+
+    ####################
+    # Chat message table
+    ####################
+    #
+    # With ENABLE_CHAT_MESSAGE_TABLE, single message writes go to chat_message
+    # rows, which take precedence over history.messages of the chat document on
+    # read. Full writes of the document fold the rows back into it.
+
+    def _message_to_chat_message(self, id: str, message_id: str, message: dict) -> dict:
+        data = {
+            key: value
+            for key, value in message.items()
+            if not (key == "content" and isinstance(value, str))
+        }
+        return {
+            "chat_id": id,
+            "message_id": message_id,
+            "parent_id": message.get("parentId"),
+            "role": message.get("role"),
+            "content": (
+                message["content"] if isinstance(message.get("content"), str) else None
+            ),
+            "data": data,
+        }
+
+    def _chat_message_to_message(self, chat_message: ChatMessage) -> dict:
+        message = dict(chat_message.data or {})
+        if chat_message.content is not None:
+            message["content"] = chat_message.content
+        return message
+
+    def _merge_chat_messages(
+        self, db, id: str, chat: dict, chat_messages: Optional[list] = None
+    ) -> dict:
+        if not ENABLE_CHAT_MESSAGE_TABLE:
+            return chat
+
+        if chat_messages is None:
+            chat_messages = db.query(ChatMessage).filter_by(chat_id=id).all()
+        if chat_messages:
+            history = chat.get("history", {})
+            messages = {
+                **(history.get("messages", {}) or {}),
+                **{
+                    chat_message.message_id: self._chat_message_to_message(chat_message)
+                    for chat_message in chat_messages
+                },
+            }
+            chat = {**chat, "history": {**history, "messages": messages}}
+        return chat
+
+    def _get_chat_models(self, db, chats) -> list[ChatModel]:
+        """Validate full chats, with the chat_message rows of all of them merged in."""
+        chat_models = [ChatModel.model_validate(chat) for chat in chats]
+        if not ENABLE_CHAT_MESSAGE_TABLE:
+            return chat_models
+
+        chat_messages = defaultdict(list)
+        for idx in range(0, len(chat_models), CHAT_MESSAGE_BATCH_SIZE):
+            chat_ids = [
+                chat.id for chat in chat_models[idx : idx + CHAT_MESSAGE_BATCH_SIZE]
+            ]
+            for chat_message in db.query(ChatMessage).filter(
+                ChatMessage.chat_id.in_(chat_ids)
+            ):
+                chat_messages[chat_message.chat_id].append(chat_message)
+
+        for chat in chat_models:
+            chat.chat = self._merge_chat_messages(
+                db, chat.id, chat.chat, chat_messages[chat.id]
+            )
+        return chat_models
+
+    def _get_message_from_chat_json(
+        self, db, id: str, message_id: str
+    ) -> tuple[bool, Optional[dict]]:
+        # Extract a single message in the database instead of loading the document
+        row = (
+            db.query(Chat.chat[("history", "messages", message_id)])
+            .filter(Chat.id == id)
+            .first()
+        )
+        if row is None:
+            return False, None
+        return True, row[0] if isinstance(row[0], dict) else None
+
+    def _set_current_message_id(self, db, id: str, message_id: str) -> bool:
+        # Only touch the chat row when history.currentId actually changes
+        dialect_name = db.bind.dialect.name
+        if dialect_name == "postgresql":
+            chat_expr = text(
+                "CAST(jsonb_set(CAST(chat AS jsonb), '{history,currentId}', "
+                "to_jsonb(CAST(:message_id AS text)), true) AS json)"
+            ).bindparams(message_id=message_id)
+            condition = text(
+                "(chat #>> '{history,currentId}') IS DISTINCT FROM :message_id "
+                "AND CAST(chat AS jsonb) #> '{history}' IS NOT NULL"
+            ).bindparams(message_id=message_id)
+        elif dialect_name == "sqlite":
+            chat_expr = text(
+                "json_set(chat, '$.history.currentId', :message_id)"
+            ).bindparams(message_id=message_id)
+            condition = text(
+                "json_extract(chat, '$.history.currentId') IS NOT :message_id "
+                "AND json_type(chat, '$.history') = 'object'"
+            ).bindparams(message_id=message_id)
+        else:
+            condition = None
+
+        if condition is not None:
+            result = (
+                db.query(Chat)
+                .filter_by(id=id)
+                .filter(condition)
+                .update(
+                    {"chat": chat_expr, "updated_at": int(time.time())},
+                    synchronize_session=False,
+                )
+            )
+            db.commit()
+
+            # Documents without a history are skipped by the update and rewritten below
+            if result:
+                return True
+
+        current_id = (
+            db.query(Chat.chat[("history", "currentId")]).filter(Chat.id == id).scalar()
+        )
+        if current_id == message_id:
+            return True
+
+        # Assign a copy, in place changes of the loaded value are not detected
+        chat_item = db.get(Chat, id)
+        chat = {**chat_item.chat}
+        chat["history"] = {**chat.get("history", {}), "currentId": message_id}
+        chat_item.chat = chat
+        chat_item.updated_at = int(time.time())
+        db.commit()
+        return True
+
+    def _update_chat_message(
+        self,
+        id: str,
+        message_id: str,
+        update,
+        set_current: bool = False,
+    ) -> bool:
+        """
+        Apply update(message) -> message to the chat_message row of a message,
+        seeding the row from the chat document on the first write.
+        """
+        with get_db() as db:
+            chat_message = db.get(ChatMessage, (id, message_id))
+            if chat_message is None:
+                found, message = self._get_message_from_chat_json(db, id, message_id)
+                if not found:
+                    return False
+                if message is None and not set_current:
+                    # Status updates are only recorded for existing messages
+                    return True
+
+                message = update(message or {})
+                chat_message = ChatMessage(
+                    **self._message_to_chat_message(id, message_id, message),
+                    created_at=int(time.time()),
+                    updated_at=int(time.time()),
+                )
+                db.add(chat_message)
+            else:
+                message = update(self._chat_message_to_message(chat_message))
+                for key, value in self._message_to_chat_message(
+                    id, message_id, message
+                ).items():
+                    setattr(chat_message, key, value)
+                chat_message.updated_at = int(time.time())
+
+            db.commit()
+
+            if set_current:
+                self._set_current_message_id(db, id, message_id)
+            return True
 
+    def _delete_chat_messages(self, db, chat_ids) -> None:
+        if ENABLE_CHAT_MESSAGE_TABLE:
+            db.query(ChatMessage).filter(ChatMessage.chat_id.in_(chat_ids)).delete(
+                synchronize_session=False
+            )
+
+    def get_message_list_by_id_and_message_id(
+        self, id: str, message_id: str
+    ) -> list[dict]:
+        """
+        Walk the branch ending at message_id from the root, reading chat_message
+        rows first and the chat document only for messages without a row.
+        """
+        with get_db() as db:
+            messages_map = {}
+            if ENABLE_CHAT_MESSAGE_TABLE:
+                messages_map = {
+                    chat_message.message_id: self._chat_message_to_message(chat_message)
+                    for chat_message in db.query(ChatMessage)
+                    .filter_by(chat_id=id)
+                    .all()
+                }
+
+            message_list = []
+            chat_messages_map = None
+            while message_id:
+                message = messages_map.get(message_id)
+                if message is None:
+                    if chat_messages_map is None:
+                        chat = db.get(Chat, id)
+                        chat_messages_map = (
+                            (chat.chat or {}).get("history", {}).get("messages", {})
+                            if chat
+                            else {}
+                        ) or {}
+                    message = chat_messages_map.get(message_id)
+                if message is None:
+                    break
+
+                message_list.insert(0, message)
+                message_id = message.get("parentId")
+
+            return message_list
+
+    def upsert_message_to_chat_by_id_and_message_id(
+        self, id: str, message_id: str, message: dict
+    ) -> bool:
         # Sanitize message content for null characters before upserting
         if isinstance(message.get("content"), str):
             message["content"] = message["content"].replace("\x00", "")
 
+        if ENABLE_CHAT_MESSAGE_TABLE:
+            return self._update_chat_message(
+                id,
+                message_id,
+                lambda existing: {**existing, **message},
+                set_current=True,
+            )
+
+        try:
+            if self._patch_message_to_chat_by_id_and_message_id(
+                id, message_id, message
+            ):
+                return True
+        except Exception as e:
+            log.debug(f"Partial message update failed, rewriting the chat: {e}")
+
+        chat = self.get_chat_by_id(id)
+        if chat is None:
+            return False
+
         chat = chat.chat
         history = chat.get("history", {})
 
@@ -277,14 +977,32 @@ class ChatTable:
         history["currentId"] = message_id
 
         chat["history"] = history
-        return self.update_chat_by_id(id, chat)
+        return self.update_chat_by_id(id, chat) is not None
 
     def add_message_status_to_chat_by_id_and_message_id(
         self, id: str, message_id: str, status: dict
-    ) -> Optional[ChatModel]:
+    ) -> bool:
+        if ENABLE_CHAT_MESSAGE_TABLE:
+            return self._update_chat_message(
+                id,
+                message_id,
+                lambda existing: {
+                    **existing,
+                    "statusHistory": [*existing.get("statusHistory", []), status],
+                },
+            )
+
+        try:
+            if self._patch_message_status_to_chat_by_id_and_message_id(
+                id, message_id, status
+            ):
+                return True
+        except Exception as e:
+            log.debug(f"Partial message status update failed, rewriting the chat: {e}")
+
         chat = self.get_chat_by_id(id)
         if chat is None:
-            return None
+            return False
 
         chat = chat.chat
         history = chat.get("history", {})
@@ -295,7 +1013,7 @@ class ChatTable:
             history["messages"][message_id]["statusHistory"] = status_history
 
         chat["history"] = history
-        return self.update_chat_by_id(id, chat)
+        return self.update_chat_by_id(id, chat) is not None
 
     def insert_shared_chat_by_chat_id(self, chat_id: str) -> Optional[ChatModel]:
         with get_db() as db:
@@ -310,7 +1028,7 @@ class ChatTable:
                     "id": str(uuid.uuid4()),
                     "user_id": f"shared-{chat_id}",
                     "title": chat.title,
-                    "chat": chat.chat,
+                    "chat": self._merge_chat_messages(db, chat_id, chat.chat),
                     "meta": chat.meta,
                     "pinned": chat.pinned,
                     "folder_id": chat.folder_id,
@@ -344,7 +1062,7 @@ class ChatTable:
                     return self.insert_shared_chat_by_chat_id(chat_id)
 
                 shared_chat.title = chat.title
-                shared_chat.chat = chat.chat
+                shared_chat.chat = self._merge_chat_messages(db, chat_id, chat.chat)
                 shared_chat.meta = chat.meta
                 shared_chat.pinned = chat.pinned
                 shared_chat.folder_id = chat.folder_id
@@ -384,7 +1102,9 @@ class ChatTable:
                 chat.share_id = share_id
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                chat = ChatModel.model_validate(chat)
+                chat.chat = self._merge_chat_messages(db, id, chat.chat)
+                return chat
         except Exception:
             return None
 
@@ -396,7 +1116,9 @@ class ChatTable:
                 chat.updated_at = int(time.time())
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                chat = ChatModel.model_validate(chat)
+                chat.chat = self._merge_chat_messages(db, id, chat.chat)
+                return chat
         except Exception:
             return None
 
@@ -408,7 +1130,9 @@ class ChatTable:
                 chat.updated_at = int(time.time())
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                chat = ChatModel.model_validate(chat)
+                chat.chat = self._merge_chat_messages(db, id, chat.chat)
+                return chat
         except Exception:
             return None
 
@@ -427,11 +1151,17 @@ class ChatTable:
         filter: Optional[dict] = None,
         skip: int = 0,
         limit: int = 50,
-    ) -> list[ChatModel]:
+        cursor: Optional[tuple] = None,
+    ) -> list[ChatListModel]:
 
         with get_db() as db:
-            query = db.query(Chat).filter_by(user_id=user_id, archived=True)
+            query = (
+                db.query(Chat)
+                .options(defer(Chat.chat))
+                .filter_by(user_id=user_id, archived=True)
+            )
 
+            order_column, descending = Chat.updated_at, True
             if filter:
                 query_key = filter.get("query")
                 if query_key:
@@ -441,22 +1171,25 @@ class ChatTable:
                 direction = filter.get("direction")
 
                 if order_by and direction and getattr(Chat, order_by):
+                    order_column = getattr(Chat, order_by)
                     if direction.lower() == "asc":
-                        query = query.order_by(getattr(Chat, order_by).asc())
+                        descending = False
                     elif direction.lower() == "desc":
-                        query = query.order_by(getattr(Chat, order_by).desc())
+                        descending = True
                     else:
                         raise ValueError("Invalid direction for ordering")
-            else:
-                query = query.order_by(Chat.updated_at.desc())
 
-            if skip:
+            query = apply_keyset_pagination(
+                query, order_column, Chat.id, cursor, descending
+            )
+
+            if skip and cursor is None:
                 query = query.offset(skip)
             if limit:
                 query = query.limit(limit)
 
             all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return [ChatListModel.model_validate(chat) for chat in all_chats]
 
     def get_chat_list_by_user_id(
         self,
@@ -465,12 +1198,14 @@ class ChatTable:
         filter: Optional[dict] = None,
         skip: int = 0,
         limit: int = 50,
-    ) -> list[ChatModel]:
+        cursor: Optional[tuple] = None,
+    ) -> list[ChatListModel]:
         with get_db() as db:
-            query = db.query(Chat).filter_by(user_id=user_id)
+            query = db.query(Chat).options(defer(Chat.chat)).filter_by(user_id=user_id)
             if not include_archived:
                 query = query.filter_by(archived=False)
 
+            order_column, descending = Chat.updated_at, True
             if filter:
                 query_key = filter.get("query")
                 if query_key:
@@ -480,22 +1215,25 @@ class ChatTable:
                 direction = filter.get("direction")
 
                 if order_by and direction and getattr(Chat, order_by):
+                    order_column = getattr(Chat, order_by)
                     if direction.lower() == "asc":
-                        query = query.order_by(getattr(Chat, order_by).asc())
+                        descending = False
                     elif direction.lower() == "desc":
-                        query = query.order_by(getattr(Chat, order_by).desc())
+                        descending = True
                     else:
                         raise ValueError("Invalid direction for ordering")
-            else:
-                query = query.order_by(Chat.updated_at.desc())
 
-            if skip:
+            query = apply_keyset_pagination(
+                query, order_column, Chat.id, cursor, descending
+            )
+
+            if skip and cursor is None:
                 query = query.offset(skip)
             if limit:
                 query = query.limit(limit)
 
             all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return [ChatListModel.model_validate(chat) for chat in all_chats]
 
     def get_chat_title_id_list_by_user_id(
         self,
@@ -505,6 +1243,7 @@ class ChatTable:
         include_pinned: bool = False,
         skip: Optional[int] = None,
         limit: Optional[int] = None,
+        cursor: Optional[tuple[int, str]] = None,
     ) -> list[ChatTitleIdResponse]:
         with get_db() as db:
             query = db.query(Chat).filter_by(user_id=user_id)
@@ -518,11 +1257,11 @@ class ChatTable:
             if not include_archived:
                 query = query.filter_by(archived=False)
 
-            query = query.order_by(Chat.updated_at.desc()).with_entities(
-                Chat.id, Chat.title, Chat.updated_at, Chat.created_at
-            )
+            query = apply_keyset_pagination(
+                query, Chat.updated_at, Chat.id, cursor
+            ).with_entities(Chat.id, Chat.title, Chat.updated_at, Chat.created_at)
 
-            if skip:
+            if skip and cursor is None:
                 query = query.offset(skip)
             if limit:
                 query = query.limit(limit)
@@ -544,22 +1283,25 @@ class ChatTable:
 
     def get_chat_list_by_chat_ids(
         self, chat_ids: list[str], skip: int = 0, limit: int = 50
-    ) -> list[ChatModel]:
+    ) -> list[ChatListModel]:
         with get_db() as db:
             all_chats = (
                 db.query(Chat)
+                .options(defer(Chat.chat))
                 .filter(Chat.id.in_(chat_ids))
                 .filter_by(archived=False)
                 .order_by(Chat.updated_at.desc())
                 .all()
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return [ChatListModel.model_validate(chat) for chat in all_chats]
 
     def get_chat_by_id(self, id: str) -> Optional[ChatModel]:
         try:
             with get_db() as db:
                 chat = db.get(Chat, id)
-                return ChatModel.model_validate(chat)
+                chat = ChatModel.model_validate(chat)
+                chat.chat = self._merge_chat_messages(db, id, chat.chat)
+                return chat
         except Exception:
             return None
 
@@ -581,7 +1323,9 @@ class ChatTable:
         try:
             with get_db() as db:
                 chat = db.query(Chat).filter_by(id=id, user_id=user_id).first()
-                return ChatModel.model_validate(chat)
+                chat = ChatModel.model_validate(chat)
+                chat.chat = self._merge_chat_messages(db, id, chat.chat)
+                return chat
         except Exception:
             return None
 
@@ -592,7 +1336,37 @@ class ChatTable:
                 # .limit(limit).offset(skip)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._get_chat_models(db, all_chats)
+
+    def iter_chats(
+        self,
+        user_id: Optional[str] = None,
+        archived: Optional[bool] = None,
+        batch_size: int = CHAT_EXPORT_BATCH_SIZE,
+    ) -> Iterator[ChatModel]:
+        """
+        Yields chats most recently updated first, fetching batch_size rows at a time
+        with keyset pagination so exports never hold every chat in memory. Each
+        batch uses its own session, none is held while the chats are sent.
+        """
+        cursor = None
+        while True:
+            with get_db() as db:
+                query = db.query(Chat)
+                if user_id is not None:
+                    query = query.filter_by(user_id=user_id)
+                if archived is not None:
+                    query = query.filter_by(archived=archived)
+
+                query = apply_keyset_pagination(
+                    query, Chat.updated_at, Chat.id, cursor
+                ).limit(batch_size)
+                chats = self._get_chat_models(db, query.all())
+
+            yield from chats
+            if len(chats) < batch_size:
+                return
+            cursor = (chats[-1].updated_at, chats[-1].id)
 
     def get_chats_by_user_id(self, user_id: str) -> list[ChatModel]:
         with get_db() as db:
@@ -601,16 +1375,17 @@ class ChatTable:
                 .filter_by(user_id=user_id)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._get_chat_models(db, all_chats)
 
-    def get_pinned_chats_by_user_id(self, user_id: str) -> list[ChatModel]:
+    def get_pinned_chats_by_user_id(self, user_id: str) -> list[ChatListModel]:
         with get_db() as db:
             all_chats = (
                 db.query(Chat)
+                .options(defer(Chat.chat))
                 .filter_by(user_id=user_id, pinned=True, archived=False)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return [ChatListModel.model_validate(chat) for chat in all_chats]
 
     def get_archived_chats_by_user_id(self, user_id: str) -> list[ChatModel]:
         with get_db() as db:
@@ -619,7 +1394,7 @@ class ChatTable:
                 .filter_by(user_id=user_id, archived=True)
                 .order_by(Chat.updated_at.desc())
             )
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._get_chat_models(db, all_chats)
 
     def get_chats_by_user_id_and_search_text(
         self,
@@ -628,7 +1403,7 @@ class ChatTable:
         include_archived: bool = False,
         skip: int = 0,
         limit: int = 60,
-    ) -> list[ChatModel]:
+    ) -> list[ChatListModel]:
         """
         Filters chats based on a search query using Python, allowing pagination using skip and limit.
         """
@@ -692,7 +1467,9 @@ class ChatTable:
         search_text = " ".join(search_text_words)
 
         with get_db() as db:
-            query = db.query(Chat).filter(Chat.user_id == user_id)
+            query = (
+                db.query(Chat).options(defer(Chat.chat)).filter(Chat.user_id == user_id)
+            )
 
             if is_archived is not None:
                 query = query.filter(Chat.archived == is_archived)
@@ -711,7 +1488,18 @@ class ChatTable:
             if folder_ids:
                 query = query.filter(Chat.folder_id.in_(folder_ids))
 
-            query = query.order_by(Chat.updated_at.desc())
+            # Ranked matches from the full-text index when it is available
+            search_match = (
+                self._get_chat_search_subquery(db, user_id, search_text)
+                if search_text
+                else None
+            )
+            if search_match is not None:
+                query = query.join(
+                    search_match, search_match.c.chat_id == Chat.id
+                ).order_by(search_match.c.rank.desc(), Chat.updated_at.desc())
+            else:
+                query = query.order_by(Chat.updated_at.desc())
 
             # Check if the database dialect is either 'sqlite' or 'postgresql'
             dialect_name = db.bind.dialect.name
@@ -725,11 +1513,13 @@ class ChatTable:
                     ")"
                 )
                 sqlite_content_clause = text(sqlite_content_sql)
-                query = query.filter(
-                    or_(
-                        Chat.title.ilike(bindparam("title_key")), sqlite_content_clause
-                    ).params(title_key=f"%{search_text}%", content_key=search_text)
-                )
+                if search_match is None:
+                    query = query.filter(
+                        or_(
+                            Chat.title.ilike(bindparam("title_key")),
+                            sqlite_content_clause,
+                        ).params(title_key=f"%{search_text}%", content_key=search_text)
+                    )
 
                 # Check if there are any tags to filter, it should have all the tags
                 if "none" in tag_ids:
@@ -771,12 +1561,13 @@ class ChatTable:
                     ")"
                 )
                 postgres_content_clause = text(postgres_content_sql)
-                query = query.filter(
-                    or_(
-                        Chat.title.ilike(bindparam("title_key")),
-                        postgres_content_clause,
-                    ).params(title_key=f"%{search_text}%", content_key=search_text)
-                )
+                if search_match is None:
+                    query = query.filter(
+                        or_(
+                            Chat.title.ilike(bindparam("title_key")),
+                            postgres_content_clause,
+                        ).params(title_key=f"%{search_text}%", content_key=search_text)
+                    )
 
                 # Check if there are any tags to filter, it should have all the tags
                 if "none" in tag_ids:
@@ -818,13 +1609,17 @@ class ChatTable:
             log.info(f"The number of chats: {len(all_chats)}")
 
             # Validate and return chats
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return [ChatListModel.model_validate(chat) for chat in all_chats]
 
     def get_chats_by_folder_id_and_user_id(
         self, folder_id: str, user_id: str, skip: int = 0, limit: int = 60
-    ) -> list[ChatModel]:
+    ) -> list[ChatListModel]:
         with get_db() as db:
-            query = db.query(Chat).filter_by(folder_id=folder_id, user_id=user_id)
+            query = (
+                db.query(Chat)
+                .options(defer(Chat.chat))
+                .filter_by(folder_id=folder_id, user_id=user_id)
+            )
             query = query.filter(or_(Chat.pinned == False, Chat.pinned == None))
             query = query.filter_by(archived=False)
 
@@ -836,7 +1631,7 @@ class ChatTable:
                 query = query.limit(limit)
 
             all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return [ChatListModel.model_validate(chat) for chat in all_chats]
 
     def get_chats_by_folder_ids_and_user_id(
         self, folder_ids: list[str], user_id: str
@@ -851,7 +1646,7 @@ class ChatTable:
             query = query.order_by(Chat.updated_at.desc())
 
             all_chats = query.all()
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return self._get_chat_models(db, all_chats)
 
     def update_chat_folder_id_by_id_and_user_id(
         self, id: str, user_id: str, folder_id: str
@@ -864,7 +1659,9 @@ class ChatTable:
                 chat.pinned = False
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                chat = ChatModel.model_validate(chat)
+                chat.chat = self._merge_chat_messages(db, id, chat.chat)
+                return chat
         except Exception:
             return None
 
@@ -876,9 +1673,9 @@ class ChatTable:
 
     def get_chat_list_by_user_id_and_tag_name(
         self, user_id: str, tag_name: str, skip: int = 0, limit: int = 50
-    ) -> list[ChatModel]:
+    ) -> list[ChatListModel]:
         with get_db() as db:
-            query = db.query(Chat).filter_by(user_id=user_id)
+            query = db.query(Chat).options(defer(Chat.chat)).filter_by(user_id=user_id)
             tag_id = tag_name.replace(" ", "_").lower()
 
             log.info(f"DB dialect name: {db.bind.dialect.name}")
@@ -903,7 +1700,7 @@ class ChatTable:
 
             all_chats = query.all()
             log.debug(f"all_chats: {all_chats}")
-            return [ChatModel.model_validate(chat) for chat in all_chats]
+            return [ChatListModel.model_validate(chat) for chat in all_chats]
 
     def add_chat_tag_by_id_and_user_id_and_tag_name(
         self, id: str, user_id: str, tag_name: str
@@ -924,7 +1721,9 @@ class ChatTable:
 
                 db.commit()
                 db.refresh(chat)
-                return ChatModel.model_validate(chat)
+                chat = ChatModel.model_validate(chat)
+                chat.chat = self._merge_chat_messages(db, id, chat.chat)
+                return chat
         except Exception:
             return None
 
@@ -1011,6 +1810,8 @@ class ChatTable:
         try:
             with get_db() as db:
                 db.query(Chat).filter_by(id=id).delete()
+                self._delete_chat_messages(db, [id])
+                self._delete_chat_search(db, [id])
                 db.commit()
 
                 return True and self.delete_shared_chat_by_chat_id(id)
@@ -1020,7 +1821,10 @@ class ChatTable:
     def delete_chat_by_id_and_user_id(self, id: str, user_id: str) -> bool:
         try:
             with get_db() as db:
-                db.query(Chat).filter_by(id=id, user_id=user_id).delete()
+                deleted = db.query(Chat).filter_by(id=id, user_id=user_id).delete()
+                if deleted:
+                    self._delete_chat_messages(db, [id])
+                    self._delete_chat_search(db, [id])
                 db.commit()
 
                 return True and self.delete_shared_chat_by_chat_id(id)
@@ -1032,6 +1836,10 @@ class ChatTable:
             with get_db() as db:
                 self.delete_shared_chats_by_user_id(user_id)
 
+                self._delete_chat_messages(
+                    db, select(Chat.id).filter_by(user_id=user_id)
+                )
+                self._delete_chat_search(db, select(Chat.id).filter_by(user_id=user_id))
                 db.query(Chat).filter_by(user_id=user_id).delete()
                 db.commit()
 
@@ -1044,6 +1852,12 @@ class ChatTable:
     ) -> bool:
         try:
             with get_db() as db:
+                self._delete_chat_messages(
+                    db, select(Chat.id).filter_by(user_id=user_id, folder_id=folder_id)
+                )
+                self._delete_chat_search(
+                    db, select(Chat.id).filter_by(user_id=user_id, folder_id=folder_id)
+                )
                 db.query(Chat).filter_by(user_id=user_id, folder_id=folder_id).delete()
                 db.commit()
 
@@ -2,7 +2,7 @@ import logging
 import time
 from typing import Optional
 
-from open_webui.internal.db import Base, JSONField, get_db
+from open_webui.internal.db import Base, CompressedJSONField, JSONField, get_db
 from open_webui.env import SRC_LOG_LEVELS
 from pydantic import BaseModel, ConfigDict
 from sqlalchemy import BigInteger, Column, String, Text, JSON
@@ -24,7 +24,7 @@ class File(Base):
     filename = Column(Text)
     path = Column(Text, nullable=True)
 
-    data = Column(JSON, nullable=True)
+    data = Column(CompressedJSONField, nullable=True)
     meta = Column(JSON, nullable=True)
 
     access_control = Column(JSON, nullable=True)
@@ -4,7 +4,8 @@ from typing import Optional
 
 from open_webui.internal.db import Base, JSONField, get_db
 from open_webui.models.users import Users, UserModel
-from open_webui.env import SRC_LOG_LEVELS
+from open_webui.utils.cache import VersionStamp, get_table_fingerprint
+from open_webui.env import MODEL_REGISTRY_CACHE_TTL, SRC_LOG_LEVELS
 from pydantic import BaseModel, ConfigDict
 from sqlalchemy import BigInteger, Boolean, Column, String, Text, Index
 
@@ -104,6 +105,16 @@ class FunctionValves(BaseModel):
 
 
 class FunctionsTable:
+    def __init__(self):
+        # Changes whenever a function is added, updated or removed on any instance
+        self.version = VersionStamp(
+            "functions_version", MODEL_REGISTRY_CACHE_TTL, self._get_fingerprint
+        )
+
+    def _get_fingerprint(self):
+        with get_db() as db:
+            return get_table_fingerprint(db, Function)
+
     def insert_new_function(
         self, user_id: str, type: str, form_data: FunctionForm
     ) -> Optional[FunctionModel]:
@@ -122,6 +133,7 @@ class FunctionsTable:
                 result = Function(**function.model_dump())
                 db.add(result)
                 db.commit()
+                self.version.bump()
                 db.refresh(result)
                 if result:
                     return FunctionModel.model_validate(result)
@@ -170,6 +182,7 @@ class FunctionsTable:
                         db.delete(func)
 
                 db.commit()
+                self.version.bump()
 
                 return [
                     FunctionModel.model_validate(func)
@@ -302,6 +315,7 @@ class FunctionsTable:
 
                     function.updated_at = int(time.time())
                     db.commit()
+                    self.version.bump()
                     db.refresh(function)
                     return self.get_function_by_id(id)
                 else:
@@ -363,6 +377,7 @@ class FunctionsTable:
                     }
                 )
                 db.commit()
+                self.version.bump()
                 return self.get_function_by_id(id)
             except Exception:
                 return None
@@ -377,6 +392,7 @@ class FunctionsTable:
                     }
                 )
                 db.commit()
+                self.version.bump()
                 return True
             except Exception:
                 return None
@@ -386,6 +402,7 @@ class FunctionsTable:
             try:
                 db.query(Function).filter_by(id=id).delete()
                 db.commit()
+                self.version.bump()
 
                 return True
             except Exception:
@@ -5,13 +5,18 @@ from typing import Optional
 import uuid
 
 from open_webui.internal.db import Base, get_db
-from open_webui.env import SRC_LOG_LEVELS
+from open_webui.env import (
+    AUTH_PERMISSIONS_CACHE_TTL,
+    AUTH_USER_CACHE_SIZE,
+    SRC_LOG_LEVELS,
+)
 
 from open_webui.models.files import FileMetadataResponse
+from open_webui.utils.cache import LocalCache
 
 
 from pydantic import BaseModel, ConfigDict
-from sqlalchemy import BigInteger, Column, String, Text, JSON, func
+from sqlalchemy import BigInteger, Column, Index, Text, JSON
 
 
 log = logging.getLogger(__name__)
@@ -35,12 +40,22 @@ class Group(Base):
     meta = Column(JSON, nullable=True)
 
     permissions = Column(JSON, nullable=True)
-    user_ids = Column(JSON, nullable=True)
 
     created_at = Column(BigInteger)
     updated_at = Column(BigInteger)
 
 
+class GroupMember(Base):
+    __tablename__ = "group_member"
+
+    group_id = Column(Text, primary_key=True)
+    user_id = Column(Text, primary_key=True)
+
+    created_at = Column(BigInteger)
+
+    __table_args__ = (Index("group_member_user_id_idx", "user_id"),)
+
+
 class GroupModel(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     id: str
@@ -59,6 +74,13 @@ class GroupModel(BaseModel):
     updated_at: int  # timestamp in epoch
 
 
+class GroupAccessModel(BaseModel):
+    """Groups of a user and their permissions, shared by cache readers and read-only."""
+
+    group_ids: frozenset[str] = frozenset()
+    permissions: list[dict] = []
+
+
 ####################
 # Forms
 ####################
@@ -92,6 +114,58 @@ class GroupUpdateForm(GroupForm, UserIdsForm):
 
 
 class GroupTable:
+    def __init__(self):
+        # GroupAccessModel by user id, evicted on any group or membership change
+        self._access_cache = LocalCache(
+            "group_access", AUTH_PERMISSIONS_CACHE_TTL, AUTH_USER_CACHE_SIZE
+        )
+        # Bumped on every change made by this instance, lets callers holding on to
+        # a GroupAccessModel, e.g. for the duration of a request, detect it
+        self.access_version = 0
+
+    def _get_member_ids(self, db, group_ids: list[str]) -> dict[str, list[str]]:
+        member_ids = {group_id: [] for group_id in group_ids}
+        if group_ids:
+            for group_id, user_id in (
+                db.query(GroupMember.group_id, GroupMember.user_id)
+                .filter(GroupMember.group_id.in_(group_ids))
+                .all()
+            ):
+                member_ids[group_id].append(user_id)
+        return member_ids
+
+    def _to_group_models(self, db, groups: list[Group]) -> list[GroupModel]:
+        member_ids = self._get_member_ids(db, [group.id for group in groups])
+        return [
+            GroupModel.model_validate(
+                {
+                    **{c.name: getattr(group, c.name) for c in Group.__table__.columns},
+                    "user_ids": member_ids[group.id],
+                }
+            )
+            for group in groups
+        ]
+
+    def _set_member_ids(self, db, id: str, user_ids: list[str]) -> None:
+        current_ids = {
+            user_id
+            for (user_id,) in db.query(GroupMember.user_id).filter_by(group_id=id)
+        }
+        new_ids = set(user_ids)
+
+        removed_ids = current_ids - new_ids
+        if removed_ids:
+            db.query(GroupMember).filter(
+                GroupMember.group_id == id, GroupMember.user_id.in_(removed_ids)
+            ).delete(synchronize_session=False)
+
+        now = int(time.time())
+        db.add_all(
+            GroupMember(group_id=id, user_id=user_id, created_at=now)
+            for user_id in dict.fromkeys(user_ids)
+            if user_id not in current_ids
+        )
+
     def insert_new_group(
         self, user_id: str, form_data: GroupForm
     ) -> Optional[GroupModel]:
@@ -107,12 +181,12 @@ class GroupTable:
             )
 
             try:
-                result = Group(**group.model_dump())
+                result = Group(**group.model_dump(exclude={"user_ids"}))
                 db.add(result)
                 db.commit()
                 db.refresh(result)
                 if result:
-                    return GroupModel.model_validate(result)
+                    return self._to_group_models(db, [result])[0]
                 else:
                     return None
 
@@ -121,40 +195,59 @@ class GroupTable:
 
     def get_groups(self) -> list[GroupModel]:
         with get_db() as db:
-            return [
-                GroupModel.model_validate(group)
-                for group in db.query(Group).order_by(Group.updated_at.desc()).all()
-            ]
+            return self._to_group_models(
+                db, db.query(Group).order_by(Group.updated_at.desc()).all()
+            )
 
     def get_groups_by_member_id(self, user_id: str) -> list[GroupModel]:
         with get_db() as db:
-            return [
-                GroupModel.model_validate(group)
-                for group in db.query(Group)
-                .filter(
-                    func.json_array_length(Group.user_ids) > 0
-                )  # Ensure array exists
-                .filter(
-                    Group.user_ids.cast(String).like(f'%"{user_id}"%')
-                )  # String-based check
+            return self._to_group_models(
+                db,
+                db.query(Group)
+                .join(GroupMember, GroupMember.group_id == Group.id)
+                .filter(GroupMember.user_id == user_id)
                 .order_by(Group.updated_at.desc())
-                .all()
-            ]
+                .all(),
+            )
+
+    def get_group_ids_by_member_id(self, user_id: str) -> list[str]:
+        return list(self.get_group_access_by_member_id(user_id).group_ids)
+
+    def get_group_access_by_member_id(self, user_id: str) -> GroupAccessModel:
+        access = self._access_cache.get(user_id)
+        if access is None:
+            with get_db() as db:
+                groups = (
+                    db.query(Group.id, Group.permissions)
+                    .join(GroupMember, GroupMember.group_id == Group.id)
+                    .filter(GroupMember.user_id == user_id)
+                    .all()
+                )
+            access = GroupAccessModel(
+                group_ids=frozenset(group_id for group_id, _ in groups),
+                permissions=[permissions or {} for _, permissions in groups],
+            )
+            self._access_cache.set(user_id, access)
+        return access
+
+    def invalidate_group_access(self, user_id: Optional[str] = None) -> None:
+        """Evict the cached access of user_id, or of every user, on all instances."""
+        self.access_version += 1
+        self._access_cache.invalidate(user_id)
 
     def get_group_by_id(self, id: str) -> Optional[GroupModel]:
         try:
             with get_db() as db:
                 group = db.query(Group).filter_by(id=id).first()
-                return GroupModel.model_validate(group) if group else None
+                return self._to_group_models(db, [group])[0] if group else None
         except Exception:
             return None
 
-    def get_group_user_ids_by_id(self, id: str) -> Optional[str]:
-        group = self.get_group_by_id(id)
-        if group:
-            return group.user_ids
-        else:
-            return None
+    def get_group_user_ids_by_id(self, id: str) -> Optional[list[str]]:
+        with get_db() as db:
+            if db.query(Group.id).filter_by(id=id).first() is None:
+                return None
+            return self._get_member_ids(db, [id])[id]
 
     def update_group_by_id(
         self, id: str, form_data: GroupUpdateForm, overwrite: bool = False
@@ -163,11 +256,14 @@ class GroupTable:
             with get_db() as db:
                 db.query(Group).filter_by(id=id).update(
                     {
-                        **form_data.model_dump(exclude_none=True),
+                        **form_data.model_dump(exclude_none=True, exclude={"user_ids"}),
                         "updated_at": int(time.time()),
                     }
                 )
+                if form_data.user_ids is not None:
+                    self._set_member_ids(db, id, form_data.user_ids)
                 db.commit()
+                self.invalidate_group_access()
                 return self.get_group_by_id(id=id)
         except Exception as e:
             log.exception(e)
@@ -176,8 +272,10 @@ class GroupTable:
     def delete_group_by_id(self, id: str) -> bool:
         try:
             with get_db() as db:
+                db.query(GroupMember).filter_by(group_id=id).delete()
                 db.query(Group).filter_by(id=id).delete()
                 db.commit()
+                self.invalidate_group_access()
                 return True
         except Exception:
             return False
@@ -185,8 +283,10 @@ class GroupTable:
     def delete_all_groups(self) -> bool:
         with get_db() as db:
             try:
+                db.query(GroupMember).delete()
                 db.query(Group).delete()
                 db.commit()
+                self.invalidate_group_access()
 
                 return True
             except Exception:
@@ -195,17 +295,19 @@ class GroupTable:
     def remove_user_from_all_groups(self, user_id: str) -> bool:
         with get_db() as db:
             try:
-                groups = self.get_groups_by_member_id(user_id)
-
-                for group in groups:
-                    group.user_ids.remove(user_id)
-                    db.query(Group).filter_by(id=group.id).update(
-                        {
-                            "user_ids": group.user_ids,
-                            "updated_at": int(time.time()),
-                        }
+                group_ids = [
+                    group_id
+                    for (group_id,) in db.query(GroupMember.group_id).filter_by(
+                        user_id=user_id
+                    )
+                ]
+                if group_ids:
+                    db.query(GroupMember).filter_by(user_id=user_id).delete()
+                    db.query(Group).filter(Group.id.in_(group_ids)).update(
+                        {"updated_at": int(time.time())}, synchronize_session=False
                     )
                     db.commit()
+                    self.invalidate_group_access(user_id)
 
                 return True
             except Exception:
@@ -233,11 +335,11 @@ class GroupTable:
                         updated_at=int(time.time()),
                     )
                     try:
-                        result = Group(**new_group.model_dump())
+                        result = Group(**new_group.model_dump(exclude={"user_ids"}))
                         db.add(result)
                         db.commit()
                         db.refresh(result)
-                        new_groups.append(GroupModel.model_validate(result))
+                        new_groups.append(new_group)
                     except Exception as e:
                         log.exception(e)
                         continue
@@ -246,34 +348,43 @@ class GroupTable:
     def sync_groups_by_group_names(self, user_id: str, group_names: list[str]) -> bool:
         with get_db() as db:
             try:
-                groups = db.query(Group).filter(Group.name.in_(group_names)).all()
-                group_ids = [group.id for group in groups]
+                group_ids = {
+                    group_id
+                    for (group_id,) in db.query(Group.id).filter(
+                        Group.name.in_(group_names)
+                    )
+                }
+                existing_group_ids = {
+                    group_id
+                    for (group_id,) in db.query(GroupMember.group_id).filter_by(
+                        user_id=user_id
+                    )
+                }
 
                 # Remove user from groups not in the new list
-                existing_groups = self.get_groups_by_member_id(user_id)
-
-                for group in existing_groups:
-                    if group.id not in group_ids:
-                        group.user_ids.remove(user_id)
-                        db.query(Group).filter_by(id=group.id).update(
-                            {
-                                "user_ids": group.user_ids,
-                                "updated_at": int(time.time()),
-                            }
-                        )
+                removed_group_ids = existing_group_ids - group_ids
+                if removed_group_ids:
+                    db.query(GroupMember).filter(
+                        GroupMember.user_id == user_id,
+                        GroupMember.group_id.in_(removed_group_ids),
+                    ).delete(synchronize_session=False)
 
                 # Add user to new groups
-                for group in groups:
-                    if user_id not in group.user_ids:
-                        group.user_ids.append(user_id)
-                        db.query(Group).filter_by(id=group.id).update(
-                            {
-                                "user_ids": group.user_ids,
-                                "updated_at": int(time.time()),
-                            }
-                        )
+                added_group_ids = group_ids - existing_group_ids
+                now = int(time.time())
+                db.add_all(
+                    GroupMember(group_id=group_id, user_id=user_id, created_at=now)
+                    for group_id in added_group_ids
+                )
+
+                changed_group_ids = removed_group_ids | added_group_ids
+                if changed_group_ids:
+                    db.query(Group).filter(Group.id.in_(changed_group_ids)).update(
+                        {"updated_at": now}, synchronize_session=False
+                    )
 
                 db.commit()
+                self.invalidate_group_access(user_id)
                 return True
             except Exception as e:
                 log.exception(e)
@@ -288,21 +399,20 @@ class GroupTable:
                 if not group:
                     return None
 
-                group_user_ids = group.user_ids
-                if not group_user_ids or not isinstance(group_user_ids, list):
-                    group_user_ids = []
+                existing_ids = set(self._get_member_ids(db, [id])[id])
 
-                group_user_ids = list(set(group_user_ids))  # Deduplicate
-
-                for user_id in user_ids:
-                    if user_id not in group_user_ids:
-                        group_user_ids.append(user_id)
+                now = int(time.time())
+                db.add_all(
+                    GroupMember(group_id=id, user_id=user_id, created_at=now)
+                    for user_id in dict.fromkeys(user_ids or [])
+                    if user_id not in existing_ids
+                )
 
-                group.user_ids = group_user_ids
-                group.updated_at = int(time.time())
+                group.updated_at = now
                 db.commit()
+                self.invalidate_group_access()
                 db.refresh(group)
-                return GroupModel.model_validate(group)
+                return self._to_group_models(db, [group])[0]
         except Exception as e:
             log.exception(e)
             return None
@@ -316,23 +426,17 @@ class GroupTable:
                 if not group:
                     return None
 
-                group_user_ids = group.user_ids
-
-                if not group_user_ids or not isinstance(group_user_ids, list):
-                    return GroupModel.model_validate(group)
-
-                group_user_ids = list(set(group_user_ids))  # Deduplicate
-
-                for user_id in user_ids:
-                    if user_id in group_user_ids:
-                        group_user_ids.remove(user_id)
+                if user_ids:
+                    db.query(GroupMember).filter(
+                        GroupMember.group_id == id, GroupMember.user_id.in_(user_ids)
+                    ).delete(synchronize_session=False)
 
-                group.user_ids = group_user_ids
                 group.updated_at = int(time.time())
 
                 db.commit()
+                self.invalidate_group_access()
                 db.refresh(group)
-                return GroupModel.model_validate(group)
+                return self._to_group_models(db, [group])[0]
         except Exception as e:
             log.exception(e)
             return None
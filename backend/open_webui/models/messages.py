@@ -3,13 +3,13 @@ import time
 import uuid
 from typing import Optional
 
-from open_webui.internal.db import Base, get_db
+from open_webui.internal.db import Base, CompressedJSONField, get_db
 from open_webui.models.tags import TagModel, Tag, Tags
 from open_webui.models.users import Users, UserNameResponse
-
+from open_webui.utils.pagination import apply_keyset_pagination
 
 from pydantic import BaseModel, ConfigDict
-from sqlalchemy import BigInteger, Boolean, Column, String, Text, JSON
+from sqlalchemy import BigInteger, Boolean, Column, String, Text, JSON, Index
 from sqlalchemy import or_, func, select, and_, text
 from sqlalchemy.sql import exists
 
@@ -48,12 +48,23 @@ class Message(Base):
     parent_id = Column(Text, nullable=True)
 
     content = Column(Text)
-    data = Column(JSON, nullable=True)
+    data = Column(CompressedJSONField, nullable=True)
     meta = Column(JSON, nullable=True)
 
     created_at = Column(BigInteger)  # time_ns
     updated_at = Column(BigInteger)  # time_ns
 
+    __table_args__ = (
+        # WHERE channel_id = ... AND parent_id = ... ORDER BY created_at DESC, id DESC
+        Index(
+            "message_channel_id_parent_id_created_at_idx",
+            "channel_id",
+            "parent_id",
+            "created_at",
+            "id",
+        ),
+    )
+
 
 class MessageModel(BaseModel):
     model_config = ConfigDict(from_attributes=True)
@@ -204,17 +215,22 @@ class MessageTable:
             ]
 
     def get_messages_by_channel_id(
-        self, channel_id: str, skip: int = 0, limit: int = 50
+        self,
+        channel_id: str,
+        skip: int = 0,
+        limit: int = 50,
+        cursor: Optional[tuple[int, str]] = None,
     ) -> list[MessageReplyToResponse]:
         with get_db() as db:
-            all_messages = (
-                db.query(Message)
-                .filter_by(channel_id=channel_id, parent_id=None)
-                .order_by(Message.created_at.desc())
-                .offset(skip)
-                .limit(limit)
-                .all()
+            query = apply_keyset_pagination(
+                db.query(Message).filter_by(channel_id=channel_id, parent_id=None),
+                Message.created_at,
+                Message.id,
+                cursor,
             )
+            if skip and cursor is None:
+                query = query.offset(skip)
+            all_messages = query.limit(limit).all()
 
             messages = []
             for message in all_messages:
@@ -238,7 +254,12 @@ class MessageTable:
             return messages
 
     def get_messages_by_parent_id(
-        self, channel_id: str, parent_id: str, skip: int = 0, limit: int = 50
+        self,
+        channel_id: str,
+        parent_id: str,
+        skip: int = 0,
+        limit: int = 50,
+        cursor: Optional[tuple[int, str]] = None,
     ) -> list[MessageReplyToResponse]:
         with get_db() as db:
             message = db.get(Message, parent_id)
@@ -246,14 +267,15 @@ class MessageTable:
             if not message:
                 return []
 
-            all_messages = (
-                db.query(Message)
-                .filter_by(channel_id=channel_id, parent_id=parent_id)
-                .order_by(Message.created_at.desc())
-                .offset(skip)
-                .limit(limit)
-                .all()
+            query = apply_keyset_pagination(
+                db.query(Message).filter_by(channel_id=channel_id, parent_id=parent_id),
+                Message.created_at,
+                Message.id,
+                cursor,
             )
+            if skip and cursor is None:
+                query = query.offset(skip)
+            all_messages = query.limit(limit).all()
 
             # If length of all_messages is less than limit, then add the parent message
             if len(all_messages) < limit:
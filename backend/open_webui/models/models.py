@@ -3,7 +3,7 @@ import time
 from typing import Optional
 
 from open_webui.internal.db import Base, JSONField, get_db
-from open_webui.env import SRC_LOG_LEVELS
+from open_webui.env import MODEL_REGISTRY_CACHE_TTL, SRC_LOG_LEVELS
 
 from open_webui.models.groups import Groups
 from open_webui.models.users import Users, UserResponse
@@ -17,6 +17,7 @@ from sqlalchemy import BigInteger, Column, Text, JSON, Boolean
 
 
 from open_webui.utils.access_control import has_access
+from open_webui.utils.cache import LocalCache, VersionStamp, get_table_fingerprint
 
 
 log = logging.getLogger(__name__)
@@ -144,6 +145,21 @@ class ModelForm(BaseModel):
 
 
 class ModelsTable:
+    def __init__(self):
+        # Changes whenever a model is added, updated or removed on any instance
+        self.version = VersionStamp(
+            "models_version", MODEL_REGISTRY_CACHE_TTL, self._get_fingerprint
+        )
+
+        # (version, public ids, readable ids by group id, readable ids by user id)
+        self._access_index = None
+        # Readable model ids by version and group ids, shared by users in the same groups
+        self._readable_cache = LocalCache("readable_models", MODEL_REGISTRY_CACHE_TTL)
+
+    def _get_fingerprint(self):
+        with get_db() as db:
+            return get_table_fingerprint(db, Model)
+
     def insert_new_model(
         self, form_data: ModelForm, user_id: str
     ) -> Optional[ModelModel]:
@@ -160,6 +176,7 @@ class ModelsTable:
                 result = Model(**model.model_dump())
                 db.add(result)
                 db.commit()
+                self.version.bump()
                 db.refresh(result)
 
                 if result:
@@ -207,7 +224,7 @@ class ModelsTable:
         self, user_id: str, permission: str = "write"
     ) -> list[ModelUserResponse]:
         models = self.get_models()
-        user_group_ids = {group.id for group in Groups.get_groups_by_member_id(user_id)}
+        user_group_ids = set(Groups.get_group_ids_by_member_id(user_id))
         return [
             model
             for model in models
@@ -215,6 +232,52 @@ class ModelsTable:
             or has_access(user_id, permission, model.access_control, user_group_ids)
         ]
 
+    def _get_access_index(self):
+        version = self.version.get()
+
+        index = self._access_index
+        if index is None or index[0] != version:
+            public_ids = set()
+            ids_by_group = {}
+            ids_by_user = {}
+
+            with get_db() as db:
+                for id, user_id, access_control in db.query(
+                    Model.id, Model.user_id, Model.access_control
+                ):
+                    ids_by_user.setdefault(user_id, set()).add(id)
+
+                    if access_control is None:
+                        public_ids.add(id)
+                        continue
+
+                    read_access = access_control.get("read", {})
+                    for group_id in read_access.get("group_ids", []):
+                        ids_by_group.setdefault(group_id, set()).add(id)
+                    for permitted_user_id in read_access.get("user_ids", []):
+                        ids_by_user.setdefault(permitted_user_id, set()).add(id)
+
+            index = (version, public_ids, ids_by_group, ids_by_user)
+            self._access_index = index
+        return index
+
+    def get_readable_model_ids(
+        self, user_id: str, group_ids: frozenset[str]
+    ) -> frozenset[str]:
+        """Ids of the models the user owns or has read access to."""
+        version, public_ids, ids_by_group, ids_by_user = self._get_access_index()
+
+        readable_ids = self._readable_cache.get((version, group_ids))
+        if readable_ids is None:
+            readable_ids = set(public_ids)
+            for group_id in group_ids:
+                readable_ids.update(ids_by_group.get(group_id, ()))
+            readable_ids = frozenset(readable_ids)
+            self._readable_cache.set((version, group_ids), readable_ids)
+
+        user_ids = ids_by_user.get(user_id)
+        return readable_ids | user_ids if user_ids else readable_ids
+
     def get_model_by_id(self, id: str) -> Optional[ModelModel]:
         try:
             with get_db() as db:
@@ -235,6 +298,7 @@ class ModelsTable:
                     }
                 )
                 db.commit()
+                self.version.bump()
 
                 return self.get_model_by_id(id)
             except Exception:
@@ -247,9 +311,15 @@ class ModelsTable:
                 result = (
                     db.query(Model)
                     .filter_by(id=id)
-                    .update(model.model_dump(exclude={"id"}))
+                    .update(
+                        {
+                            **model.model_dump(exclude={"id"}),
+                            "updated_at": int(time.time()),
+                        }
+                    )
                 )
                 db.commit()
+                self.version.bump()
 
                 model = db.get(Model, id)
                 db.refresh(model)
@@ -263,6 +333,7 @@ class ModelsTable:
             with get_db() as db:
                 db.query(Model).filter_by(id=id).delete()
                 db.commit()
+                self.version.bump()
 
                 return True
         except Exception:
@@ -273,6 +344,7 @@ class ModelsTable:
             with get_db() as db:
                 db.query(Model).delete()
                 db.commit()
+                self.version.bump()
 
                 return True
         except Exception:
@@ -314,6 +386,7 @@ class ModelsTable:
                         db.delete(model)
 
                 db.commit()
+                self.version.bump()
 
                 return [
                     ModelModel.model_validate(model) for model in db.query(Model).all()
@@ -136,8 +136,7 @@ class NoteTable:
         limit: Optional[int] = None,
     ) -> list[NoteModel]:
         with get_db() as db:
-            user_groups = Groups.get_groups_by_member_id(user_id)
-            user_group_ids = {group.id for group in user_groups}
+            user_group_ids = set(Groups.get_group_ids_by_member_id(user_id))
 
             # Order newest-first. We stream to keep memory usage low.
             query = (
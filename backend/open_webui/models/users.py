@@ -1,21 +1,35 @@
+import asyncio
+import hashlib
+import logging
+import threading
 import time
 from typing import Optional
 
 from open_webui.internal.db import Base, JSONField, get_db
 
 
-from open_webui.env import DATABASE_USER_ACTIVE_STATUS_UPDATE_INTERVAL
+from open_webui.env import (
+    AUTH_USER_CACHE_SIZE,
+    AUTH_USER_CACHE_TTL,
+    DATABASE_USER_ACTIVE_STATUS_FLUSH_INTERVAL,
+    DATABASE_USER_ACTIVE_STATUS_UPDATE_INTERVAL,
+    SRC_LOG_LEVELS,
+)
 from open_webui.models.chats import Chats
 from open_webui.models.groups import Groups
+from open_webui.utils.cache import LocalCache
 from open_webui.utils.misc import throttle
 
 
 from pydantic import BaseModel, ConfigDict
 from sqlalchemy import BigInteger, Column, String, Text, Date
-from sqlalchemy import or_
+from sqlalchemy import or_, update, bindparam
 
 import datetime
 
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MODELS"])
+
 ####################
 # User DB Schema
 ####################
@@ -49,6 +63,26 @@ class User(Base):
     created_at = Column(BigInteger)
 
 
+class UserApiKey(Base):
+    __tablename__ = "api_key"
+
+    # SHA-256 of the key, keys themselves are only returned once on creation
+    id = Column(String, primary_key=True)
+    user_id = Column(String, nullable=False, unique=True)
+    # Masked key shown to the user, e.g. "sk-...9f2c"
+    hint = Column(String)
+
+    created_at = Column(BigInteger)
+
+
+def hash_api_key(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+def get_api_key_hint(api_key: str) -> str:
+    return f"{api_key[:3]}...{api_key[-4:]}"
+
+
 class UserSettings(BaseModel):
     ui: Optional[dict] = {}
     model_config = ConfigDict(extra="allow")
@@ -151,6 +185,20 @@ class UserUpdateForm(BaseModel):
 
 
 class UsersTable:
+    def __init__(self):
+        self._user_cache = LocalCache(
+            "users", AUTH_USER_CACHE_TTL, AUTH_USER_CACHE_SIZE
+        )
+
+        # User id by API key hash
+        self._api_key_cache = LocalCache(
+            "api_keys", AUTH_USER_CACHE_TTL, AUTH_USER_CACHE_SIZE
+        )
+
+        # Pending last active timestamps by user id
+        self._last_active: dict[str, int] = {}
+        self._last_active_lock = threading.Lock()
+
     def insert_new_user(
         self,
         id: str,
@@ -191,11 +239,36 @@ class UsersTable:
         except Exception:
             return None
 
+    def get_cached_user_by_id(self, id: str) -> Optional[UserModel]:
+        """
+        get_user_by_id served from a short-lived per-instance cache, used to resolve
+        the user of every authenticated request. Updates and deletions of the user
+        invalidate the entry.
+        """
+        user = self._user_cache.get(id)
+        if user is None:
+            user = self.get_user_by_id(id)
+            if user is None:
+                return None
+            self._user_cache.set(id, user)
+
+        # Callers may modify the returned model
+        return user.model_copy(deep=True)
+
     def get_user_by_api_key(self, api_key: str) -> Optional[UserModel]:
         try:
-            with get_db() as db:
-                user = db.query(User).filter_by(api_key=api_key).first()
-                return UserModel.model_validate(user)
+            key_hash = hash_api_key(api_key)
+
+            user_id = self._api_key_cache.get(key_hash)
+            if user_id is None:
+                with get_db() as db:
+                    api_key_item = db.get(UserApiKey, key_hash)
+                    if api_key_item is None:
+                        return None
+                    user_id = api_key_item.user_id
+                self._api_key_cache.set(key_hash, user_id)
+
+            return self.get_cached_user_by_id(user_id)
         except Exception:
             return None
 
@@ -327,6 +400,7 @@ class UsersTable:
             with get_db() as db:
                 db.query(User).filter_by(id=id).update({"role": role})
                 db.commit()
+                self._user_cache.invalidate(id)
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
         except Exception:
@@ -341,6 +415,7 @@ class UsersTable:
                     {"profile_image_url": profile_image_url}
                 )
                 db.commit()
+                self._user_cache.invalidate(id)
 
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
@@ -361,6 +436,48 @@ class UsersTable:
         except Exception:
             return None
 
+    def queue_user_last_active_by_id(self, id: str) -> None:
+        """
+        Record the user as active now without writing it, pending timestamps are
+        written by run_last_active_flush().
+        """
+        with self._last_active_lock:
+            self._last_active[id] = int(time.time())
+
+    def flush_user_last_active(self) -> None:
+        """Write the pending last active timestamps in a single batch."""
+        with self._last_active_lock:
+            if not self._last_active:
+                return
+            pending, self._last_active = self._last_active, {}
+
+        try:
+            with get_db() as db:
+                # Core executemany, users deleted in the meantime are skipped
+                db.execute(
+                    update(User.__table__)
+                    .where(User.__table__.c.id == bindparam("user_id"))
+                    .values(last_active_at=bindparam("timestamp")),
+                    [
+                        {"user_id": id, "timestamp": last_active_at}
+                        for id, last_active_at in pending.items()
+                    ],
+                )
+                db.commit()
+        except Exception as e:
+            log.warning(f"Failed to update last active timestamps: {e}")
+
+            # Retry with the next batch, newer timestamps win
+            with self._last_active_lock:
+                for id, last_active_at in pending.items():
+                    self._last_active.setdefault(id, last_active_at)
+
+    async def run_last_active_flush(self):
+        """Write the pending last active timestamps once per interval."""
+        while True:
+            await asyncio.sleep(DATABASE_USER_ACTIVE_STATUS_FLUSH_INTERVAL)
+            await asyncio.to_thread(self.flush_user_last_active)
+
     def update_user_oauth_sub_by_id(
         self, id: str, oauth_sub: str
     ) -> Optional[UserModel]:
@@ -368,6 +485,7 @@ class UsersTable:
             with get_db() as db:
                 db.query(User).filter_by(id=id).update({"oauth_sub": oauth_sub})
                 db.commit()
+                self._user_cache.invalidate(id)
 
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
@@ -379,6 +497,7 @@ class UsersTable:
             with get_db() as db:
                 db.query(User).filter_by(id=id).update(updated)
                 db.commit()
+                self._user_cache.invalidate(id)
 
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
@@ -399,6 +518,7 @@ class UsersTable:
 
                 db.query(User).filter_by(id=id).update({"settings": user_settings})
                 db.commit()
+                self._user_cache.invalidate(id)
 
                 user = db.query(User).filter_by(id=id).first()
                 return UserModel.model_validate(user)
@@ -415,29 +535,57 @@ class UsersTable:
             if result:
                 with get_db() as db:
                     # Delete User
+                    api_key_item = db.query(UserApiKey).filter_by(user_id=id).first()
+                    if api_key_item is not None:
+                        db.delete(api_key_item)
                     db.query(User).filter_by(id=id).delete()
                     db.commit()
 
+                if api_key_item is not None:
+                    self._api_key_cache.invalidate(api_key_item.id)
+                self._user_cache.invalidate(id)
+
                 return True
             else:
                 return False
         except Exception:
             return False
 
-    def update_user_api_key_by_id(self, id: str, api_key: str) -> bool:
+    def update_user_api_key_by_id(self, id: str, api_key: Optional[str]) -> bool:
+        """Replace the API key of the user, or revoke it when api_key is None."""
         try:
             with get_db() as db:
-                result = db.query(User).filter_by(id=id).update({"api_key": api_key})
+                if db.get(User, id) is None:
+                    return False
+
+                previous = db.query(UserApiKey).filter_by(user_id=id).first()
+                if previous is not None:
+                    db.delete(previous)
+                    db.flush()
+
+                if api_key:
+                    db.add(
+                        UserApiKey(
+                            id=hash_api_key(api_key),
+                            user_id=id,
+                            hint=get_api_key_hint(api_key),
+                            created_at=int(time.time()),
+                        )
+                    )
                 db.commit()
-                return True if result == 1 else False
+
+            if previous is not None:
+                self._api_key_cache.invalidate(previous.id)
+            return True
         except Exception:
             return False
 
     def get_user_api_key_by_id(self, id: str) -> Optional[str]:
+        """Returns the masked API key of the user, the key itself is not stored."""
         try:
             with get_db() as db:
-                user = db.query(User).filter_by(id=id).first()
-                return user.api_key
+                api_key_item = db.query(UserApiKey).filter_by(user_id=id).first()
+                return api_key_item.hint if api_key_item else None
         except Exception:
             return None
 
@@ -2,7 +2,6 @@ import logging
 import os
 from typing import Optional, Union
 
-import requests
 import hashlib
 from concurrent.futures import ThreadPoolExecutor
 import time
@@ -28,6 +27,7 @@ from open_webui.models.notes import Notes
 from open_webui.retrieval.vector.main import GetResult
 from open_webui.utils.access_control import has_access
 from open_webui.utils.misc import get_message_list
+from open_webui.utils.http_sessions import HTTP_SESSIONS
 
 from open_webui.retrieval.web.utils import get_web_loader
 from open_webui.retrieval.loaders.youtube import YoutubeLoader
@@ -846,7 +846,7 @@ def generate_openai_batch_embeddings(
         if isinstance(RAG_EMBEDDING_PREFIX_FIELD_NAME, str) and isinstance(prefix, str):
             json_data[RAG_EMBEDDING_PREFIX_FIELD_NAME] = prefix
 
-        r = requests.post(
+        r = HTTP_SESSIONS.get_sync(url).post(
             f"{url}/embeddings",
             headers={
                 "Content-Type": "application/json",
@@ -895,7 +895,7 @@ def generate_azure_openai_batch_embeddings(
         url = f"{url}/openai/deployments/{model}/embeddings?api-version={version}"
 
         for _ in range(5):
-            r = requests.post(
+            r = HTTP_SESSIONS.get_sync(url).post(
                 url,
                 headers={
                     "Content-Type": "application/json",
@@ -945,7 +945,7 @@ def generate_ollama_batch_embeddings(
         if isinstance(RAG_EMBEDDING_PREFIX_FIELD_NAME, str) and isinstance(prefix, str):
             json_data[RAG_EMBEDDING_PREFIX_FIELD_NAME] = prefix
 
-        r = requests.post(
+        r = HTTP_SESSIONS.get_sync(url).post(
             f"{url}/api/embed",
             headers={
                 "Content-Type": "application/json",
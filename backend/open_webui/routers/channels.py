@@ -3,7 +3,15 @@ import logging
 from typing import Optional
 
 
-from fastapi import APIRouter, Depends, HTTPException, Request, status, BackgroundTasks
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Request,
+    Response,
+    status,
+    BackgroundTasks,
+)
 from pydantic import BaseModel
 
 
@@ -18,6 +26,7 @@ from open_webui.models.channels import (
     ChannelResponse,
 )
 from open_webui.models.messages import (
+    Message,
     Messages,
     MessageModel,
     MessageResponse,
@@ -41,6 +50,7 @@ from open_webui.utils.auth import get_admin_user, get_verified_user
 from open_webui.utils.access_control import has_access, get_users_with_access
 from open_webui.utils.webhook import post_webhook
 from open_webui.utils.channels import extract_mentions, replace_mentions
+from open_webui.utils.pagination import parse_cursor, set_next_cursor
 
 log = logging.getLogger(__name__)
 log.setLevel(SRC_LOG_LEVELS["MODELS"])
@@ -172,7 +182,12 @@ class MessageUserResponse(MessageResponse):
 
 @router.get("/{id}/messages", response_model=list[MessageUserResponse])
 async def get_channel_messages(
-    id: str, skip: int = 0, limit: int = 50, user=Depends(get_verified_user)
+    response: Response,
+    id: str,
+    skip: int = 0,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    user=Depends(get_verified_user),
 ):
     channel = Channels.get_channel_by_id(id)
     if not channel:
@@ -187,7 +202,10 @@ async def get_channel_messages(
             status_code=status.HTTP_403_FORBIDDEN, detail=ERROR_MESSAGES.DEFAULT()
         )
 
-    message_list = Messages.get_messages_by_channel_id(id, skip, limit)
+    message_list = Messages.get_messages_by_channel_id(
+        id, skip, limit, cursor=parse_cursor(cursor, Message.created_at)
+    )
+    set_next_cursor(response, message_list, limit, "created_at")
     users = {}
 
     messages = []
@@ -574,10 +592,12 @@ async def get_channel_message(
     "/{id}/messages/{message_id}/thread", response_model=list[MessageUserResponse]
 )
 async def get_channel_thread_messages(
+    response: Response,
     id: str,
     message_id: str,
     skip: int = 0,
     limit: int = 50,
+    cursor: Optional[str] = None,
     user=Depends(get_verified_user),
 ):
     channel = Channels.get_channel_by_id(id)
@@ -593,7 +613,12 @@ async def get_channel_thread_messages(
             status_code=status.HTTP_403_FORBIDDEN, detail=ERROR_MESSAGES.DEFAULT()
         )
 
-    message_list = Messages.get_messages_by_parent_id(id, message_id, skip, limit)
+    message_list = Messages.get_messages_by_parent_id(
+        id, message_id, skip, limit, cursor=parse_cursor(cursor, Message.created_at)
+    )
+    # The thread's parent message is appended to its last page
+    if message_list and message_list[-1].id != message_id:
+        set_next_cursor(response, message_list, limit, "created_at")
     users = {}
 
     messages = []
@@ -1,12 +1,14 @@
 import json
 import logging
-from typing import Optional
+from typing import Iterator, Optional
 
 
 from open_webui.socket.main import get_event_emitter
 from open_webui.models.chats import (
+    Chat,
     ChatForm,
     ChatImportForm,
+    ChatModel,
     ChatResponse,
     Chats,
     ChatTitleIdResponse,
@@ -17,11 +19,13 @@ from open_webui.models.folders import Folders
 from open_webui.config import ENABLE_ADMIN_CHAT_ACCESS, ENABLE_ADMIN_EXPORT
 from open_webui.constants import ERROR_MESSAGES
 from open_webui.env import SRC_LOG_LEVELS
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 
 from open_webui.utils.auth import get_admin_user, get_verified_user
+from open_webui.utils.pagination import parse_cursor, set_next_cursor
 from open_webui.utils.access_control import has_permission
 
 log = logging.getLogger(__name__)
@@ -29,6 +33,7 @@ log.setLevel(SRC_LOG_LEVELS["MODELS"])
 
 router = APIRouter()
 
+
 ############################
 # GetChatList
 ############################
@@ -37,27 +42,34 @@ router = APIRouter()
 @router.get("/", response_model=list[ChatTitleIdResponse])
 @router.get("/list", response_model=list[ChatTitleIdResponse])
 def get_session_user_chat_list(
+    response: Response,
     user=Depends(get_verified_user),
     page: Optional[int] = None,
+    cursor: Optional[str] = None,
     include_pinned: Optional[bool] = False,
     include_folders: Optional[bool] = False,
 ):
     try:
-        if page is not None:
+        if page is not None or cursor is not None:
             limit = 60
-            skip = (page - 1) * limit
+            skip = (page - 1) * limit if page is not None else None
 
-            return Chats.get_chat_title_id_list_by_user_id(
+            chat_list = Chats.get_chat_title_id_list_by_user_id(
                 user.id,
                 include_folders=include_folders,
                 include_pinned=include_pinned,
                 skip=skip,
                 limit=limit,
+                cursor=parse_cursor(cursor, Chat.updated_at),
             )
+            set_next_cursor(response, chat_list, limit, "updated_at")
+            return chat_list
         else:
             return Chats.get_chat_title_id_list_by_user_id(
                 user.id, include_folders=include_folders, include_pinned=include_pinned
             )
+    except HTTPException:
+        raise
     except Exception as e:
         log.exception(e)
         raise HTTPException(
@@ -92,8 +104,10 @@ async def delete_all_user_chats(request: Request, user=Depends(get_verified_user
 
 @router.get("/list/user/{user_id}", response_model=list[ChatTitleIdResponse])
 async def get_user_chat_list_by_user_id(
+    response: Response,
     user_id: str,
     page: Optional[int] = None,
+    cursor: Optional[str] = None,
     query: Optional[str] = None,
     order_by: Optional[str] = None,
     direction: Optional[str] = None,
@@ -119,9 +133,24 @@ async def get_user_chat_list_by_user_id(
     if direction:
         filter["direction"] = direction
 
-    return Chats.get_chat_list_by_user_id(
-        user_id, include_archived=True, filter=filter, skip=skip, limit=limit
+    chat_list = Chats.get_chat_list_by_user_id(
+        user_id,
+        include_archived=True,
+        filter=filter,
+        skip=skip,
+        limit=limit,
+        cursor=parse_cursor(
+            cursor,
+            getattr(Chat, order_by if order_by and direction else "updated_at", None),
+        ),
+    )
+    set_next_cursor(
+        response,
+        chat_list,
+        limit,
+        order_by if order_by and direction else "updated_at",
     )
+    return chat_list
 
 
 ############################
@@ -263,12 +292,35 @@ async def get_user_pinned_chats(user=Depends(get_verified_user)):
 ############################
 
 
+def stream_chats(chats: Iterator[ChatModel], format: Optional[str] = None):
+    """
+    Stream chats as a JSON array, or as one JSON object per line with format=ndjson,
+    serializing a single chat at a time.
+    """
+
+    def generate():
+        if format == "ndjson":
+            for chat in chats:
+                yield ChatResponse(**chat.model_dump()).model_dump_json() + "\n"
+        else:
+            yield "["
+            for idx, chat in enumerate(chats):
+                yield ("," if idx else "") + ChatResponse(
+                    **chat.model_dump()
+                ).model_dump_json()
+            yield "]"
+
+    return StreamingResponse(
+        generate(),
+        media_type=(
+            "application/x-ndjson" if format == "ndjson" else "application/json"
+        ),
+    )
+
+
 @router.get("/all", response_model=list[ChatResponse])
-async def get_user_chats(user=Depends(get_verified_user)):
-    return [
-        ChatResponse(**chat.model_dump())
-        for chat in Chats.get_chats_by_user_id(user.id)
-    ]
+async def get_user_chats(format: Optional[str] = None, user=Depends(get_verified_user)):
+    return stream_chats(Chats.iter_chats(user_id=user.id), format)
 
 
 ############################
@@ -277,11 +329,10 @@ async def get_user_chats(user=Depends(get_verified_user)):
 
 
 @router.get("/all/archived", response_model=list[ChatResponse])
-async def get_user_archived_chats(user=Depends(get_verified_user)):
-    return [
-        ChatResponse(**chat.model_dump())
-        for chat in Chats.get_archived_chats_by_user_id(user.id)
-    ]
+async def get_user_archived_chats(
+    format: Optional[str] = None, user=Depends(get_verified_user)
+):
+    return stream_chats(Chats.iter_chats(user_id=user.id, archived=True), format)
 
 
 ############################
@@ -307,13 +358,15 @@ async def get_all_user_tags(user=Depends(get_verified_user)):
 
 
 @router.get("/all/db", response_model=list[ChatResponse])
-async def get_all_user_chats_in_db(user=Depends(get_admin_user)):
+async def get_all_user_chats_in_db(
+    format: Optional[str] = None, user=Depends(get_admin_user)
+):
     if not ENABLE_ADMIN_EXPORT:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=ERROR_MESSAGES.ACCESS_PROHIBITED,
         )
-    return [ChatResponse(**chat.model_dump()) for chat in Chats.get_chats()]
+    return stream_chats(Chats.iter_chats(), format)
 
 
 ############################
@@ -323,7 +376,9 @@ async def get_all_user_chats_in_db(user=Depends(get_admin_user)):
 
 @router.get("/archived", response_model=list[ChatTitleIdResponse])
 async def get_archived_session_user_chat_list(
+    response: Response,
     page: Optional[int] = None,
+    cursor: Optional[str] = None,
     query: Optional[str] = None,
     order_by: Optional[str] = None,
     direction: Optional[str] = None,
@@ -350,9 +405,21 @@ async def get_archived_session_user_chat_list(
             filter=filter,
             skip=skip,
             limit=limit,
+            cursor=parse_cursor(
+                cursor,
+                getattr(
+                    Chat, order_by if order_by and direction else "updated_at", None
+                ),
+            ),
         )
     ]
 
+    set_next_cursor(
+        response,
+        chat_list,
+        limit,
+        order_by if order_by and direction else "updated_at",
+    )
     return chat_list
 
 
@@ -493,13 +560,15 @@ async def update_chat_message_by_id(
             detail=ERROR_MESSAGES.ACCESS_PROHIBITED,
         )
 
-    chat = Chats.upsert_message_to_chat_by_id_and_message_id(
+    Chats.upsert_message_to_chat_by_id_and_message_id(
         id,
         message_id,
         {
             "content": form_data.content,
         },
     )
+    Chats.update_chat_search_by_id(id)
+    chat = Chats.get_chat_by_id(id)
 
     event_emitter = get_event_emitter(
         {
@@ -1,12 +1,7 @@
-# TODO: Implement a more intelligent load balancing mechanism for distributing requests among multiple backend instances.
-# Current implementation uses a simple round-robin approach (random.choice). Consider incorporating algorithms like weighted round-robin,
-# least connections, or least response time for better resource utilization and performance optimization.
-
 import asyncio
 import json
 import logging
 import os
-import random
 import re
 import time
 from datetime import datetime
@@ -37,7 +32,7 @@ from fastapi import (
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, ConfigDict, validator
-from starlette.background import BackgroundTask
+from starlette.background import BackgroundTask, BackgroundTasks
 
 
 from open_webui.models.models import Models
@@ -50,7 +45,15 @@ from open_webui.utils.payload import (
     apply_system_prompt_to_body,
 )
 from open_webui.utils.auth import get_admin_user, get_verified_user
-from open_webui.utils.access_control import has_access
+from open_webui.utils.access_control import get_group_access, has_access
+from open_webui.utils.model_lists import MODEL_LISTS
+from open_webui.utils.cache import single_flight
+from open_webui.utils.http_sessions import HTTP_SESSIONS
+from open_webui.utils.load_balancer import (
+    LOAD_BALANCER,
+    MODEL_RESIDENCY,
+    RequestTracker,
+)
 
 
 from open_webui.config import (
@@ -64,6 +67,7 @@ from open_webui.env import (
     AIOHTTP_CLIENT_TIMEOUT,
     AIOHTTP_CLIENT_TIMEOUT_MODEL_LIST,
     BYPASS_MODEL_ACCESS_CONTROL,
+    OLLAMA_PREWARM_THRESHOLD,
 )
 from open_webui.constants import ERROR_MESSAGES
 
@@ -81,40 +85,63 @@ log.setLevel(SRC_LOG_LEVELS["OLLAMA"])
 async def send_get_request(url, key=None, user: UserModel = None):
     timeout = aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT_MODEL_LIST)
     try:
-        async with aiohttp.ClientSession(timeout=timeout, trust_env=True) as session:
-            async with session.get(
-                url,
-                headers={
-                    "Content-Type": "application/json",
-                    **({"Authorization": f"Bearer {key}"} if key else {}),
-                    **(
-                        {
-                            "X-OpenWebUI-User-Name": quote(user.name, safe=" "),
-                            "X-OpenWebUI-User-Id": user.id,
-                            "X-OpenWebUI-User-Email": user.email,
-                            "X-OpenWebUI-User-Role": user.role,
-                        }
-                        if ENABLE_FORWARD_USER_INFO_HEADERS and user
-                        else {}
-                    ),
-                },
-                ssl=AIOHTTP_CLIENT_SESSION_SSL,
-            ) as response:
-                return await response.json()
+        async with HTTP_SESSIONS.get(url).get(
+            url,
+            headers={
+                "Content-Type": "application/json",
+                **({"Authorization": f"Bearer {key}"} if key else {}),
+                **(
+                    {
+                        "X-OpenWebUI-User-Name": quote(user.name, safe=" "),
+                        "X-OpenWebUI-User-Id": user.id,
+                        "X-OpenWebUI-User-Email": user.email,
+                        "X-OpenWebUI-User-Role": user.role,
+                    }
+                    if ENABLE_FORWARD_USER_INFO_HEADERS and user
+                    else {}
+                ),
+            },
+            timeout=timeout,
+            ssl=AIOHTTP_CLIENT_SESSION_SSL,
+        ) as response:
+            return await response.json()
     except Exception as e:
         # Handle connection error here
         log.error(f"Connection error: {e}")
         return None
 
 
+async def send_cached_get_request(url, key=None, user: UserModel = None):
+    # Responses are shared between users unless the user is forwarded to the server
+    if ENABLE_FORWARD_USER_INFO_HEADERS and user:
+        return await send_get_request(url, key, user=user)
+    return await MODEL_LISTS.get(url, key, lambda: send_get_request(url, key))
+
+
+async def invalidate_model_list(url: str, key: Optional[str] = None):
+    # The models of the connection changed, the next read fetches the list again
+    await MODEL_LISTS.invalidate(f"{url}/api/tags", key)
+
+
+def invalidate_model_list_after(
+    response: StreamingResponse, url: str, key: Optional[str] = None
+):
+    # The model only exists once the progress stream has finished
+    response.background = BackgroundTasks(
+        [response.background, BackgroundTask(invalidate_model_list, url, key)]
+    )
+    return response
+
+
 async def cleanup_response(
     response: Optional[aiohttp.ClientResponse],
-    session: Optional[aiohttp.ClientSession],
+    tracker: Optional[RequestTracker] = None,
 ):
+    # The session is shared, only the connection of the response is released
     if response:
-        response.close()
-    if session:
-        await session.close()
+        response.release()
+    if tracker:
+        tracker.finish()
 
 
 async def send_post_request(
@@ -128,12 +155,10 @@ async def send_post_request(
 ):
 
     r = None
+    streaming = False
+    tracker = LOAD_BALANCER.track(url)
     try:
-        session = aiohttp.ClientSession(
-            trust_env=True, timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT)
-        )
-
-        r = await session.post(
+        r = await HTTP_SESSIONS.get(url).post(
             url,
             data=payload,
             headers={
@@ -155,13 +180,15 @@ async def send_post_request(
                     else {}
                 ),
             },
+            timeout=aiohttp.ClientTimeout(total=AIOHTTP_CLIENT_TIMEOUT),
             ssl=AIOHTTP_CLIENT_SESSION_SSL,
         )
+        tracker.respond(r.status)
 
         if r.ok is False:
             try:
                 res = await r.json()
-                await cleanup_response(r, session)
+                await cleanup_response(r, tracker)
                 if "error" in res:
                     raise HTTPException(status_code=r.status, detail=res["error"])
             except HTTPException as e:
@@ -180,12 +207,13 @@ async def send_post_request(
             if content_type:
                 response_headers["Content-Type"] = content_type
 
+            streaming = True
             return StreamingResponse(
                 r.content,
                 status_code=r.status,
                 headers=response_headers,
                 background=BackgroundTask(
-                    cleanup_response, response=r, session=session
+                    cleanup_response, response=r, tracker=tracker
                 ),
             )
         else:
@@ -202,8 +230,8 @@ async def send_post_request(
             detail=detail if e else "Open WebUI: Server Connection Error",
         )
     finally:
-        if not stream:
-            await cleanup_response(r, session)
+        if not streaming:
+            await cleanup_response(r, tracker)
 
 
 def get_api_key(idx, url, configs):
@@ -214,6 +242,99 @@ def get_api_key(idx, url, configs):
     )  # Legacy support
 
 
+async def get_loaded_model_names(url: str, key: Optional[str] = None) -> set[str]:
+    # Without a refresh interval the loaded models would be fetched on every request
+    if MODEL_LISTS.interval <= 0:
+        return set()
+
+    response = await send_cached_get_request(f"{url}/api/ps", key)
+    return {
+        name
+        for model in (response or {}).get("models", [])
+        for name in (model.get("model"), model.get("name"))
+        if name
+    }
+
+
+async def prewarm_model(url: str, model: str, key: Optional[str] = None) -> bool:
+    # A generate request without a prompt only loads the model
+    await send_post_request(
+        f"{url}/api/generate",
+        json.dumps({"model": model}),
+        stream=False,
+        key=key,
+    )
+    return True
+
+
+async def get_url_idx(
+    request: Request, url_idxs: list[int], model: Optional[str] = None
+) -> int:
+    """
+    Pick the connection for the next request to a model served by url_idxs,
+    preferring the connections that have the model loaded already.
+    """
+    configs = request.app.state.config.OLLAMA_API_CONFIGS
+    urls = [request.app.state.config.OLLAMA_BASE_URLS[idx] for idx in url_idxs]
+    api_configs = [
+        configs.get(str(idx), configs.get(url, {}))  # Legacy support
+        for idx, url in zip(url_idxs, urls)
+    ]
+    weights = [float(api_config.get("weight", 1)) for api_config in api_configs]
+
+    if model is None or len(url_idxs) == 1:
+        return url_idxs[LOAD_BALANCER.select(urls, weights)]
+
+    # Name of the model on each connection
+    names = [
+        (
+            model.replace(f"{api_config['prefix_id']}.", "")
+            if api_config.get("prefix_id")
+            else model
+        )
+        for api_config in api_configs
+    ]
+
+    loaded_model_names = await asyncio.gather(
+        *[
+            get_loaded_model_names(url, api_config.get("key"))
+            for url, api_config in zip(urls, api_configs)
+        ]
+    )
+    loaded = [
+        name in loaded_model_names[idx] or MODEL_RESIDENCY.contains(urls[idx], name)
+        for idx, name in enumerate(names)
+    ]
+
+    idx = LOAD_BALANCER.select(urls, weights, preferred=loaded)
+    if not loaded[idx]:
+        # The model gets loaded there by this request
+        MODEL_RESIDENCY.add(urls[idx], names[idx])
+
+    # Load the model on another connection as well once requests start to queue up
+    if (
+        OLLAMA_PREWARM_THRESHOLD > 0
+        and loaded[idx]
+        and LOAD_BALANCER.get_stats(urls[idx]).outstanding >= OLLAMA_PREWARM_THRESHOLD
+    ):
+        cold = [i for i in range(len(urls)) if not loaded[i]]
+        if cold:
+            warm_idx = cold[
+                LOAD_BALANCER.select(
+                    [urls[i] for i in cold], [weights[i] for i in cold]
+                )
+            ]
+            MODEL_RESIDENCY.warm(
+                urls[warm_idx],
+                names[warm_idx],
+                lambda: prewarm_model(
+                    urls[warm_idx], names[warm_idx], api_configs[warm_idx].get("key")
+                ),
+            )
+
+    return url_idxs[idx]
+
+
 ##########################################
 #
 # API routes
@@ -344,6 +465,12 @@ def merge_ollama_models_lists(model_lists):
     ttl=MODELS_CACHE_TTL,
     key=lambda _, user: f"ollama_all_models_{user.id}" if user else "ollama_all_models",
 )
+@single_flight(
+    # The lists only depend on the user when it is forwarded to the servers
+    key=lambda request, user=None: (
+        user.id if ENABLE_FORWARD_USER_INFO_HEADERS and user else None
+    )
+)
 async def get_all_models(request: Request, user: UserModel = None):
     log.info("get_all_models()")
     if request.app.state.config.ENABLE_OLLAMA_API:
@@ -352,7 +479,9 @@ async def get_all_models(request: Request, user: UserModel = None):
             if (str(idx) not in request.app.state.config.OLLAMA_API_CONFIGS) and (
                 url not in request.app.state.config.OLLAMA_API_CONFIGS  # Legacy support
             ):
-                request_tasks.append(send_get_request(f"{url}/api/tags", user=user))
+                request_tasks.append(
+                    send_cached_get_request(f"{url}/api/tags", user=user)
+                )
             else:
                 api_config = request.app.state.config.OLLAMA_API_CONFIGS.get(
                     str(idx),
@@ -366,7 +495,7 @@ async def get_all_models(request: Request, user: UserModel = None):
 
                 if enable:
                     request_tasks.append(
-                        send_get_request(f"{url}/api/tags", key, user=user)
+                        send_cached_get_request(f"{url}/api/tags", key, user=user)
                     )
                 else:
                     request_tasks.append(asyncio.ensure_future(asyncio.sleep(0, None)))
@@ -417,7 +546,7 @@ async def get_all_models(request: Request, user: UserModel = None):
         }
 
         try:
-            loaded_models = await get_ollama_loaded_models(request, user=user)
+            loaded_models = await get_loaded_models(request, user=user, cached=True)
             expires_map = {
                 m["model"]: m["expires_at"]
                 for m in loaded_models["models"]
@@ -443,15 +572,14 @@ async def get_all_models(request: Request, user: UserModel = None):
 
 async def get_filtered_models(models, user):
     # Filter models based on user access control
-    filtered_models = []
-    for model in models.get("models", []):
-        model_info = Models.get_model_by_id(model["model"])
-        if model_info:
-            if user.id == model_info.user_id or has_access(
-                user.id, type="read", access_control=model_info.access_control
-            ):
-                filtered_models.append(model)
-    return filtered_models
+    readable_model_ids = Models.get_readable_model_ids(
+        user.id, get_group_access(user.id).group_ids
+    )
+    return [
+        model
+        for model in models.get("models", [])
+        if model["model"] in readable_model_ids
+    ]
 
 
 @router.get("/api/tags")
@@ -507,7 +635,8 @@ async def get_ollama_tags(
             )
 
     if user.role == "user" and not BYPASS_MODEL_ACCESS_CONTROL:
-        models["models"] = await get_filtered_models(models, user)
+        # The models may be shared with other requests, filter a copy
+        models = {**models, "models": await get_filtered_models(models, user)}
 
     return models
 
@@ -517,13 +646,21 @@ async def get_ollama_loaded_models(request: Request, user=Depends(get_admin_user
     """
     List models that are currently loaded into Ollama memory, and which node they are loaded on.
     """
+    return await get_loaded_models(request, user=user)
+
+
+async def get_loaded_models(
+    request: Request, user: UserModel = None, cached: bool = False
+):
+    send_request = send_cached_get_request if cached else send_get_request
+
     if request.app.state.config.ENABLE_OLLAMA_API:
         request_tasks = []
         for idx, url in enumerate(request.app.state.config.OLLAMA_BASE_URLS):
             if (str(idx) not in request.app.state.config.OLLAMA_API_CONFIGS) and (
                 url not in request.app.state.config.OLLAMA_API_CONFIGS  # Legacy support
             ):
-                request_tasks.append(send_get_request(f"{url}/api/ps", user=user))
+                request_tasks.append(send_request(f"{url}/api/ps", user=user))
             else:
                 api_config = request.app.state.config.OLLAMA_API_CONFIGS.get(
                     str(idx),
@@ -536,9 +673,7 @@ async def get_ollama_loaded_models(request: Request, user=Depends(get_admin_user
                 key = api_config.get("key", None)
 
                 if enable:
-                    request_tasks.append(
-                        send_get_request(f"{url}/api/ps", key, user=user)
-                    )
+                    request_tasks.append(send_request(f"{url}/api/ps", key, user=user))
                 else:
                     request_tasks.append(asyncio.ensure_future(asyncio.sleep(0, None)))
 
@@ -576,6 +711,7 @@ async def get_ollama_loaded_models(request: Request, user=Depends(get_admin_user
 
 @router.get("/api/version")
 @router.get("/api/version/{url_idx}")
+@single_flight(key=lambda request, url_idx=None: url_idx)
 async def get_ollama_versions(request: Request, url_idx: Optional[int] = None):
     if request.app.state.config.ENABLE_OLLAMA_API:
         if url_idx is None:
@@ -736,13 +872,15 @@ async def pull_model(
 
     # Admin should be able to pull models from any source
     payload = {**form_data, "insecure": True}
+    key = get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS)
 
-    return await send_post_request(
+    response = await send_post_request(
         url=f"{url}/api/pull",
         payload=json.dumps(payload),
-        key=get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS),
+        key=key,
         user=user,
     )
+    return invalidate_model_list_after(response, url, key)
 
 
 class PushModelForm(BaseModel):
@@ -800,13 +938,15 @@ async def create_model(
 ):
     log.debug(f"form_data: {form_data}")
     url = request.app.state.config.OLLAMA_BASE_URLS[url_idx]
+    key = get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS)
 
-    return await send_post_request(
+    response = await send_post_request(
         url=f"{url}/api/create",
         payload=form_data.model_dump_json(exclude_none=True).encode(),
-        key=get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS),
+        key=key,
         user=user,
     )
+    return invalidate_model_list_after(response, url, key)
 
 
 class CopyModelForm(BaseModel):
@@ -860,6 +1000,7 @@ async def copy_model(
         r.raise_for_status()
 
         log.debug(f"r.text: {r.text}")
+        await invalidate_model_list(url, key)
         return True
     except Exception as e:
         log.exception(e)
@@ -930,6 +1071,7 @@ async def delete_model(
         r.raise_for_status()
 
         log.debug(f"r.text: {r.text}")
+        await invalidate_model_list(url, key)
         return True
     except Exception as e:
         log.exception(e)
@@ -967,7 +1109,7 @@ async def show_model_info(
             detail=ERROR_MESSAGES.MODEL_NOT_FOUND(model),
         )
 
-    url_idx = random.choice(models[model]["urls"])
+    url_idx = await get_url_idx(request, models[model]["urls"])
 
     url = request.app.state.config.OLLAMA_BASE_URLS[url_idx]
     key = get_api_key(url_idx, url, request.app.state.config.OLLAMA_API_CONFIGS)
@@ -1045,7 +1187,7 @@ async def embed(
             model = f"{model}:latest"
 
         if model in models:
-            url_idx = random.choice(models[model]["urls"])
+            url_idx = await get_url_idx(request, models[model]["urls"], model)
         else:
             raise HTTPException(
                 status_code=400,
@@ -1132,7 +1274,7 @@ async def embeddings(
             model = f"{model}:latest"
 
         if model in models:
-            url_idx = random.choice(models[model]["urls"])
+            url_idx = await get_url_idx(request, models[model]["urls"], model)
         else:
             raise HTTPException(
                 status_code=400,
@@ -1225,7 +1367,7 @@ async def generate_completion(
             model = f"{model}:latest"
 
         if model in models:
-            url_idx = random.choice(models[model]["urls"])
+            url_idx = await get_url_idx(request, models[model]["urls"], model)
         else:
             raise HTTPException(
                 status_code=400,
@@ -1292,7 +1434,7 @@ async def get_ollama_url(request: Request, model: str, url_idx: Optional[int] =
                 status_code=400,
                 detail=ERROR_MESSAGES.MODEL_NOT_FOUND(model),
             )
-        url_idx = random.choice(models[model].get("urls", []))
+        url_idx = await get_url_idx(request, models[model].get("urls", []), model)
     url = request.app.state.config.OLLAMA_BASE_URLS[url_idx]
     return url, url_idx
 
@@ -1833,6 +1975,14 @@ async def upload_model(
 
                 if create_resp.ok:
                     log.info(f"API SUCCESS!")  # DEBUG
+                    await invalidate_model_list(
+                        ollama_url,
+                        get_api_key(
+                            url_idx,
+                            ollama_url,
+                            request.app.state.config.OLLAMA_API_CONFIGS,
+                        ),
+                    )
                     done_msg = {
                         "done": True,
                         "blob": f"sha256:{file_hash}",
@@ -7,6 +7,7 @@ import logging
 import re
 
 from open_webui.utils.chat import generate_chat_completion
+from open_webui.utils.admission import AdmissionRejected, TASK_GENERATION_LANE
 from open_webui.utils.task import (
     title_generation_template,
     follow_up_generation_template,
@@ -50,6 +51,23 @@ router = APIRouter()
 ##################################
 
 
+async def generate_background_task_completion(
+    request: Request, payload: dict, user, task: TASKS
+):
+    """
+    Generate the completion of a background task in the low priority lane, deferred
+    while chat completions are waiting. Returns a 429 response if it was dropped.
+    """
+    try:
+        async with TASK_GENERATION_LANE.slot(str(task)):
+            return await generate_chat_completion(request, form_data=payload, user=user)
+    except AdmissionRejected as e:
+        return JSONResponse(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            content={"detail": str(e)},
+        )
+
+
 @router.get("/config")
 async def get_task_config(request: Request, user=Depends(get_verified_user)):
     return {
@@ -230,7 +248,9 @@ async def generate_title(
         raise e
 
     try:
-        return await generate_chat_completion(request, form_data=payload, user=user)
+        return await generate_background_task_completion(
+            request, payload, user, TASKS.TITLE_GENERATION
+        )
     except Exception as e:
         log.error("Exception occurred", exc_info=True)
         return JSONResponse(
@@ -303,7 +323,9 @@ async def generate_follow_ups(
         raise e
 
     try:
-        return await generate_chat_completion(request, form_data=payload, user=user)
+        return await generate_background_task_completion(
+            request, payload, user, TASKS.FOLLOW_UP_GENERATION
+        )
     except Exception as e:
         log.error("Exception occurred", exc_info=True)
         return JSONResponse(
@@ -376,7 +398,9 @@ async def generate_chat_tags(
         raise e
 
     try:
-        return await generate_chat_completion(request, form_data=payload, user=user)
+        return await generate_background_task_completion(
+            request, payload, user, TASKS.TAGS_GENERATION
+        )
     except Exception as e:
         log.error(f"Error generating chat completion: {e}")
         return JSONResponse(
@@ -526,6 +550,8 @@ async def generate_queries(
     except Exception as e:
         raise e
 
+    # Not deferred like background tasks, queries are generated for the chat request
+    # itself (web search, retrieval) while its payload is processed
     try:
         return await generate_chat_completion(request, form_data=payload, user=user)
     except Exception as e:
@@ -612,7 +638,9 @@ async def generate_autocompletion(
         raise e
 
     try:
-        return await generate_chat_completion(request, form_data=payload, user=user)
+        return await generate_background_task_completion(
+            request, payload, user, TASKS.AUTOCOMPLETE_GENERATION
+        )
     except Exception as e:
         log.error(f"Error generating chat completion: {e}")
         return JSONResponse(
@@ -681,7 +709,9 @@ async def generate_emoji(
         raise e
 
     try:
-        return await generate_chat_completion(request, form_data=payload, user=user)
+        return await generate_background_task_completion(
+            request, payload, user, TASKS.EMOJI_GENERATION
+        )
     except Exception as e:
         return JSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
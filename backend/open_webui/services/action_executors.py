@@ -249,6 +249,7 @@ class WebSearchExecutor(ActionExecutor):
                         messages[last_msg_id]["childrenIds"].append(user_msg_id)
                     
                     Chats.update_chat_by_id(chat_id, chat_data)
+                    Chats.update_chat_search_by_id(chat_id)
                     log.info(f"Updated existing chat {chat_id} with new search results")
                     return chat_id
             
@@ -299,6 +300,7 @@ class WebSearchExecutor(ActionExecutor):
             new_chat = Chats.insert_new_chat(user_id, chat_form)
             
             if new_chat:
+                Chats.update_chat_search_by_id(new_chat.id)
                 log.info(f"Created new chat {new_chat.id} with search results")
                 return new_chat.id
             
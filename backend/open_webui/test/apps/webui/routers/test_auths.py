@@ -177,13 +177,13 @@ class TestAuths(AbstractPostgresTest):
             profile_image_url="/user.png",
             role="admin",
         )
-        self.users.update_user_api_key_by_id(user.id, "abc")
+        self.users.update_user_api_key_by_id(user.id, "sk-0123456789abcdef")
         with mock_webui_user(id=user.id):
             response = self.fast_api_client.delete(self.create_url("/api_key"))
         assert response.status_code == 200
         assert response.json() == True
-        db_user = self.users.get_user_by_id(user.id)
-        assert db_user.api_key is None
+        assert self.users.get_user_api_key_by_id(user.id) is None
+        assert self.users.get_user_by_api_key("sk-0123456789abcdef") is None
 
     def test_get_api_key(self):
         user = self.auths.insert_new_auth(
@@ -193,8 +193,10 @@ class TestAuths(AbstractPostgresTest):
             profile_image_url="/user.png",
             role="admin",
         )
-        self.users.update_user_api_key_by_id(user.id, "abc")
+        self.users.update_user_api_key_by_id(user.id, "sk-0123456789abcdef")
         with mock_webui_user(id=user.id):
             response = self.fast_api_client.get(self.create_url("/api_key"))
         assert response.status_code == 200
-        assert response.json() == {"api_key": "abc"}
+        # Only a masked hint is stored
+        assert response.json() == {"api_key": "sk-...cdef"}
+        assert self.users.get_user_by_api_key("sk-0123456789abcdef").id == user.id
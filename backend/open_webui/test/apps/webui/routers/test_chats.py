@@ -1,4 +1,5 @@
 import uuid
+from unittest.mock import patch
 
 from test.util.abstract_integration_test import AbstractPostgresTest
 from test.util.mock_user import mock_webui_user
@@ -234,3 +235,41 @@ class TestChats(AbstractPostgresTest):
 
         chat = self.chats.get_chat_by_id(chat_id)
         assert chat.share_id is None
+
+    def test_get_chats_with_chat_message_table(self):
+        from open_webui.models import chats as chats_module
+
+        chat_id = self.chats.get_chats()[0].id
+        with patch.object(chats_module, "ENABLE_CHAT_MESSAGE_TABLE", True):
+            self.chats.upsert_message_to_chat_by_id_and_message_id(
+                chat_id, "1", {"role": "user", "content": "hello"}
+            )
+            chat = self.chats.update_chat_folder_id_by_id_and_user_id(
+                chat_id, "2", "folder-1"
+            )
+
+            for chats in [
+                [chat],
+                self.chats.get_chats(),
+                self.chats.get_chats_by_user_id("2"),
+                self.chats.get_chats_by_folder_ids_and_user_id(["folder-1"], "2"),
+            ]:
+                assert chats[0].chat["history"]["messages"]["1"]["content"] == "hello"
+
+    def test_search_indexed_once_message_done(self):
+        from open_webui.models.chats import ChatForm
+
+        chat = self.chats.insert_new_chat(
+            "2", ChatForm(chat={"history": {"currentId": None, "messages": {}}})
+        )
+        self.chats.upsert_message_to_chat_by_id_and_message_id(
+            chat.id, "1", {"role": "assistant", "content": "zebra stripes"}
+        )
+        # Saves while a response streams leave the index alone
+        assert self.chats.get_chats_by_user_id_and_search_text("2", "zebra") == []
+
+        self.chats.update_chat_search_by_id(chat.id)
+        assert [
+            result.id
+            for result in self.chats.get_chats_by_user_id_and_search_text("2", "zebra")
+        ] == [chat.id]
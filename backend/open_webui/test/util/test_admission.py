@@ -0,0 +1,194 @@
+import asyncio
+
+import pytest
+
+from open_webui.utils.admission import (
+    AdmissionController,
+    AdmissionRejected,
+    TaskLane,
+)
+
+
+class TestAdmissionController:
+    """Test the admission of chat completions on a single instance"""
+
+    @pytest.mark.asyncio
+    async def test_disabled(self):
+        """Test requests are admitted right away and counted without limits"""
+        controller = AdmissionController()
+
+        ticket = await controller.acquire("user-1", "llama3")
+        assert ticket.admitted and controller.active == 1
+
+        await controller.release(ticket)
+        await controller.release(ticket)
+        assert controller.active == 0
+
+    @pytest.mark.asyncio
+    async def test_per_model_limit(self):
+        """Test other models are admitted while a model is at its limit"""
+        controller = AdmissionController(max_concurrency_per_model=1, queue_timeout=0.1)
+
+        ticket = await controller.acquire("user-1", "llama3")
+        assert await controller.acquire("user-2", "mistral") is not None
+
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire("user-2", "llama3")
+
+        await controller.release(ticket)
+        assert await controller.acquire("user-2", "llama3") is not None
+
+    @pytest.mark.asyncio
+    async def test_out_of_order_admission(self):
+        """Test a request admitted after a later one of the same user starts"""
+        controller = AdmissionController(max_concurrency_per_model=1)
+
+        ticket = await controller.acquire("user-2", "llama3")
+        waiting = asyncio.create_task(controller.acquire("user-1", "llama3"))
+        await asyncio.sleep(0.01)
+
+        # Not blocked by the per-model limit, admitted before the first request
+        assert await controller.acquire("user-1", "mistral") is not None
+        assert not waiting.done()
+
+        await controller.release(ticket)
+        assert await asyncio.wait_for(waiting, timeout=1) is not None
+
+    @pytest.mark.asyncio
+    async def test_queue_position(self):
+        """Test waiting requests are admitted once a slot is released"""
+        controller = AdmissionController(max_concurrency=1)
+        positions = []
+
+        async def on_position(position):
+            positions.append(position)
+
+        ticket = await controller.acquire("user-1", "llama3")
+        waiting = asyncio.create_task(
+            controller.acquire("user-2", "llama3", on_position=on_position)
+        )
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+
+        await controller.release(ticket)
+        assert await asyncio.wait_for(waiting, timeout=1) is not None
+        assert positions == [1]
+
+    @pytest.mark.asyncio
+    async def test_fair_share(self):
+        """Test a user queueing many requests does not delay others behind them"""
+        controller = AdmissionController(max_concurrency=1)
+        admitted = []
+
+        async def run(user_id):
+            ticket = await controller.acquire(user_id, "llama3")
+            admitted.append(user_id)
+            await asyncio.sleep(0.01)
+            await controller.release(ticket)
+
+        ticket = await controller.acquire("user-1", "llama3")
+        tasks = [asyncio.create_task(run("user-1")) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        tasks.append(asyncio.create_task(run("user-2")))
+        await asyncio.sleep(0.01)
+
+        await controller.release(ticket)
+        await asyncio.wait_for(asyncio.gather(*tasks), timeout=5)
+
+        assert admitted.index("user-2") == 1
+
+    @pytest.mark.asyncio
+    async def test_max_queue_size(self):
+        """Test requests are rejected right away when the queue is full"""
+        controller = AdmissionController(max_concurrency=1, max_queue_size=1)
+
+        await controller.acquire("user-1", "llama3")
+        waiting = asyncio.create_task(controller.acquire("user-2", "llama3"))
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire("user-3", "llama3")
+
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert not controller._queue
+
+
+class TestTaskLane:
+    """Test the lower priority lane of background task generations"""
+
+    @pytest.mark.asyncio
+    async def test_concurrency_budget(self):
+        """Test tasks over the budget wait for a running one to finish"""
+        lane = TaskLane(AdmissionController(), max_concurrency=1)
+        release = asyncio.Event()
+
+        async def run():
+            async with lane.slot("title_generation"):
+                await release.wait()
+
+        tasks = [asyncio.create_task(run()) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        assert (lane.running, lane.waiting) == (1, 1)
+
+        release.set()
+        await asyncio.wait_for(asyncio.gather(*tasks), timeout=1)
+        assert (lane.running, lane.waiting) == (0, 0)
+
+    @pytest.mark.asyncio
+    async def test_deferred_while_interactive_queued(self):
+        """Test tasks wait while chat completions wait for a slot"""
+        interactive = AdmissionController(max_concurrency=1)
+        lane = TaskLane(interactive, queue_timeout=0.1)
+
+        await interactive.acquire("user-1", "llama3")
+        waiting = asyncio.create_task(interactive.acquire("user-2", "llama3"))
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(AdmissionRejected):
+            async with lane.slot("tags_generation"):
+                pass
+
+        waiting.cancel()
+
+    @pytest.mark.asyncio
+    async def test_defer_threshold(self):
+        """Test tasks wait while enough chat completions run, but not for their own"""
+        interactive = AdmissionController()
+        lane = TaskLane(interactive, queue_timeout=0.1, defer_threshold=1)
+
+        ticket = await interactive.acquire("user-1", "llama3")
+        with pytest.raises(AdmissionRejected):
+            async with lane.slot("title_generation"):
+                pass
+
+        await interactive.release_current()
+        assert ticket.released
+        async with lane.slot("title_generation"):
+            pass
+
+    @pytest.mark.asyncio
+    async def test_drop_when_full(self):
+        """Test tasks are dropped right away when the lane queue is full"""
+        lane = TaskLane(AdmissionController(), max_concurrency=1, max_queue_size=1)
+        outcomes = []
+        lane.on_complete = lambda task, outcome, waited, duration: outcomes.append(
+            outcome
+        )
+        release = asyncio.Event()
+
+        async def run():
+            async with lane.slot("follow_up_generation"):
+                await release.wait()
+
+        tasks = [asyncio.create_task(run()) for _ in range(2)]
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(AdmissionRejected):
+            async with lane.slot("follow_up_generation"):
+                pass
+
+        release.set()
+        await asyncio.wait_for(asyncio.gather(*tasks), timeout=1)
+        assert outcomes == ["dropped", "completed", "completed"]
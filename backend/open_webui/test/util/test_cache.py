@@ -0,0 +1,183 @@
+import asyncio
+from unittest.mock import Mock, patch
+
+import pytest
+
+from open_webui.utils import cache as cache_module
+from open_webui.utils.cache import LocalCache, SingleFlight, VersionStamp, single_flight
+
+
+class TestLocalCache:
+    """Test the per-instance TTL cache"""
+
+    def test_get_set(self):
+        """Test values are returned until they are evicted"""
+        cache = LocalCache("test_get_set", ttl=60)
+        assert cache.get("a") is None
+        assert cache.get("a", "default") == "default"
+
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+
+        cache.evict("a")
+        assert cache.get("a") is None
+
+    def test_ttl_expiry(self):
+        """Test entries expire after their TTL"""
+        cache = LocalCache("test_ttl_expiry", ttl=10)
+        with patch.object(cache_module.time, "monotonic", return_value=100.0):
+            cache.set("a", 1)
+        with patch.object(cache_module.time, "monotonic", return_value=105.0):
+            assert cache.get("a") == 1
+        with patch.object(cache_module.time, "monotonic", return_value=111.0):
+            assert cache.get("a") is None
+
+    def test_maxsize_evicts_least_recently_used(self):
+        """Test the least recently used entry is evicted when full"""
+        cache = LocalCache("test_maxsize", ttl=60, maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+    def test_disabled(self):
+        """Test a TTL of 0 disables the cache"""
+        cache = LocalCache("test_disabled", ttl=0)
+        cache.set("a", 1)
+        assert cache.get("a") is None
+
+    def test_invalidate_publishes(self):
+        """Test invalidate evicts locally and notifies other instances"""
+        cache = LocalCache("test_invalidate", ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+
+        redis = Mock()
+        with patch.object(cache_module, "_get_redis", return_value=redis):
+            cache.invalidate("a")
+
+        assert cache.get("a") is None
+        assert cache.get("b") == 2
+        redis.publish.assert_called_once_with(
+            cache_module.INVALIDATION_CHANNEL,
+            '{"cache": "test_invalidate", "key": "a"}',
+        )
+
+    def test_invalidation_message(self):
+        """Test invalidation messages from other instances evict entries"""
+        cache = LocalCache("test_message", ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+
+        cache_module._on_invalidate({"data": '{"cache": "test_message", "key": "a"}'})
+        assert cache.get("a") is None
+        assert cache.get("b") == 2
+
+        cache_module._on_invalidate({"data": '{"cache": "test_message", "key": null}'})
+        assert cache.get("b") is None
+
+
+class TestVersionStamp:
+    """Test the version stamp of derived caches"""
+
+    def test_bump(self):
+        """Test the version is stable until it is bumped"""
+        version = VersionStamp("test_bump", ttl=60)
+        first = version.get()
+        assert version.get() == first
+
+        with patch.object(cache_module, "_get_redis", return_value=None):
+            version.bump()
+        assert version.get() != first
+
+    def test_disabled(self):
+        """Test a TTL of 0 changes the version on every read"""
+        version = VersionStamp("test_version_disabled", ttl=0)
+        assert version.get() != version.get()
+
+    def test_fingerprint(self):
+        """Test changes of other instances are seen through the fingerprint"""
+        fingerprint = Mock(return_value=(1, 100, 100))
+        version = VersionStamp("test_fingerprint", ttl=3600, fingerprint=fingerprint)
+
+        with patch.object(cache_module, "_get_redis", return_value=None):
+            first = version.get()
+            fingerprint.return_value = (0, None, None)
+            assert version.get() == first
+
+            with patch.object(
+                cache_module.time,
+                "monotonic",
+                return_value=cache_module.time.monotonic() + 2,
+            ):
+                assert version.get() != first
+
+    def test_fingerprint_changing(self):
+        """Test the version is not reused while the fingerprint is unstable"""
+        version = VersionStamp(
+            "test_fingerprint_changing", ttl=3600, fingerprint=lambda: None
+        )
+
+        with patch.object(cache_module, "_get_redis", return_value=None):
+            assert version.get() != version.get()
+
+
+class TestSingleFlight:
+    """Test the coalescing of concurrent calls"""
+
+    @pytest.mark.asyncio
+    async def test_coalesces_concurrent_calls(self):
+        """Test concurrent callers with the same key share one call"""
+        calls = []
+
+        @single_flight(key=lambda url: url)
+        async def fetch(url):
+            calls.append(url)
+            await asyncio.sleep(0.01)
+            return {"url": url}
+
+        results = await asyncio.gather(
+            fetch("http://a"), fetch("http://a"), fetch("http://b")
+        )
+
+        assert calls == ["http://a", "http://b"]
+        assert results[0] is results[1]
+
+        # Finished calls are not reused
+        await fetch("http://a")
+        assert calls == ["http://a", "http://b", "http://a"]
+
+    @pytest.mark.asyncio
+    async def test_shares_exceptions(self):
+        """Test every caller gets the exception of the call"""
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("down")
+
+        results = await asyncio.gather(
+            flight.do("a", fail), flight.do("a", fail), return_exceptions=True
+        )
+
+        assert all(isinstance(result, ValueError) for result in results)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller(self):
+        """Test cancelling one caller does not cancel the call of the others"""
+        flight = SingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.01)
+            return 1
+
+        first = asyncio.ensure_future(flight.do("a", fetch))
+        second = asyncio.ensure_future(flight.do("a", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        assert await second == 1
@@ -0,0 +1,61 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from open_webui.utils import chat_buffer as chat_buffer_module
+from open_webui.utils.chat_buffer import ChatMessageWriteBuffer
+
+
+class TestChatMessageWriteBuffer:
+    """Test the write-behind buffer of realtime chat saves"""
+
+    @pytest.mark.asyncio
+    async def test_batches_updates(self):
+        """Test updates within the interval are merged into one write"""
+        buffer = ChatMessageWriteBuffer("chat", "message", interval=60, max_size=100)
+
+        with patch.object(
+            chat_buffer_module.Chats, "upsert_message_to_chat_by_id_and_message_id"
+        ) as upsert:
+            buffer.update({"content": "a"})
+            buffer.update({"content": "ab"})
+            assert not upsert.called
+
+            buffer.flush()
+            upsert.assert_called_once_with("chat", "message", {"content": "ab"})
+
+    @pytest.mark.asyncio
+    async def test_flushes_when_stream_pauses(self):
+        """Test pending updates are written once the interval passed without updates"""
+        buffer = ChatMessageWriteBuffer("chat", "message", interval=0.05, max_size=100)
+
+        with patch.object(
+            chat_buffer_module.Chats, "upsert_message_to_chat_by_id_and_message_id"
+        ) as upsert:
+            buffer.update({"content": "a"})
+            assert not upsert.called
+
+            await asyncio.sleep(0.1)
+            upsert.assert_called_once_with("chat", "message", {"content": "a"})
+
+            # Nothing left to write
+            buffer.flush()
+            assert upsert.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_retries_failed_write(self):
+        """Test a failed write is kept and retried after the interval"""
+        buffer = ChatMessageWriteBuffer("chat", "message", interval=0.05, max_size=100)
+
+        with patch.object(
+            chat_buffer_module.Chats,
+            "upsert_message_to_chat_by_id_and_message_id",
+            side_effect=[Exception("locked"), None],
+        ) as upsert:
+            buffer.update({"content": "a"})
+            buffer.flush()
+
+            await asyncio.sleep(0.1)
+            assert upsert.call_count == 2
+            assert upsert.call_args.args[2] == {"content": "a"}
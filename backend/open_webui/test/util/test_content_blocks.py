@@ -0,0 +1,136 @@
+from open_webui.utils.content_blocks import (
+    ContentBlocksSerializer,
+    ContentTagParser,
+    serialize_content_blocks,
+)
+
+TAGS = [
+    ("reasoning", [("<think>", "</think>"), ("<thinking>", "</thinking>")]),
+    ("code_interpreter", [("<code_interpreter>", "</code_interpreter>")]),
+]
+
+
+def parse_chunks(chunks):
+    parser = ContentTagParser(TAGS)
+    content_blocks = [{"type": "text", "content": ""}]
+    end = False
+    for chunk in chunks:
+        end = parser.feed(chunk, content_blocks)
+        if end:
+            break
+    parser.flush(content_blocks)
+    return [(block["type"], block["content"]) for block in content_blocks], end
+
+
+class TestContentBlocksSerializer:
+    """Test incremental serialization of streaming content blocks"""
+
+    def test_matches_full_serialization(self):
+        """Test that incremental output matches a full re-render"""
+        serializer = ContentBlocksSerializer()
+        content_blocks = [{"type": "text", "content": "Hello"}]
+        assert serializer.serialize(content_blocks) == "Hello"
+
+        content_blocks.append(
+            {
+                "type": "reasoning",
+                "start_tag": "<think>",
+                "end_tag": "</think>",
+                "content": "step one",
+            }
+        )
+        content_blocks[-1]["content"] += "\nstep two"
+        assert serializer.serialize(content_blocks) == serialize_content_blocks(
+            content_blocks
+        )
+
+        content_blocks[-1]["duration"] = 2
+        content_blocks.append({"type": "text", "content": "Answer"})
+        assert serializer.serialize(content_blocks) == serialize_content_blocks(
+            content_blocks
+        )
+
+    def test_finished_block_removed(self):
+        """Test that removing a finished block invalidates the cached prefix"""
+        serializer = ContentBlocksSerializer()
+        content_blocks = [
+            {"type": "text", "content": "first"},
+            {"type": "text", "content": "second"},
+        ]
+        assert serializer.serialize(content_blocks) == "first\nsecond"
+
+        content_blocks.pop(0)
+        content_blocks.append({"type": "text", "content": "third"})
+        assert serializer.serialize(content_blocks) == "second\nthird"
+
+    def test_held_text_released_into_finished_block(self):
+        """Test text released into a finished block is part of the output"""
+        serializer = ContentBlocksSerializer()
+        parser = ContentTagParser(TAGS)
+        content_blocks = [{"type": "text", "content": ""}]
+
+        parser.feed("Hi <thi", content_blocks)
+        assert serializer.serialize(content_blocks) == "Hi"
+
+        # Reasoning streamed outside of the content closes the text block
+        content_blocks.append(
+            {
+                "type": "reasoning",
+                "start_tag": "<think>",
+                "end_tag": "</think>",
+                "content": "plan",
+                "duration": 1,
+            }
+        )
+        serializer.serialize(content_blocks)
+        content_blocks.append({"type": "text", "content": ""})
+
+        parser.feed("s is text", content_blocks)
+        assert content_blocks[0]["content"] == "Hi <thi"
+        assert serializer.serialize(content_blocks) == serialize_content_blocks(
+            content_blocks
+        )
+
+    def test_empty(self):
+        """Test serializing no blocks"""
+        assert ContentBlocksSerializer().serialize([]) == ""
+
+
+class TestContentTagParser:
+    """Test incremental tag detection on streamed chunks"""
+
+    def test_single_chunk(self):
+        """Test tags within a single chunk"""
+        blocks, end = parse_chunks(["Hi <think>plan</think> done"])
+        assert blocks == [("text", "Hi "), ("reasoning", "plan"), ("text", " done")]
+        assert end is False
+
+    def test_tags_split_across_chunks(self):
+        """Test start and end tags split over chunk boundaries"""
+        text = "Hi <thinking>plan</thinking> done"
+        expected, _ = parse_chunks([text])
+        for size in range(1, 8):
+            chunks = [text[i : i + size] for i in range(0, len(text), size)]
+            assert parse_chunks(chunks)[0] == expected
+
+    def test_partial_tag_flushed(self):
+        """Test a trailing partial tag is kept as text at the end of the stream"""
+        blocks, _ = parse_chunks(["a < b <thi"])
+        assert blocks == [("text", "a < b <thi")]
+
+    def test_code_interpreter_attributes(self):
+        """Test attributes on start tags and the end flag of code blocks"""
+        parser = ContentTagParser(TAGS)
+        content_blocks = [{"type": "text", "content": ""}]
+        parser.feed('<code_interpreter type="code" lang="py', content_blocks)
+        end = parser.feed('thon">print(1)</code_interpreter>', content_blocks)
+
+        assert end is True
+        assert content_blocks[-1]["type"] == "code_interpreter"
+        assert content_blocks[-1]["content"] == "print(1)"
+        assert content_blocks[-1]["attributes"] == {"type": "code", "lang": "python"}
+
+    def test_empty_block_removed(self):
+        """Test a block with no content is dropped"""
+        blocks, _ = parse_chunks(["<think>", "  </think>after"])
+        assert blocks == [("text", "after")]
@@ -0,0 +1,72 @@
+import asyncio
+import threading
+
+import aiohttp
+import pytest
+
+from open_webui.utils.http_sessions import HTTPSessions
+
+
+class TestHTTPSessions:
+    """Test the pooled client sessions of upstream connections"""
+
+    @pytest.mark.asyncio
+    async def test_shares_session_per_connection(self):
+        """Test requests to the same connection share one session"""
+        sessions = HTTPSessions()
+
+        session = sessions.get("http://ollama:11434/api/chat")
+        assert sessions.get("http://ollama:11434/api/tags") is session
+        assert sessions.get("http://other:11434/api/chat") is not session
+
+        await sessions.close()
+
+    @pytest.mark.asyncio
+    async def test_session_per_event_loop(self):
+        """Test other event loops get their own session, without replacing ours"""
+        sessions = HTTPSessions()
+        session = sessions.get("http://ollama:11434")
+
+        async def get_and_close():
+            other = sessions.get("http://ollama:11434")
+            await other.close()
+            return other
+
+        other_sessions = []
+        for _ in range(2):
+            thread = threading.Thread(
+                target=lambda: other_sessions.append(asyncio.run(get_and_close()))
+            )
+            thread.start()
+            thread.join()
+
+        assert session not in other_sessions
+        assert other_sessions[0] is not other_sessions[1]
+        assert sessions.get("http://ollama:11434") is session
+
+        await sessions.close()
+
+    @pytest.mark.asyncio
+    async def test_does_not_store_cookies(self):
+        """Test shared sessions never keep cookies of a user"""
+        sessions = HTTPSessions()
+
+        session = sessions.get("http://ollama:11434")
+        assert isinstance(session.cookie_jar, aiohttp.DummyCookieJar)
+
+        await sessions.close()
+
+    @pytest.mark.asyncio
+    async def test_close(self):
+        """Test closed sessions are replaced"""
+        sessions = HTTPSessions()
+
+        session = sessions.get("http://ollama:11434")
+        sync_session = sessions.get_sync("http://ollama:11434")
+        await sessions.close()
+
+        assert session.closed
+        assert sessions.get("http://ollama:11434") is not session
+        assert sessions.get_sync("http://ollama:11434") is not sync_session
+
+        await sessions.close()
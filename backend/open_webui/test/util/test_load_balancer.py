@@ -0,0 +1,152 @@
+import asyncio
+from collections import Counter
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from open_webui.utils import load_balancer as load_balancer_module
+from open_webui.utils.load_balancer import LoadBalancer, ModelResidency
+
+URLS = ["http://gpu-1:11434", "http://gpu-2:11434", "http://gpu-3:11434"]
+
+
+class TestLoadBalancer:
+    """Test the selection of connections serving the same model"""
+
+    def test_least_outstanding(self):
+        """Test requests go to the connection with the fewest requests in flight"""
+        balancer = LoadBalancer(strategy="least_outstanding")
+
+        balancer.track(URLS[0])
+        balancer.track(URLS[2])
+
+        assert balancer.select(URLS) == 1
+
+    def test_finished_requests_are_not_outstanding(self):
+        """Test finished requests no longer count as load"""
+        balancer = LoadBalancer(strategy="least_outstanding")
+
+        tracker = balancer.track(URLS[0])
+        tracker.respond(200)
+        tracker.finish()
+        tracker.finish()
+
+        assert balancer.get_stats(URLS[0]).outstanding == 0
+
+    def test_weighted_round_robin(self):
+        """Test picks are proportional to the weights and spread out"""
+        balancer = LoadBalancer(strategy="round_robin")
+
+        picks = [balancer.select(URLS, [3, 1, 1]) for _ in range(10)]
+
+        assert Counter(picks) == {0: 6, 1: 2, 2: 2}
+        assert picks[:3] != [0, 0, 0]
+
+    def test_latency(self):
+        """Test requests go to the connection answering fastest"""
+        balancer = LoadBalancer(strategy="latency")
+
+        for url, latency in zip(URLS, [2.0, 0.5, 1.0]):
+            with patch.object(
+                load_balancer_module.time, "monotonic", side_effect=[0.0, latency]
+            ):
+                tracker = balancer.track(url)
+                tracker.respond(200)
+            tracker.finish()
+
+        assert balancer.select(URLS) == 1
+
+    def test_circuit_breaker(self):
+        """Test failing connections are taken out of rotation for the cooldown"""
+        balancer = LoadBalancer(
+            strategy="least_outstanding", failure_threshold=2, cooldown=30
+        )
+
+        for status in [500, None]:
+            tracker = balancer.track(URLS[0])
+            if status:
+                tracker.respond(status)
+            tracker.finish()
+
+        assert 0 not in {balancer.select(URLS[:2]) for _ in range(20)}
+
+        with patch.object(
+            load_balancer_module.time,
+            "monotonic",
+            return_value=load_balancer_module.time.monotonic() + 31,
+        ):
+            assert 0 in {balancer.select(URLS[:2]) for _ in range(20)}
+
+    def test_client_errors_are_not_failures(self):
+        """Test 4xx responses keep the connection in rotation"""
+        balancer = LoadBalancer(failure_threshold=1)
+
+        tracker = balancer.track(URLS[0])
+        tracker.respond(400)
+        tracker.finish()
+
+        assert balancer.get_stats(URLS[0]).is_available()
+
+    def test_all_unavailable(self):
+        """Test requests are still sent when every connection is failing"""
+        balancer = LoadBalancer(failure_threshold=1)
+
+        for url in URLS[:2]:
+            balancer.track(url).finish()
+
+        assert balancer.select(URLS[:2]) in (0, 1)
+
+    def test_preferred(self):
+        """Test preferred connections are used while they are available"""
+        balancer = LoadBalancer(strategy="least_outstanding", failure_threshold=1)
+
+        balancer.track(URLS[1])
+        assert balancer.select(URLS, preferred=[False, True, False]) == 1
+
+        balancer.track(URLS[1]).finish()
+        assert balancer.select(URLS, preferred=[False, True, False]) in (0, 2)
+
+    def test_preferred_saturated(self):
+        """Test other connections take the overflow of saturated preferred ones"""
+        balancer = LoadBalancer(
+            strategy="least_outstanding", preferred_max_outstanding=2
+        )
+
+        balancer.track(URLS[0])
+        assert balancer.select(URLS[:2], preferred=[True, False]) == 0
+
+        balancer.track(URLS[0])
+        assert balancer.select(URLS[:2], preferred=[True, False]) == 1
+        assert balancer.select(URLS[:2], preferred=[True, True]) == 1
+
+
+class TestModelResidency:
+    """Test the tracking of connections having a model loaded"""
+
+    def test_expires(self):
+        """Test models are assumed to be unloaded after the ttl"""
+        residency = ModelResidency(ttl=300)
+        residency.add("http://gpu-1:11434", "llama3:latest")
+
+        assert residency.contains("http://gpu-1:11434/api/chat", "llama3:latest")
+        assert not residency.contains("http://gpu-2:11434", "llama3:latest")
+
+        with patch.object(
+            load_balancer_module.time,
+            "monotonic",
+            return_value=load_balancer_module.time.monotonic() + 301,
+        ):
+            assert not residency.contains("http://gpu-1:11434", "llama3:latest")
+
+    @pytest.mark.asyncio
+    async def test_warm(self):
+        """Test a model is loaded once at a time and resident afterwards"""
+        residency = ModelResidency(ttl=300)
+        load = AsyncMock(return_value=True)
+
+        residency.warm("http://gpu-2:11434", "llama3:latest", load)
+        residency.warm("http://gpu-2:11434", "llama3:latest", load)
+        await asyncio.sleep(0)
+
+        assert load.await_count == 1
+        assert residency.contains("http://gpu-2:11434", "llama3:latest")
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from open_webui.utils.middleware import run_chat_payload_stages
+
+
+class TestRunChatPayloadStages:
+    """Test the concurrent pre-processing stages of chat payloads"""
+
+    @pytest.mark.asyncio
+    async def test_dependencies(self):
+        """Test independent stages overlap and dependent ones wait"""
+        events = []
+
+        def stage(name, delay, result=None):
+            async def run():
+                events.append(f"{name}:start")
+                await asyncio.sleep(delay)
+                events.append(f"{name}:end")
+                return result
+
+            return run
+
+        timings = await run_chat_payload_stages(
+            {
+                "memory": ([], stage("memory", 0.02)),
+                "web_search": ([], stage("web_search", 0.01)),
+                "tools": (["web_search", "disabled"], stage("tools", 0, False)),
+                "files": (["tools"], stage("files", 0)),
+            }
+        )
+
+        assert events[:2] == ["memory:start", "web_search:start"]
+        assert events.index("tools:start") > events.index("web_search:end")
+        assert events.index("files:start") > events.index("tools:end")
+        assert list(timings) == ["memory", "web_search", "files"]
+
+    @pytest.mark.asyncio
+    async def test_failure_cancels_stages(self):
+        """Test a failing stage cancels the others"""
+        cancelled = asyncio.Event()
+
+        async def fail():
+            raise ValueError("failed")
+
+        async def wait():
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        with pytest.raises(ValueError):
+            await run_chat_payload_stages({"memory": ([], fail), "files": ([], wait)})
+
+        await asyncio.sleep(0)
+        assert cancelled.is_set()
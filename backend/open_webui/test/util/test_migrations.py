@@ -0,0 +1,167 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+
+BACKEND_DIR = Path(__file__).resolve().parents[3]
+
+# The database is configured from the environment on import, so the migrations
+# run in a fresh interpreter
+UPGRADE_SCRIPT = textwrap.dedent(
+    """
+    import sys
+
+    from alembic import command
+    from alembic.config import Config
+
+    from open_webui.env import OPEN_WEBUI_DIR
+    from open_webui.internal.db import engine  # Runs the peewee migrations
+
+    config = Config(OPEN_WEBUI_DIR / "alembic.ini")
+    config.set_main_option("script_location", str(OPEN_WEBUI_DIR / "migrations"))
+    for revision in sys.argv[1:]:
+        if revision.startswith("sql:"):
+            with engine.begin() as connection:
+                connection.exec_driver_sql(revision[4:])
+        elif revision.startswith("py:"):
+            exec(revision[3:])
+        elif revision == "compress":
+            import open_webui.models.files  # Registers the compressed columns
+            from open_webui.internal.db import compress_json_columns
+
+            compress_json_columns()
+        else:
+            command.upgrade(config, revision)
+    """
+)
+
+
+def upgrade(tmp_path: Path, *revisions: str, **env: str) -> sqlite3.Connection:
+    database = tmp_path / "webui.db"
+    subprocess.run(
+        [sys.executable, "-c", UPGRADE_SCRIPT, *revisions],
+        cwd=BACKEND_DIR,
+        env={
+            **os.environ,
+            "DATA_DIR": str(tmp_path),
+            "DATABASE_URL": f"sqlite:///{database}",
+            "PYTHONPATH": os.pathsep.join(
+                filter(None, [str(BACKEND_DIR), os.environ.get("PYTHONPATH")])
+            ),
+            **env,
+        },
+        check=True,
+        capture_output=True,
+    )
+    return sqlite3.connect(database)
+
+
+class TestMigrations:
+    """Test the migration chain on a fresh database"""
+
+    def test_upgrade_head(self, tmp_path):
+        """Test every migration applies on top of the peewee schema"""
+        db = upgrade(tmp_path, "head")
+
+        tables = {row[0] for row in db.execute("SELECT name FROM sqlite_master")}
+        assert {"api_key", "group_member", "chat_message"} <= tables
+
+        config = Config()
+        config.set_main_option(
+            "script_location", str(BACKEND_DIR / "open_webui" / "migrations")
+        )
+        assert (
+            db.execute("SELECT version_num FROM alembic_version").fetchone()[0]
+            == ScriptDirectory.from_config(config).get_current_head()
+        )
+
+    def test_api_keys_moved(self, tmp_path):
+        """Test existing API keys are kept hashed, with a hint only"""
+        db = upgrade(
+            tmp_path,
+            "d4a8b6f2e317",
+            "sql:INSERT INTO user (id, name, email, role, profile_image_url, "
+            "api_key, created_at, updated_at, last_active_at) VALUES ('1', 'a', "
+            "'a@example.com', 'user', '', 'sk-0123456789abcdef', 0, 0, 0)",
+            "head",
+        )
+
+        assert db.execute("SELECT api_key FROM user").fetchall() == [(None,)]
+        assert db.execute("SELECT user_id, hint FROM api_key").fetchall() == [
+            ("1", "sk-...cdef")
+        ]
+
+    def test_existing_rows_compressed(self, tmp_path):
+        """Test rows written before compression was enabled are compressed later"""
+        content = "hello " * 1000
+        upgrade(
+            tmp_path,
+            "head",
+            "sql:INSERT INTO file (id, user_id, filename, data, created_at, "
+            f"updated_at) VALUES ('1', '1', 'a', '{{\"content\": \"{content}\"}}', "
+            "0, 0)",
+        )
+
+        db = upgrade(tmp_path, "compress", DATABASE_JSON_COMPRESSION="zlib")
+
+        data = json.loads(db.execute("SELECT data FROM file").fetchone()[0])
+        assert data["__compressed__"] == "zlib"
+
+    def test_chats_not_compressed(self, tmp_path):
+        """Test chats stay plain JSON for in place updates and search"""
+        db = upgrade(
+            tmp_path,
+            "head",
+            "py:"
+            + textwrap.dedent(
+                """
+                from open_webui.models.chats import ChatForm, Chats
+
+                messages = [{"content": "hello"}] * 500
+                chat = Chats.insert_new_chat(
+                    "1", ChatForm(chat={"title": "a", "messages": messages})
+                )
+                Chats.update_chat_search_by_id(chat.id)
+                assert Chats.get_chats_by_user_id_and_search_text("1", "hello")
+                """
+            ),
+            DATABASE_JSON_COMPRESSION="zlib",
+        )
+
+        chat = json.loads(db.execute("SELECT chat FROM chat").fetchone()[0])
+        assert "__compressed__" not in chat
+
+    def test_chat_search_rowid(self, tmp_path):
+        """Test index rows are kept once per chat and found by rowid"""
+        db = upgrade(
+            tmp_path,
+            "a1d6c3f8e2b4",
+            "sql:INSERT INTO chat_search (chat_id, user_id, title, content) "
+            "VALUES ('1', '1', 'zebra', '')",
+            "head",
+            "py:"
+            + textwrap.dedent(
+                """
+                from open_webui.models.chats import ChatForm, Chats
+
+                chat = Chats.insert_new_chat("1", ChatForm(chat={"title": "a"}))
+                Chats.update_chat_search_by_id(chat.id)
+                Chats.update_chat_title_by_id(chat.id, "zebra stripes")
+                assert len(Chats.get_chats_by_user_id_and_search_text("1", "zebra")) == 1
+
+                Chats.delete_chat_by_id(chat.id)
+                """
+            ),
+        )
+
+        assert db.execute("SELECT chat_id FROM chat_search").fetchall() == [("1",)]
+        assert db.execute(
+            "SELECT chat_search.rowid FROM chat_search JOIN chat_search_rowid "
+            "ON chat_search.rowid = chat_search_rowid.id"
+        ).fetchall() == db.execute("SELECT id FROM chat_search_rowid").fetchall()
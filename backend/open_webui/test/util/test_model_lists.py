@@ -0,0 +1,106 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from open_webui.utils import model_lists as model_lists_module
+from open_webui.utils.model_lists import ModelListCache
+
+
+class TestModelListCache:
+    """Test the stale-while-revalidate cache of connection model lists"""
+
+    @pytest.mark.asyncio
+    async def test_serves_stale_list_while_refreshing(self):
+        """Test a stale list is returned at once and refreshed in the background"""
+        cache = ModelListCache(interval=60, max_backoff=600)
+        fetch = AsyncMock(side_effect=[{"data": [1]}, {"data": [2]}])
+
+        with patch.object(model_lists_module.time, "time", return_value=1000.0):
+            assert await cache.get("http://a", "key", fetch) == {"data": [1]}
+
+        with patch.object(model_lists_module.time, "time", return_value=1100.0):
+            assert await cache.get("http://a", "key", fetch) == {"data": [1]}
+            await asyncio.sleep(0)
+            assert await cache.get("http://a", "key", fetch) == {"data": [2]}
+
+        assert fetch.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_keeps_last_good_list_on_failure(self):
+        """Test failures keep the last good list and back off"""
+        cache = ModelListCache(interval=60, max_backoff=600)
+        fetch = AsyncMock(side_effect=[{"data": [1]}, None, {"error": "down"}])
+
+        with patch.object(model_lists_module.time, "time", return_value=1000.0):
+            await cache.get("http://a", None, fetch)
+
+        with patch.object(model_lists_module.time, "time", return_value=1100.0):
+            await cache.get("http://a", None, fetch)
+            await asyncio.sleep(0)
+
+            # Backing off, no new fetch is started
+            assert await cache.get("http://a", None, fetch) == {"data": [1]}
+            await asyncio.sleep(0)
+
+        assert fetch.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_returns_copies(self):
+        """Test callers can modify the returned lists"""
+        cache = ModelListCache(interval=60, max_backoff=600)
+        fetch = AsyncMock(return_value={"data": [{"id": "a"}]})
+
+        models = await cache.get("http://a", None, fetch)
+        models["data"][0]["id"] = "b"
+
+        assert await cache.get("http://a", None, fetch) == {"data": [{"id": "a"}]}
+
+    @pytest.mark.asyncio
+    async def test_disabled(self):
+        """Test an interval of 0 fetches on every call"""
+        cache = ModelListCache(interval=0, max_backoff=600)
+        fetch = AsyncMock(return_value={"data": []})
+
+        await cache.get("http://a", None, fetch)
+        await cache.get("http://a", None, fetch)
+
+        assert fetch.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_invalidate_fetches_again(self):
+        """Test an invalidated list is fetched again instead of served stale"""
+        cache = ModelListCache(interval=60, max_backoff=600)
+        fetch = AsyncMock(side_effect=[{"data": [1]}, {"data": [2]}])
+
+        assert await cache.get("http://a", None, fetch) == {"data": [1]}
+        await cache.invalidate("http://a")
+
+        assert await cache.get("http://a", None, fetch) == {"data": [2]}
+        assert fetch.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_invalidate_ignores_running_refresh(self):
+        """Test a refresh started before invalidate() does not restore the old list"""
+        cache = ModelListCache(interval=60, max_backoff=600)
+        released = asyncio.Event()
+        responses = [{"data": [1]}, {"data": ["old"]}, {"data": [2]}]
+
+        async def fetch():
+            response = responses.pop(0)
+            if response == {"data": ["old"]}:
+                await released.wait()
+            return response
+
+        with patch.object(model_lists_module.time, "time", return_value=1000.0):
+            await cache.get("http://a", None, fetch)
+
+        with patch.object(model_lists_module.time, "time", return_value=1100.0):
+            await cache.get("http://a", None, fetch)
+            await asyncio.sleep(0)
+
+            await cache.invalidate("http://a")
+            released.set()
+            await asyncio.sleep(0)
+
+            assert await cache.get("http://a", None, fetch) == {"data": [2]}
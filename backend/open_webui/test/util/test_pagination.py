@@ -0,0 +1,59 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import BigInteger, Column, Text
+from sqlalchemy.orm import declarative_base
+
+from open_webui.utils.pagination import decode_cursor, encode_cursor, parse_cursor
+
+Base = declarative_base()
+
+
+class Item(Base):
+    __tablename__ = "item"
+
+    id = Column(Text, primary_key=True)
+    title = Column(Text)
+    updated_at = Column(BigInteger)
+
+
+class TestCursor:
+    """Test the cursors of keyset paginated listings"""
+
+    def test_round_trip(self):
+        """Test a cursor decodes to the value and id it was created from"""
+        for value in [1700000000, "title", None]:
+            cursor = encode_cursor(value, "chat-1")
+            assert "=" not in cursor
+            assert decode_cursor(cursor) == (value, "chat-1")
+            assert parse_cursor(cursor) == (value, "chat-1")
+
+    def test_invalid(self):
+        """Test malformed cursors are rejected"""
+        for cursor in [
+            "not a cursor",
+            encode_cursor("abc", 1),
+            encode_cursor([1], "a"),
+        ]:
+            with pytest.raises(ValueError):
+                decode_cursor(cursor)
+            with pytest.raises(HTTPException) as e:
+                parse_cursor(cursor)
+            assert e.value.status_code == 400
+
+    def test_column_type(self):
+        """Test cursor values must match the type of the sort column"""
+        assert parse_cursor(encode_cursor(1700000000, "a"), Item.updated_at) == (
+            1700000000,
+            "a",
+        )
+        assert parse_cursor(encode_cursor("abc", "a"), Item.title) == ("abc", "a")
+
+        for value in ["abc", True, None, 1.5]:
+            with pytest.raises(HTTPException) as e:
+                parse_cursor(encode_cursor(value, "a"), Item.updated_at)
+            assert e.value.status_code == 400
+
+    def test_empty(self):
+        """Test listings without a cursor start from the first page"""
+        assert parse_cursor(None) is None
+        assert parse_cursor("", Item.updated_at) is None
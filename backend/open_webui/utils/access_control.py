@@ -1,11 +1,50 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
 from typing import Optional, Set, Union, List, Dict, Any
 from open_webui.models.users import Users, UserModel
-from open_webui.models.groups import Groups
+from open_webui.models.groups import Groups, GroupAccessModel
 
 
 from open_webui.config import DEFAULT_USER_PERMISSIONS
+from open_webui.env import AUTH_PERMISSIONS_CACHE_TTL, AUTH_USER_CACHE_SIZE
+from open_webui.utils.cache import LocalCache
 import json
 
+# GroupAccessModel by user id for the current request, see permissions_scope()
+_request_group_access: ContextVar[Optional[dict]] = ContextVar(
+    "request_group_access", default=None
+)
+
+# (GroupAccessModel, JSON of the permissions) by user id and default permissions,
+# the merged permissions are recomputed when the access they were built from was
+# replaced. Every caller gets its own copy to modify.
+_merged_permissions = LocalCache(
+    "permissions", AUTH_PERMISSIONS_CACHE_TTL, AUTH_USER_CACHE_SIZE
+)
+
+
+@contextmanager
+def permissions_scope():
+    """Resolve the groups of each user at most once inside the block, e.g. a request."""
+    token = _request_group_access.set({})
+    try:
+        yield
+    finally:
+        _request_group_access.reset(token)
+
+
+def get_group_access(user_id: str) -> GroupAccessModel:
+    """Group ids and group permissions of a user, cached per request and instance."""
+    request_cache = _request_group_access.get()
+    if request_cache is None:
+        return Groups.get_group_access_by_member_id(user_id)
+
+    item = request_cache.get(user_id)
+    if item is None or item[0] != Groups.access_version:
+        item = (Groups.access_version, Groups.get_group_access_by_member_id(user_id))
+        request_cache[user_id] = item
+    return item[1]
+
 
 def fill_missing_permissions(
     permissions: Dict[str, Any], default_permissions: Dict[str, Any]
@@ -53,19 +92,28 @@ def get_permissions(
                     )  # Use the most permissive value (True > False)
         return permissions
 
-    user_groups = Groups.get_groups_by_member_id(user_id)
+    access = get_group_access(user_id)
+
+    serialized_default_permissions = json.dumps(default_permissions, sort_keys=True)
+    cache_key = (user_id, serialized_default_permissions)
+
+    item = _merged_permissions.get(cache_key)
+    if item is not None and item[0] is access:
+        return json.loads(item[1])
 
     # Deep copy default permissions to avoid modifying the original dict
-    permissions = json.loads(json.dumps(default_permissions))
+    permissions = json.loads(serialized_default_permissions)
 
     # Combine permissions from all user groups
-    for group in user_groups:
-        permissions = combine_permissions(permissions, group.permissions or {})
+    for group_permissions in access.permissions:
+        permissions = combine_permissions(permissions, group_permissions)
 
     # Ensure all fields from default_permissions are present and filled in
     permissions = fill_missing_permissions(permissions, default_permissions)
 
-    return permissions
+    serialized_permissions = json.dumps(permissions)
+    _merged_permissions.set(cache_key, (access, serialized_permissions))
+    return json.loads(serialized_permissions)
 
 
 def has_permission(
@@ -92,10 +140,8 @@ def has_permission(
     permission_hierarchy = permission_key.split(".")
 
     # Retrieve user group permissions
-    user_groups = Groups.get_groups_by_member_id(user_id)
-
-    for group in user_groups:
-        if get_permission(group.permissions or {}, permission_hierarchy):
+    for group_permissions in get_group_access(user_id).permissions:
+        if get_permission(group_permissions, permission_hierarchy):
             return True
 
     # Check default permissions afterward if the group permissions don't allow it
@@ -119,8 +165,7 @@ def has_access(
             return True
 
     if user_group_ids is None:
-        user_groups = Groups.get_groups_by_member_id(user_id)
-        user_group_ids = {group.id for group in user_groups}
+        user_group_ids = get_group_access(user_id).group_ids
 
     permission_access = access_control.get(type, {})
     permitted_group_ids = permission_access.get("group_ids", [])
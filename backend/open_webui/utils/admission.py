@@ -0,0 +1,587 @@
+import asyncio
+import itertools
+import json
+import logging
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Optional
+
+from starlette.background import BackgroundTasks
+from starlette.responses import StreamingResponse
+
+from open_webui.env import (
+    CHAT_COMPLETION_MAX_CONCURRENCY,
+    CHAT_COMPLETION_MAX_CONCURRENCY_PER_MODEL,
+    CHAT_COMPLETION_MAX_CONCURRENCY_PER_USER,
+    CHAT_COMPLETION_MAX_QUEUE_SIZE,
+    CHAT_COMPLETION_QUEUE_TIMEOUT,
+    REDIS_KEY_PREFIX,
+    SRC_LOG_LEVELS,
+    TASK_GENERATION_DEFER_THRESHOLD,
+    TASK_GENERATION_MAX_CONCURRENCY,
+    TASK_GENERATION_MAX_QUEUE_SIZE,
+    TASK_GENERATION_QUEUE_TIMEOUT,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+
+# Requests of instances that stopped renewing them are dropped after this many seconds
+LEASE_TIMEOUT = 30
+POLL_INTERVAL = 0.25
+
+# Removes the requests of instances that went away, shared by the scripts below
+_EXPIRE_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+
+for _, member in ipairs(redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', now)) do
+    redis.call('ZREM', KEYS[3], member)
+    redis.call('HDEL', KEYS[4], member)
+end
+for _, member in ipairs(redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now)) do
+    redis.call('ZREM', KEYS[1], member)
+    redis.call('ZREM', KEYS[2], member)
+    redis.call('HDEL', KEYS[4], member)
+end
+"""
+
+# KEYS: queue, queue leases, running leases, tickets, state
+# ARGV: ticket id, ticket JSON, lease timeout, max queue size
+_ENQUEUE_SCRIPT = (
+    _EXPIRE_SCRIPT
+    + """
+if tonumber(ARGV[4]) > 0 and redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[4]) then
+    return false
+end
+
+local user = cjson.decode(ARGV[2])['user']
+local tag = math.max(
+    tonumber(redis.call('HGET', KEYS[5], 'vt') or 0),
+    tonumber(redis.call('HGET', KEYS[5], 'u:' .. user) or 0)
+) + 1
+redis.call('HSET', KEYS[5], 'u:' .. user, tag)
+
+local member = string.format('%016d:%s', redis.call('HINCRBY', KEYS[5], 'seq', 1), ARGV[1])
+redis.call('ZADD', KEYS[1], tag, member)
+redis.call('ZADD', KEYS[2], now + tonumber(ARGV[3]), member)
+redis.call('HSET', KEYS[4], member, ARGV[2])
+return member
+"""
+)
+
+# KEYS: queue, queue leases, running leases, tickets, state
+# ARGV: member, lease timeout, max concurrency, per model, per user
+# Returns {1, 0} once admitted, {0, position} while waiting, {-1, 0} if expired
+_ADMIT_SCRIPT = (
+    _EXPIRE_SCRIPT
+    + """
+local member = ARGV[1]
+local rank = redis.call('ZRANK', KEYS[1], member)
+if not rank then
+    return {-1, 0}
+end
+redis.call('ZADD', KEYS[2], now + tonumber(ARGV[2]), member)
+
+local max_all, max_model, max_user = tonumber(ARGV[3]), tonumber(ARGV[4]), tonumber(ARGV[5])
+local total, models, users = 0, {}, {}
+for _, running in ipairs(redis.call('ZRANGE', KEYS[3], 0, -1)) do
+    local ticket = cjson.decode(redis.call('HGET', KEYS[4], running))
+    total = total + 1
+    models[ticket['model']] = (models[ticket['model']] or 0) + 1
+    users[ticket['user']] = (users[ticket['user']] or 0) + 1
+end
+
+-- Requests ahead in the queue that could start take their slots first
+local position = 0
+for _, queued in ipairs(redis.call('ZRANGE', KEYS[1], 0, rank)) do
+    local ticket = cjson.decode(redis.call('HGET', KEYS[4], queued))
+    local admissible = (max_all <= 0 or total < max_all)
+        and (max_model <= 0 or (models[ticket['model']] or 0) < max_model)
+        and (max_user <= 0 or (users[ticket['user']] or 0) < max_user)
+
+    if queued == member then
+        if not admissible then
+            return {0, position + 1}
+        end
+
+        local tag = tonumber(redis.call('ZSCORE', KEYS[1], member))
+        if tag > tonumber(redis.call('HGET', KEYS[5], 'vt') or 0) then
+            redis.call('HSET', KEYS[5], 'vt', tag)
+        end
+        if tonumber(redis.call('HGET', KEYS[5], 'u:' .. ticket['user']) or 0) <= tag then
+            redis.call('HDEL', KEYS[5], 'u:' .. ticket['user'])
+        end
+
+        redis.call('ZREM', KEYS[1], member)
+        redis.call('ZREM', KEYS[2], member)
+        redis.call('ZADD', KEYS[3], now + tonumber(ARGV[2]), member)
+        return {1, 0}
+    end
+
+    position = position + 1
+    if admissible then
+        total = total + 1
+        models[ticket['model']] = (models[ticket['model']] or 0) + 1
+        users[ticket['user']] = (users[ticket['user']] or 0) + 1
+    end
+end
+return {0, position}
+"""
+)
+
+# KEYS: queue, queue leases, running leases, tickets
+# ARGV: member, lease timeout
+_RENEW_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+return redis.call('ZADD', KEYS[3], 'XX', 'CH', now + tonumber(ARGV[2]), ARGV[1])
+"""
+
+_RELEASE_SCRIPT = """
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('ZREM', KEYS[2], ARGV[1])
+redis.call('ZREM', KEYS[3], ARGV[1])
+redis.call('HDEL', KEYS[4], ARGV[1])
+return 1
+"""
+
+
+# Ticket of the chat completion being processed
+_current_ticket: ContextVar[Optional["AdmissionTicket"]] = ContextVar(
+    "admission_ticket", default=None
+)
+
+
+class AdmissionRejected(Exception):
+    pass
+
+
+class AdmissionTicket:
+    def __init__(self, user_id: str, model_id: str):
+        self.id = str(uuid.uuid4())
+        self.user_id = user_id
+        self.model_id = model_id
+
+        # Queue entry, ordered by fair-share tag and arrival
+        self.member: Optional[str] = None
+        self.tag = 0.0
+        self.seq = 0
+
+        # Whether the request waited in the queue, holds a slot, or is done
+        self.queued = False
+        self.admitted = False
+        self.released = False
+
+        self.heartbeat: Optional[asyncio.Task] = None
+
+
+class AdmissionController:
+    """
+    Limits the chat completions generated at the same time, overall, per model and
+    per user. Requests over a limit wait in a queue until a slot is released or the
+    wait times out.
+
+    The queue is fair between users (start-time fair queuing): each request is
+    tagged one step after the later of the current virtual time and the tag of the
+    previous request of its user, and waiting requests start in tag order. A user
+    sending a burst of requests therefore only gets every other slot while someone
+    else is waiting, instead of all of them. Requests further back may start when
+    those ahead are blocked by their per-model or per-user limit.
+
+    With Redis, the queue and the running requests are shared by all instances.
+    Instances renew the leases of their requests, those of instances that went
+    away expire after LEASE_TIMEOUT seconds.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 0,
+        max_concurrency_per_model: int = 0,
+        max_concurrency_per_user: int = 0,
+        queue_timeout: float = 60.0,
+        max_queue_size: int = 0,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_concurrency_per_model = max_concurrency_per_model
+        self.max_concurrency_per_user = max_concurrency_per_user
+        self.queue_timeout = queue_timeout
+        self.max_queue_size = max_queue_size
+        self.redis = None
+
+        # Completions admitted on this instance and not released yet
+        self.active = 0
+
+        self._queue: dict[str, AdmissionTicket] = {}
+        self._running: dict[str, AdmissionTicket] = {}
+        self._virtual_time = 0.0
+        self._user_tags: dict[str, float] = {}
+        self._seq = itertools.count()
+        self._changed = asyncio.Event()
+
+    @property
+    def enabled(self) -> bool:
+        return (
+            self.max_concurrency > 0
+            or self.max_concurrency_per_model > 0
+            or self.max_concurrency_per_user > 0
+        )
+
+    def _get_keys(self) -> list[str]:
+        # Hash tag so that the keys share a slot on Redis Cluster
+        prefix = f"{{{REDIS_KEY_PREFIX}:admission}}"
+        return [
+            f"{prefix}:queue",
+            f"{prefix}:queue_leases",
+            f"{prefix}:running",
+            f"{prefix}:tickets",
+            f"{prefix}:state",
+        ]
+
+    async def acquire(
+        self,
+        user_id: str,
+        model_id: str,
+        on_position: Optional[Callable[[int], Awaitable[None]]] = None,
+    ) -> AdmissionTicket:
+        """
+        Wait for a slot to generate a completion of the model for the user, calling
+        on_position with the position in the queue whenever it changes. Raises
+        AdmissionRejected if the queue is full or the wait timed out.
+        """
+        ticket = AdmissionTicket(user_id, model_id)
+        if self.enabled:
+            await self._wait(ticket, on_position)
+
+        ticket.admitted = True
+        self.active += 1
+        _current_ticket.set(ticket)
+        return ticket
+
+    async def _wait(
+        self,
+        ticket: AdmissionTicket,
+        on_position: Optional[Callable[[int], Awaitable[None]]] = None,
+    ):
+        if not await self._enqueue(ticket):
+            raise AdmissionRejected(
+                "Too many requests are waiting to be processed, please try again later."
+            )
+
+        deadline = time.monotonic() + self.queue_timeout
+        last_position = None
+        try:
+            while True:
+                changed = self._changed
+                position = await self._try_admit(ticket)
+                if position == 0:
+                    break
+
+                ticket.queued = True
+                if position != last_position and on_position is not None:
+                    last_position = position
+                    await on_position(position)
+
+                if time.monotonic() >= deadline:
+                    raise AdmissionRejected(
+                        "The server is busy processing other requests, please try again later."
+                    )
+
+                try:
+                    # Released slots of this instance are noticed right away
+                    await asyncio.wait_for(
+                        changed.wait(),
+                        timeout=min(POLL_INTERVAL, deadline - time.monotonic()),
+                    )
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            await self.release(ticket)
+            raise
+
+        if self.redis is not None:
+            ticket.heartbeat = asyncio.create_task(self._renew(ticket))
+
+    async def release(self, ticket: Optional[AdmissionTicket]):
+        """Release the slot, or queue entry, of a ticket."""
+        if ticket is None or ticket.released:
+            return
+        ticket.released = True
+
+        if ticket.admitted:
+            ticket.admitted = False
+            self.active -= 1
+
+        if ticket.heartbeat is not None:
+            ticket.heartbeat.cancel()
+
+        if self.redis is not None:
+            if ticket.member is not None:
+                try:
+                    await self.redis.eval(
+                        _RELEASE_SCRIPT, 4, *self._get_keys()[:4], ticket.member
+                    )
+                except Exception as e:
+                    log.warning(f"Failed to release the chat completion slot: {e}")
+        else:
+            self._queue.pop(ticket.id, None)
+            self._running.pop(ticket.id, None)
+
+        # Wake up the requests waiting on this instance
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def release_current(self):
+        """Release the slot of the chat completion being processed, once generated."""
+        await self.release(_current_ticket.get())
+
+    def release_after(self, response, ticket: Optional[AdmissionTicket]) -> bool:
+        """
+        Release the slot once a streaming response was sent, returns False if the
+        response is not streamed and the slot should be released by the caller.
+        """
+        if ticket is None or not isinstance(response, StreamingResponse):
+            return False
+
+        background = BackgroundTasks()
+        if response.background is not None:
+            background.add_task(response.background)
+        background.add_task(self.release, ticket)
+
+        response.background = background
+        return True
+
+    async def get_queue_size(self) -> int:
+        """Requests waiting for a slot, on every instance with Redis."""
+        if not self.enabled:
+            return 0
+        if self.redis is not None:
+            return await self.redis.zcard(self._get_keys()[0])
+        return len(self._queue)
+
+    async def _enqueue(self, ticket: AdmissionTicket) -> bool:
+        if self.redis is not None:
+            member = await self.redis.eval(
+                _ENQUEUE_SCRIPT,
+                5,
+                *self._get_keys(),
+                ticket.id,
+                json.dumps({"model": ticket.model_id, "user": ticket.user_id}),
+                LEASE_TIMEOUT,
+                self.max_queue_size,
+            )
+            ticket.member = member or None
+            return ticket.member is not None
+
+        if self.max_queue_size > 0 and len(self._queue) >= self.max_queue_size:
+            return False
+
+        ticket.tag = (
+            max(self._virtual_time, self._user_tags.get(ticket.user_id, 0.0)) + 1
+        )
+        ticket.seq = next(self._seq)
+        self._user_tags[ticket.user_id] = ticket.tag
+        self._queue[ticket.id] = ticket
+        return True
+
+    async def _try_admit(self, ticket: AdmissionTicket) -> int:
+        """Admit the ticket if possible, returns 0 once admitted or its position."""
+        if self.redis is not None:
+            admitted, position = await self.redis.eval(
+                _ADMIT_SCRIPT,
+                5,
+                *self._get_keys(),
+                ticket.member,
+                LEASE_TIMEOUT,
+                self.max_concurrency,
+                self.max_concurrency_per_model,
+                self.max_concurrency_per_user,
+            )
+            if admitted == -1:
+                raise AdmissionRejected("The request expired while waiting.")
+            return 0 if admitted == 1 else position
+
+        total = len(self._running)
+        models = Counter(running.model_id for running in self._running.values())
+        users = Counter(running.user_id for running in self._running.values())
+
+        position = 0
+        for queued in sorted(
+            self._queue.values(), key=lambda queued: (queued.tag, queued.seq)
+        ):
+            admissible = (
+                (self.max_concurrency <= 0 or total < self.max_concurrency)
+                and (
+                    self.max_concurrency_per_model <= 0
+                    or models[queued.model_id] < self.max_concurrency_per_model
+                )
+                and (
+                    self.max_concurrency_per_user <= 0
+                    or users[queued.user_id] < self.max_concurrency_per_user
+                )
+            )
+
+            if queued is ticket:
+                if not admissible:
+                    return position + 1
+
+                self._virtual_time = max(self._virtual_time, ticket.tag)
+                # A later request of the user may have been admitted first
+                if self._user_tags.get(ticket.user_id, 0.0) <= ticket.tag:
+                    self._user_tags.pop(ticket.user_id, None)
+
+                del self._queue[ticket.id]
+                self._running[ticket.id] = ticket
+                return 0
+
+            position += 1
+            if admissible:
+                total += 1
+                models[queued.model_id] += 1
+                users[queued.user_id] += 1
+
+        return position
+
+    async def _renew(self, ticket: AdmissionTicket):
+        while True:
+            await asyncio.sleep(LEASE_TIMEOUT / 3)
+            try:
+                await self.redis.eval(
+                    _RENEW_SCRIPT,
+                    4,
+                    *self._get_keys()[:4],
+                    ticket.member,
+                    LEASE_TIMEOUT,
+                )
+            except Exception as e:
+                log.warning(f"Failed to renew the chat completion slot: {e}")
+
+
+class TaskLane:
+    """
+    Lower priority lane for the generations of background tasks (titles, tags,
+    follow-ups, autocompletion, emojis), with its own concurrency budget.
+
+    Tasks are deferred while interactive chat completions wait for a slot, or while
+    at least defer_threshold of them run on this instance, and start in arrival
+    order otherwise. They are dropped after waiting queue_timeout seconds, or right
+    away when max_queue_size tasks are already waiting.
+    """
+
+    def __init__(
+        self,
+        interactive: AdmissionController,
+        max_concurrency: int = 0,
+        max_queue_size: int = 0,
+        queue_timeout: float = 30.0,
+        defer_threshold: int = 0,
+    ):
+        self.interactive = interactive
+        self.max_concurrency = max_concurrency
+        self.max_queue_size = max_queue_size
+        self.queue_timeout = queue_timeout
+        self.defer_threshold = defer_threshold
+
+        self.running = 0
+        # Called with the task, its outcome ("completed", "failed" or "dropped"),
+        # and the seconds it waited and ran, see utils/telemetry/metrics.py
+        self.on_complete: Optional[Callable[[str, str, float, float], None]] = None
+
+        self._queue: deque[object] = deque()
+        self._changed = asyncio.Event()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._queue)
+
+    async def is_deferred(self) -> bool:
+        if self.max_concurrency > 0 and self.running >= self.max_concurrency:
+            return True
+        if self.defer_threshold > 0 and self.interactive.active >= self.defer_threshold:
+            return True
+        return await self.interactive.get_queue_size() > 0
+
+    @asynccontextmanager
+    async def slot(self, task: str):
+        """Wait for the task to be run, raises AdmissionRejected if it was dropped."""
+        started_at = time.monotonic()
+
+        if (self._queue or await self.is_deferred()) and (
+            0 < self.max_queue_size <= len(self._queue)
+        ):
+            self._report(task, "dropped", 0.0, 0.0)
+            raise AdmissionRejected("Too many background tasks are waiting.")
+
+        token = object()
+        self._queue.append(token)
+        try:
+            deadline = started_at + self.queue_timeout
+            while True:
+                changed = self._changed
+                if self._queue[0] is token and not await self.is_deferred():
+                    break
+
+                if time.monotonic() >= deadline:
+                    self._report(task, "dropped", time.monotonic() - started_at, 0.0)
+                    raise AdmissionRejected(
+                        "The background task was dropped, the server is busy."
+                    )
+
+                try:
+                    await asyncio.wait_for(
+                        changed.wait(),
+                        timeout=min(POLL_INTERVAL, deadline - time.monotonic()),
+                    )
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._queue.remove(token)
+            self._notify()
+
+        waited_at = time.monotonic()
+        self.running += 1
+        outcome = "failed"
+        try:
+            yield
+            outcome = "completed"
+        finally:
+            self.running -= 1
+            self._notify()
+            self._report(
+                task,
+                outcome,
+                waited_at - started_at,
+                time.monotonic() - waited_at,
+            )
+
+    def _notify(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def _report(self, task: str, outcome: str, waited: float, duration: float):
+        if self.on_complete is not None:
+            try:
+                self.on_complete(task, outcome, waited, duration)
+            except Exception as e:
+                log.debug(f"Failed to report the background task: {e}")
+
+
+CHAT_COMPLETION_ADMISSION = AdmissionController(
+    max_concurrency=CHAT_COMPLETION_MAX_CONCURRENCY,
+    max_concurrency_per_model=CHAT_COMPLETION_MAX_CONCURRENCY_PER_MODEL,
+    max_concurrency_per_user=CHAT_COMPLETION_MAX_CONCURRENCY_PER_USER,
+    queue_timeout=CHAT_COMPLETION_QUEUE_TIMEOUT,
+    max_queue_size=CHAT_COMPLETION_MAX_QUEUE_SIZE,
+)
+
+TASK_GENERATION_LANE = TaskLane(
+    CHAT_COMPLETION_ADMISSION,
+    max_concurrency=TASK_GENERATION_MAX_CONCURRENCY,
+    max_queue_size=TASK_GENERATION_MAX_QUEUE_SIZE,
+    queue_timeout=TASK_GENERATION_QUEUE_TIMEOUT,
+    defer_threshold=TASK_GENERATION_DEFER_THRESHOLD,
+)
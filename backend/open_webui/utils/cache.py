@@ -0,0 +1,277 @@
+import asyncio
+import functools
+import itertools
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from sqlalchemy import func
+
+from open_webui.env import (
+    REDIS_CLUSTER,
+    REDIS_KEY_PREFIX,
+    REDIS_SENTINEL_HOSTS,
+    REDIS_SENTINEL_PORT,
+    REDIS_URL,
+    SRC_LOG_LEVELS,
+)
+from open_webui.utils.redis import get_redis_connection, get_sentinels_from_env
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+INVALIDATION_CHANNEL = f"{REDIS_KEY_PREFIX}:cache:invalidate"
+
+_CACHES: dict[str, "LocalCache"] = {}
+
+_redis = None
+_redis_pubsub_thread = None
+_redis_lock = threading.Lock()
+
+
+def _get_redis():
+    global _redis, _redis_pubsub_thread
+
+    if not REDIS_URL or _redis_pubsub_thread is not None:
+        return _redis
+
+    with _redis_lock:
+        if _redis_pubsub_thread is not None:
+            return _redis
+
+        try:
+            _redis = get_redis_connection(
+                redis_url=REDIS_URL,
+                redis_sentinels=get_sentinels_from_env(
+                    REDIS_SENTINEL_HOSTS, REDIS_SENTINEL_PORT
+                ),
+                redis_cluster=REDIS_CLUSTER,
+                decode_responses=True,
+            )
+
+            pubsub = _redis.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{INVALIDATION_CHANNEL: _on_invalidate})
+            _redis_pubsub_thread = pubsub.run_in_thread(
+                sleep_time=1, daemon=True, exception_handler=_on_error
+            )
+        except Exception as e:
+            # Entries still expire after their TTL
+            log.warning(f"Cache invalidation across instances is unavailable: {e}")
+            _redis_pubsub_thread = False
+
+    return _redis
+
+
+def _is_shared() -> bool:
+    """Whether invalidations reach the other instances."""
+    return _get_redis() is not None and bool(_redis_pubsub_thread)
+
+
+def _on_invalidate(message):
+    try:
+        data = json.loads(message["data"])
+        cache = _CACHES.get(data["cache"])
+        if cache is not None:
+            cache.evict(data.get("key"))
+    except Exception as e:
+        log.debug(f"Invalid cache invalidation message {message}: {e}")
+
+
+def _on_error(e, pubsub, thread):
+    # Invalidations published while disconnected are lost, drop every entry
+    log.warning(f"Cache invalidation messages interrupted: {e}")
+    for cache in list(_CACHES.values()):
+        cache.evict()
+    time.sleep(1)
+
+
+class LocalCache:
+    """
+    Bounded in-process LRU cache with a TTL per entry. invalidate() also evicts the
+    entry in every other instance through Redis pub/sub when REDIS_URL is set, the
+    TTL bounds staleness otherwise. A ttl of 0 disables the cache.
+    """
+
+    def __init__(self, name: str, ttl: float, maxsize: int = 1024):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        _CACHES[name] = self
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        if self.ttl <= 0:
+            return default
+
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.ttl <= 0:
+            return
+
+        # Subscribe before the first entry is stored so no invalidation is missed
+        _get_redis()
+
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def evict(self, key: Optional[Hashable] = None) -> None:
+        """Remove key, or every entry, from this instance only."""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Remove key, or every entry, from the caches of all instances."""
+        self.evict(key)
+
+        if self.ttl <= 0:
+            return
+
+        redis = _get_redis()
+        if redis is not None:
+            try:
+                redis.publish(
+                    INVALIDATION_CHANNEL, json.dumps({"cache": self.name, "key": key})
+                )
+            except Exception as e:
+                log.warning(f"Failed to publish invalidation of {self.name}: {e}")
+
+
+class VersionStamp:
+    """
+    Version that changes whenever bump() is called on any instance, for caches of
+    data derived from several tables. Backed by a LocalCache, so it also changes
+    after ttl seconds in case an invalidation was lost, and on every get() when
+    ttl is 0.
+
+    bump() only reaches the other instances through Redis. Without it, the
+    fingerprint of the shared state (see get_table_fingerprint) is compared at
+    most once per second instead, and the version changes along with it. A None
+    fingerprint, while the state is changing, changes the version on every get().
+    """
+
+    _counter = itertools.count(1)
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float,
+        fingerprint: Optional[Callable[[], Optional[Hashable]]] = None,
+    ):
+        self._cache = LocalCache(name, ttl, maxsize=1)
+
+        self._fingerprint = fingerprint
+        self._last_fingerprint = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> int:
+        if self._fingerprint is not None and not _is_shared():
+            self._check_fingerprint()
+
+        version = self._cache.get("version")
+        if version is None:
+            version = next(self._counter)
+            self._cache.set("version", version)
+        return version
+
+    def bump(self) -> None:
+        self._cache.invalidate()
+
+    def _check_fingerprint(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._last_fingerprint is not None and now - self._checked_at < 1:
+                return
+
+            try:
+                fingerprint = self._fingerprint()
+            except Exception as e:
+                log.debug(f"Failed to get the fingerprint of {self._cache.name}: {e}")
+                return
+
+            if fingerprint is None or fingerprint != self._last_fingerprint:
+                self._cache.evict()
+            self._last_fingerprint = fingerprint
+            self._checked_at = now
+
+
+def get_table_fingerprint(db, model) -> Optional[tuple]:
+    """
+    Row count, latest and sum of the updated_at timestamps of the table of model,
+    which change with every insert, update and delete. None right after a change,
+    as another one in the same second may keep the same timestamps.
+    """
+    count, latest, total = (
+        db.query(func.count(), func.max(model.updated_at), func.sum(model.updated_at))
+        .select_from(model)
+        .one()
+    )
+
+    if latest is not None and latest >= time.time() - 2:
+        return None
+    return (count, latest, total)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: while a call is in flight, the
+    other callers with that key await its result (or exception) instead of
+    starting calls of their own. All callers get the same result object.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._calls.get(key)
+        if future is None or future.get_loop() is not asyncio.get_running_loop():
+            future = asyncio.ensure_future(fn())
+            self._calls[key] = future
+
+            def done(future):
+                if self._calls.get(key) is future:
+                    del self._calls[key]
+
+            future.add_done_callback(done)
+
+        # A cancelled caller does not cancel the call of the others
+        return await asyncio.shield(future)
+
+
+def single_flight(key: Callable[..., Hashable]):
+    """Decorator coalescing concurrent calls for which key(*args, **kwargs) is equal."""
+
+    def decorator(fn):
+        flight = SingleFlight()
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            return await flight.do(key(*args, **kwargs), lambda: fn(*args, **kwargs))
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from open_webui.models.chats import Chats
+from open_webui.env import (
+    SRC_LOG_LEVELS,
+    REALTIME_CHAT_SAVE_INTERVAL,
+    REALTIME_CHAT_SAVE_MAX_SIZE,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+
+class ChatMessageWriteBuffer:
+    """
+    Write-behind buffer for realtime saves of a single chat message.
+
+    Updates are merged in memory and written to the database at most once per
+    interval, or as soon as the content changed by max_size characters since the last
+    write. Pending updates are also written once the interval has passed without a new
+    update, e.g. while a tool runs or the upstream stalls. Call flush() on completion
+    or error to persist whatever is still buffered.
+
+    Writes stay on the caller's thread: the chat row is also updated by the event
+    emitter (status, sources, ...) and a concurrent read-modify-write would drop those.
+    """
+
+    def __init__(
+        self,
+        chat_id: str,
+        message_id: str,
+        interval: float = REALTIME_CHAT_SAVE_INTERVAL,
+        max_size: int = REALTIME_CHAT_SAVE_MAX_SIZE,
+    ):
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.interval = interval
+        self.max_size = max_size
+
+        self._pending: dict = {}
+        self._flushed_at = time.monotonic()
+        self._flushed_size = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def update(self, message: dict):
+        """Merge message fields into the buffer, writing it out when due."""
+        self._pending.update(message)
+
+        content = self._pending.get("content")
+        size = len(content) if isinstance(content, str) else self._flushed_size
+        if (
+            time.monotonic() - self._flushed_at >= self.interval
+            or abs(size - self._flushed_size) >= self.max_size
+        ):
+            self.flush()
+        else:
+            self._schedule()
+
+    def _schedule(self):
+        # Runs flush() on the caller's event loop, between its own writes
+        if self._timer is not None or not self._pending:
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+
+        delay = max(0.0, self._flushed_at + self.interval - time.monotonic())
+        self._timer = loop.call_later(delay, self.flush)
+
+    def flush(self):
+        """Write buffered updates to the database."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        if not self._pending:
+            return
+
+        message, self._pending = self._pending, {}
+        self._flushed_at = time.monotonic()
+        if isinstance(message.get("content"), str):
+            self._flushed_size = len(message["content"])
+
+        try:
+            Chats.upsert_message_to_chat_by_id_and_message_id(
+                self.chat_id, self.message_id, message
+            )
+        except Exception as e:
+            log.exception(f"Error saving message {self.message_id}: {e}")
+            # Keep the update for the next write, newer fields win
+            self._pending = {**message, **self._pending}
+            self._schedule()
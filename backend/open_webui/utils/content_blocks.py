@@ -0,0 +1,410 @@
+import html
+import json
+import logging
+import re
+import time
+
+from open_webui.env import SRC_LOG_LEVELS
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+
+def split_content_and_whitespace(content):
+    content_stripped = content.rstrip()
+    original_whitespace = (
+        content[len(content_stripped) :] if len(content) > len(content_stripped) else ""
+    )
+    return content_stripped, original_whitespace
+
+
+def is_opening_code_block(content):
+    backtick_segments = content.split("```")
+    # Even number of segments means the last backticks are opening a new block
+    return len(backtick_segments) > 1 and len(backtick_segments) % 2 == 0
+
+
+def serialize_content_block(content: str, block: dict, raw: bool = False) -> str:
+    """
+    Append the rendering of a single content block to the already serialized content.
+    Blocks are rendered left to right, so a block may adjust the content before it
+    (e.g. dangling code fences before a code interpreter block).
+    """
+    if block["type"] == "text":
+        block_content = block["content"].strip()
+        if block_content:
+            content = f"{content}{block_content}\n"
+    elif block["type"] == "tool_calls":
+        tool_calls = block.get("content", [])
+        results = block.get("results", [])
+
+        if content and not content.endswith("\n"):
+            content += "\n"
+
+        if results:
+
+            tool_calls_display_content = ""
+            for tool_call in tool_calls:
+
+                tool_call_id = tool_call.get("id", "")
+                tool_name = tool_call.get("function", {}).get("name", "")
+                tool_arguments = tool_call.get("function", {}).get("arguments", "")
+
+                tool_result = None
+                tool_result_files = None
+                for result in results:
+                    if tool_call_id == result.get("tool_call_id", ""):
+                        tool_result = result.get("content", None)
+                        tool_result_files = result.get("files", None)
+                        break
+
+                if tool_result is not None:
+                    tool_result_embeds = result.get("embeds", "")
+                    tool_calls_display_content = f'{tool_calls_display_content}<details type="tool_calls" done="true" id="{tool_call_id}" name="{tool_name}" arguments="{html.escape(json.dumps(tool_arguments))}" result="{html.escape(json.dumps(tool_result, ensure_ascii=False))}" files="{html.escape(json.dumps(tool_result_files)) if tool_result_files else ""}" embeds="{html.escape(json.dumps(tool_result_embeds))}">\n<summary>Tool Executed</summary>\n</details>\n'
+                else:
+                    tool_calls_display_content = f'{tool_calls_display_content}<details type="tool_calls" done="false" id="{tool_call_id}" name="{tool_name}" arguments="{html.escape(json.dumps(tool_arguments))}">\n<summary>Executing...</summary>\n</details>\n'
+
+            if not raw:
+                content = f"{content}{tool_calls_display_content}"
+        else:
+            tool_calls_display_content = ""
+
+            for tool_call in tool_calls:
+                tool_call_id = tool_call.get("id", "")
+                tool_name = tool_call.get("function", {}).get("name", "")
+                tool_arguments = tool_call.get("function", {}).get("arguments", "")
+
+                tool_calls_display_content = f'{tool_calls_display_content}\n<details type="tool_calls" done="false" id="{tool_call_id}" name="{tool_name}" arguments="{html.escape(json.dumps(tool_arguments))}">\n<summary>Executing...</summary>\n</details>\n'
+
+            if not raw:
+                content = f"{content}{tool_calls_display_content}"
+
+    elif block["type"] == "reasoning":
+        reasoning_display_content = "\n".join(
+            (f"> {line}" if not line.startswith(">") else line)
+            for line in block["content"].splitlines()
+        )
+
+        reasoning_duration = block.get("duration", None)
+
+        start_tag = block.get("start_tag", "")
+        end_tag = block.get("end_tag", "")
+
+        if content and not content.endswith("\n"):
+            content += "\n"
+
+        if reasoning_duration is not None:
+            if raw:
+                content = f'{content}{start_tag}{block["content"]}{end_tag}\n'
+            else:
+                content = f'{content}<details type="reasoning" done="true" duration="{reasoning_duration}">\n<summary>Thought for {reasoning_duration} seconds</summary>\n{reasoning_display_content}\n</details>\n'
+        else:
+            if raw:
+                content = f'{content}{start_tag}{block["content"]}{end_tag}\n'
+            else:
+                content = f'{content}<details type="reasoning" done="false">\n<summary>Thinking…</summary>\n{reasoning_display_content}\n</details>\n'
+
+    elif block["type"] == "code_interpreter":
+        attributes = block.get("attributes", {})
+        output = block.get("output", None)
+        lang = attributes.get("lang", "")
+
+        content_stripped, original_whitespace = split_content_and_whitespace(content)
+        if is_opening_code_block(content_stripped):
+            # Remove trailing backticks that would open a new block
+            content = content_stripped.rstrip("`").rstrip() + original_whitespace
+        else:
+            # Keep content as is - either closing backticks or no backticks
+            content = content_stripped + original_whitespace
+
+        if content and not content.endswith("\n"):
+            content += "\n"
+
+        if output:
+            output = html.escape(json.dumps(output))
+
+            if raw:
+                content = f'{content}<code_interpreter type="code" lang="{lang}">\n{block["content"]}\n</code_interpreter>\n```output\n{output}\n```\n'
+            else:
+                content = f'{content}<details type="code_interpreter" done="true" output="{output}">\n<summary>Analyzed</summary>\n```{lang}\n{block["content"]}\n```\n</details>\n'
+        else:
+            if raw:
+                content = f'{content}<code_interpreter type="code" lang="{lang}">\n{block["content"]}\n</code_interpreter>\n'
+            else:
+                content = f'{content}<details type="code_interpreter" done="false">\n<summary>Analyzing...</summary>\n```{lang}\n{block["content"]}\n```\n</details>\n'
+
+    else:
+        block_content = str(block["content"]).strip()
+        if block_content:
+            content = f"{content}{block['type']}: {block_content}\n"
+
+    return content
+
+
+def serialize_content_blocks(content_blocks: list[dict], raw: bool = False) -> str:
+    content = ""
+    for block in content_blocks:
+        content = serialize_content_block(content, block, raw)
+    return content.strip()
+
+
+class ContentBlocksSerializer:
+    """
+    Incremental serializer for the content blocks of a streaming response.
+
+    Every block but the last one is considered finished: its rendering is cached as
+    part of a prefix, and only the last (still open) block is rendered on each call.
+    The cached prefix is dropped as soon as a finished block is replaced, removed or
+    its content reassigned (e.g. text held back by ContentTagParser released into it),
+    so callers may keep mutating the block list the way the stream handler does.
+    """
+
+    def __init__(self, raw: bool = False):
+        self.raw = raw
+        # Finished blocks rendered into the prefix, with their content at the time
+        self._blocks: list[tuple[dict, object]] = []
+        self._prefix = ""
+
+    def reset(self):
+        self._blocks = []
+        self._prefix = ""
+
+    def _sync_prefix(self, finished_blocks: list[dict]):
+        # Keep the longest cached run of blocks that are still in place
+        matched = 0
+        for (cached, content), block in zip(self._blocks, finished_blocks):
+            if cached is not block or content is not block.get("content"):
+                break
+            matched += 1
+
+        if matched < len(self._blocks):
+            # A finished block changed, render the prefix again from scratch
+            self._blocks = []
+            self._prefix = ""
+            matched = 0
+
+        for block in finished_blocks[matched:]:
+            self._prefix = serialize_content_block(self._prefix, block, self.raw)
+            self._blocks.append((block, block.get("content")))
+
+    def serialize(self, content_blocks: list[dict]) -> str:
+        if not content_blocks:
+            self.reset()
+            return ""
+
+        self._sync_prefix(content_blocks[:-1])
+        return serialize_content_block(
+            self._prefix, content_blocks[-1], self.raw
+        ).strip()
+
+
+def extract_tag_attributes(tag_content: str) -> dict:
+    """Extract attributes from a tag if they exist."""
+    attributes = {}
+    if not tag_content:
+        return attributes
+    # Match attributes in the format: key="value" (ignores single quotes for simplicity)
+    for key, value in re.findall(r'(\w+)\s*=\s*"([^"]+)"', tag_content):
+        attributes[key] = value
+    return attributes
+
+
+class ContentTagParser:
+    """
+    Incremental tokenizer that splits streamed text into content blocks on tags such as
+    <think>...</think>.
+
+    Only newly appended text is scanned. A tail that may still turn into a tag (e.g. "<thi"
+    at the end of a chunk) is held back until the next chunk arrives or the stream is
+    flushed, so tags split across chunk boundaries are still detected.
+    """
+
+    # Longest tag (including attributes) that is held back while waiting for its end
+    MAX_TAG_LENGTH = 256
+
+    def __init__(self, tags: list[tuple[str, list[tuple[str, str]]]]):
+        """
+        :param tags: List of (content_type, [(start_tag, end_tag), ...]) to detect.
+        """
+        self.tags = [
+            (content_type, start_tag, end_tag)
+            for content_type, tag_pairs in tags
+            for start_tag, end_tag in tag_pairs
+        ]
+        self.content_types = {content_type for content_type, _, _ in self.tags}
+        # Jump straight to characters that can open a tag instead of checking every one
+        self._start_pattern = re.compile(
+            "|".join(sorted({re.escape(start_tag[0]) for _, start_tag, _ in self.tags}))
+            or "(?!)"
+        )
+
+        self._pending = ""
+        self._pending_block = None
+
+    def _match_start_tag(self, text: str, index: int, start_tag: str, final: bool):
+        """
+        Match start_tag at text[index:], returns (end_index, attributes), "partial" when
+        more text is needed to decide, or None.
+        """
+        if not (start_tag.startswith("<") and start_tag.endswith(">")):
+            if text.startswith(start_tag, index):
+                return index + len(start_tag), {}
+            if not final and start_tag.startswith(text[index:]):
+                return "partial"
+            return None
+
+        # Match <tag> or <tag attr="value">
+        name = start_tag[:-1]
+        if not text.startswith(name, index):
+            if not final and name.startswith(text[index:]):
+                return "partial"
+            return None
+
+        attributes_start = index + len(name)
+        if attributes_start == len(text):
+            return None if final else "partial"
+
+        next_char = text[attributes_start]
+        if next_char == ">":
+            return attributes_start + 1, {}
+        if not next_char.isspace():
+            return None
+
+        tag_end = text.find(">", attributes_start)
+        newline = text.find("\n", attributes_start + 1)
+        if tag_end == -1:
+            if final or newline != -1 or len(text) - index > self.MAX_TAG_LENGTH:
+                return None
+            return "partial"
+        if newline != -1 and newline < tag_end:
+            return None
+
+        return tag_end + 1, extract_tag_attributes(text[attributes_start:tag_end])
+
+    def _find_start_tag(self, text: str, final: bool):
+        for candidate in self._start_pattern.finditer(text):
+            index = candidate.start()
+            for content_type, start_tag, end_tag in self.tags:
+                match = self._match_start_tag(text, index, start_tag, final)
+                if match == "partial":
+                    return index, None
+                if match is not None:
+                    end_index, attributes = match
+                    return index, (
+                        end_index,
+                        content_type,
+                        start_tag,
+                        end_tag,
+                        attributes,
+                    )
+        return None
+
+    def _release_pending(self, content_blocks: list[dict]) -> str:
+        pending, block = self._pending, self._pending_block
+        self._pending, self._pending_block = "", None
+
+        if pending and block is not None and block is not content_blocks[-1]:
+            # The block was closed from outside the parser, the held text belongs to it
+            block["content"] += pending
+            return ""
+        return pending
+
+    def _hold(self, text: str, index: int, block: dict):
+        block["content"] += text[:index]
+        self._pending = text[index:]
+        self._pending_block = block
+
+    def _parse(self, text: str, content_blocks: list[dict], final: bool) -> bool:
+        end_flag = False
+
+        while text:
+            block = content_blocks[-1]
+
+            if block["type"] == "text":
+                match = self._find_start_tag(text, final)
+                if match is None:
+                    block["content"] += text
+                    break
+
+                index, tag = match
+                if tag is None:
+                    self._hold(text, index, block)
+                    break
+
+                end_index, content_type, start_tag, end_tag, attributes = tag
+                block["content"] += text[:index]
+                if not block["content"]:
+                    content_blocks.pop()
+
+                content_blocks.append(
+                    {
+                        "type": content_type,
+                        "start_tag": start_tag,
+                        "end_tag": end_tag,
+                        "attributes": attributes,
+                        "content": "",
+                        "started_at": time.time(),
+                    }
+                )
+                text = text[end_index:]
+
+            elif (
+                block["type"] in self.content_types
+                and block.get("end_tag")
+                and "ended_at" not in block
+            ):
+                end_tag = block["end_tag"]
+                index = text.find(end_tag)
+                if index == -1:
+                    hold = len(text)
+                    if not final:
+                        for size in range(min(len(end_tag) - 1, len(text)), 0, -1):
+                            if text.endswith(end_tag[:size]):
+                                hold = len(text) - size
+                                break
+                    self._hold(text, hold, block)
+                    break
+
+                block["content"] = (block["content"] + text[:index]).strip()
+                text = text[index + len(end_tag) :]
+
+                if block["type"] == "code_interpreter":
+                    end_flag = True
+
+                if block["content"]:
+                    block["ended_at"] = time.time()
+                    block["duration"] = int(block["ended_at"] - block["started_at"])
+
+                    if block["type"] == "code_interpreter":
+                        break
+                else:
+                    # Remove the block if content is empty
+                    content_blocks.pop()
+
+                content_blocks.append({"type": "text", "content": ""})
+                if end_flag:
+                    break
+
+            else:
+                block["content"] += text
+                break
+
+        return end_flag
+
+    def feed(self, value: str, content_blocks: list[dict]) -> bool:
+        """
+        Append a streamed chunk to content_blocks, opening and closing blocks on tags.
+        Returns True when a code interpreter block has been closed.
+        """
+        if not content_blocks:
+            content_blocks.append({"type": "text", "content": ""})
+
+        text = self._release_pending(content_blocks) + value
+        return self._parse(text, content_blocks, final=False)
+
+    def flush(self, content_blocks: list[dict]) -> bool:
+        """Write any held back text to content_blocks at the end of a stream."""
+        text = self._release_pending(content_blocks)
+        if not text:
+            return False
+        return self._parse(text, content_blocks, final=True)
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import threading
+from http.cookiejar import DefaultCookiePolicy
+from typing import Optional
+from urllib.parse import urlparse
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+from open_webui.env import (
+    AIOHTTP_CLIENT_DNS_CACHE_TTL,
+    AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT,
+    AIOHTTP_CLIENT_POOL_SIZE,
+    AIOHTTP_CLIENT_TIMEOUT,
+    SRC_LOG_LEVELS,
+)
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MAIN"])
+
+
+def get_base_url(url: str) -> str:
+    parsed_url = urlparse(url)
+    return f"{parsed_url.scheme}://{parsed_url.netloc}"
+
+
+class HTTPSessions:
+    """
+    Client sessions shared by all requests to the same upstream connection, so
+    their connections are kept alive and reused instead of being opened (and, with
+    TLS, negotiated) again for every completion. Sessions never store cookies, as
+    they are shared between users; cookies are passed with each request instead.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 0,
+        keepalive_timeout: float = 30.0,
+        dns_cache_ttl: int = 300,
+        timeout: Optional[float] = None,
+    ):
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.timeout = timeout
+
+        # Sessions are bound to the event loop they were created in, so threads
+        # running their own loop get sessions of their own
+        self._sessions: dict[
+            tuple[asyncio.AbstractEventLoop, str], aiohttp.ClientSession
+        ] = {}
+        self._sync_sessions: dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> aiohttp.ClientSession:
+        """Pooled session for the upstream connection of url."""
+        key = (asyncio.get_running_loop(), get_base_url(url))
+
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None or session.closed:
+                # Sessions of loops that have been closed can't be used anymore
+                for closed_key in [k for k in self._sessions if k[0].is_closed()]:
+                    del self._sessions[closed_key]
+
+                session = aiohttp.ClientSession(
+                    connector=aiohttp.TCPConnector(
+                        limit=self.pool_size,
+                        keepalive_timeout=self.keepalive_timeout,
+                        ttl_dns_cache=self.dns_cache_ttl,
+                    ),
+                    cookie_jar=aiohttp.DummyCookieJar(),
+                    timeout=aiohttp.ClientTimeout(total=self.timeout),
+                    trust_env=True,
+                )
+                self._sessions[key] = session
+            return session
+
+    def get_sync(self, url: str) -> requests.Session:
+        """Pooled session for blocking requests, e.g. from worker threads."""
+        base_url = get_base_url(url)
+
+        with self._lock:
+            session = self._sync_sessions.get(base_url)
+            if session is None:
+                session = requests.Session()
+                session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+
+                adapter = HTTPAdapter(pool_maxsize=self.pool_size or 100)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+
+                self._sync_sessions[base_url] = session
+            return session
+
+    async def close(self):
+        """
+        Close all sessions, waiting for the connections of the sessions of the
+        current event loop to be released.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            sessions, self._sessions = self._sessions, {}
+            sync_sessions, self._sync_sessions = self._sync_sessions, {}
+
+        for (session_loop, _), session in sessions.items():
+            try:
+                if session_loop is loop:
+                    await session.close()
+                elif session_loop.is_running():
+                    asyncio.run_coroutine_threadsafe(session.close(), session_loop)
+            except Exception as e:
+                log.debug(f"Failed to close the HTTP session: {e}")
+
+        for session in sync_sessions.values():
+            session.close()
+
+
+HTTP_SESSIONS = HTTPSessions(
+    pool_size=AIOHTTP_CLIENT_POOL_SIZE,
+    keepalive_timeout=AIOHTTP_CLIENT_KEEPALIVE_TIMEOUT,
+    dns_cache_ttl=AIOHTTP_CLIENT_DNS_CACHE_TTL,
+    timeout=AIOHTTP_CLIENT_TIMEOUT,
+)
@@ -0,0 +1,262 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Optional
+
+from open_webui.env import (
+    MODELS_RESIDENCY_MAX_OUTSTANDING,
+    MODELS_RESIDENCY_TTL,
+    MODELS_ROUTING_COOLDOWN,
+    MODELS_ROUTING_FAILURE_THRESHOLD,
+    MODELS_ROUTING_STRATEGY,
+    SRC_LOG_LEVELS,
+)
+from open_webui.utils.http_sessions import get_base_url
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MODELS"])
+
+
+class ConnectionStats:
+    def __init__(self, url: str):
+        self.url = url
+
+        # Requests sent and not finished yet
+        self.outstanding = 0
+        # Exponentially weighted moving average of the seconds until the response
+        # headers arrive, None until the first response
+        self.latency: Optional[float] = None
+
+        self.failures = 0
+        self.open_until = 0.0
+
+    def is_available(self) -> bool:
+        return time.monotonic() >= self.open_until
+
+
+class RequestTracker:
+    """Outcome of one request to a connection, see LoadBalancer.track()."""
+
+    def __init__(self, balancer: "LoadBalancer", stats: ConnectionStats):
+        self.balancer = balancer
+        self.stats = stats
+        self.started_at = time.monotonic()
+        self.status: Optional[int] = None
+        self.finished = False
+
+        stats.outstanding += 1
+
+    def respond(self, status: int):
+        """Record the arrival of the response headers."""
+        if self.status is None:
+            self.status = status
+            self.balancer._record_latency(
+                self.stats, time.monotonic() - self.started_at
+            )
+
+    def finish(self):
+        """Record the end of the request, failed unless a response was received."""
+        if self.finished:
+            return
+        self.finished = True
+
+        self.stats.outstanding -= 1
+        self.balancer._record_outcome(
+            self.stats,
+            failed=self.status is None or self.status >= 500 or self.status == 429,
+        )
+
+
+class LoadBalancer:
+    """
+    Distributes the requests for a model between the connections serving it.
+
+    Connections are identified by their base URL, so an Ollama server added both as
+    an Ollama and an OpenAI connection shares its load. Health is tracked passively
+    from the requests sent: after failure_threshold consecutive failures (connection
+    errors, 5xx or 429 responses) a connection is taken out of rotation for cooldown
+    seconds, after which a single failure takes it out again. When every candidate
+    is out of rotation they are all used, the request may still succeed.
+
+    Preferred connections (having the model loaded) are only used while they have
+    fewer than preferred_max_outstanding requests in flight, the other connections
+    take the overflow.
+    """
+
+    ALPHA = 0.3
+
+    def __init__(
+        self,
+        strategy: str = "least_outstanding",
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+        preferred_max_outstanding: int = 0,
+    ):
+        self.strategy = strategy
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.preferred_max_outstanding = preferred_max_outstanding
+
+        self._stats: dict[str, ConnectionStats] = {}
+        # Current weights of the smooth weighted round-robin per candidate set
+        self._round_robin: dict[tuple, dict[str, float]] = {}
+
+    def get_stats(self, url: str) -> ConnectionStats:
+        key = get_base_url(url)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = ConnectionStats(key)
+            self._stats[key] = stats
+        return stats
+
+    def select(
+        self,
+        urls: list[str],
+        weights: Optional[list[float]] = None,
+        preferred: Optional[list[bool]] = None,
+    ) -> int:
+        """
+        Index of the url to send the next request to, among the preferred urls if
+        any of them is available and not saturated, among the others otherwise.
+        """
+        if len(urls) == 1:
+            return 0
+
+        weights = [max(weight, 0.0) for weight in (weights or [1.0] * len(urls))]
+        candidates = [
+            idx
+            for idx, url in enumerate(urls)
+            if weights[idx] > 0 and self.get_stats(url).is_available()
+        ]
+        if not candidates:
+            candidates = [idx for idx in range(len(urls)) if weights[idx] > 0] or list(
+                range(len(urls))
+            )
+            weights = [weight or 1.0 for weight in weights]
+
+        if preferred:
+
+            def saturated(idx: int) -> bool:
+                return (
+                    self.preferred_max_outstanding > 0
+                    and self.get_stats(urls[idx]).outstanding
+                    >= self.preferred_max_outstanding
+                )
+
+            candidates = (
+                [idx for idx in candidates if preferred[idx] and not saturated(idx)]
+                or [idx for idx in candidates if not preferred[idx]]
+                or candidates
+            )
+
+        if self.strategy == "random":
+            return random.choices(
+                candidates, weights=[weights[idx] for idx in candidates]
+            )[0]
+
+        if self.strategy == "round_robin":
+            return self._select_round_robin(urls, weights, candidates)
+
+        def load(idx: int) -> float:
+            stats = self.get_stats(urls[idx])
+            if self.strategy == "latency":
+                # Unmeasured connections are tried first
+                return (stats.latency or 0.0) * (stats.outstanding + 1) / weights[idx]
+            return stats.outstanding / weights[idx]
+
+        lowest = min(load(idx) for idx in candidates)
+        return random.choice([idx for idx in candidates if load(idx) == lowest])
+
+    def _select_round_robin(
+        self, urls: list[str], weights: list[float], candidates: list[int]
+    ) -> int:
+        # Smooth weighted round-robin, spreads the picks of heavier connections
+        current = self._round_robin.setdefault(tuple(urls), {})
+
+        total = 0.0
+        for idx in candidates:
+            current[urls[idx]] = current.get(urls[idx], 0.0) + weights[idx]
+            total += weights[idx]
+
+        selected = max(candidates, key=lambda idx: current[urls[idx]])
+        current[urls[selected]] -= total
+        return selected
+
+    def track(self, url: str) -> RequestTracker:
+        """Start tracking a request, finish() must be called once it is done."""
+        return RequestTracker(self, self.get_stats(url))
+
+    def _record_latency(self, stats: ConnectionStats, latency: float):
+        if stats.latency is None:
+            stats.latency = latency
+        else:
+            stats.latency = self.ALPHA * latency + (1 - self.ALPHA) * stats.latency
+
+    def _record_outcome(self, stats: ConnectionStats, failed: bool):
+        if not failed:
+            stats.failures = 0
+            return
+
+        stats.failures += 1
+        if self.failure_threshold > 0 and stats.failures >= self.failure_threshold:
+            stats.open_until = time.monotonic() + self.cooldown
+            log.warning(
+                f"{stats.url} failed {stats.failures} times in a row, "
+                f"taken out of rotation for {self.cooldown}s"
+            )
+
+
+class ModelResidency:
+    """
+    Connections a model was recently routed to. The model stays loaded there for a
+    while (Ollama's keep_alive), so they are preferred for the next requests even
+    before the loaded models reported by the connection are refreshed.
+    """
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+
+        self._loaded: dict[tuple[str, str], float] = {}
+        self._warming: dict[tuple[str, str], asyncio.Task] = {}
+
+    def add(self, url: str, model: str):
+        self._loaded[(get_base_url(url), model)] = time.monotonic() + self.ttl
+
+    def contains(self, url: str, model: str) -> bool:
+        key = (get_base_url(url), model)
+
+        expires_at = self._loaded.get(key)
+        if expires_at is None:
+            return False
+        if time.monotonic() >= expires_at:
+            del self._loaded[key]
+            return False
+        return True
+
+    def warm(self, url: str, model: str, load: Callable[[], Awaitable[bool]]):
+        """Load the model on the connection in the background, once at a time."""
+        key = (get_base_url(url), model)
+        if key in self._warming:
+            return
+
+        async def run():
+            try:
+                if await load():
+                    self.add(url, model)
+            except Exception as e:
+                log.debug(f"Failed to pre-warm {model} on {url}: {e}")
+            finally:
+                del self._warming[key]
+
+        self._warming[key] = asyncio.create_task(run())
+
+
+LOAD_BALANCER = LoadBalancer(
+    strategy=MODELS_ROUTING_STRATEGY,
+    failure_threshold=MODELS_ROUTING_FAILURE_THRESHOLD,
+    cooldown=MODELS_ROUTING_COOLDOWN,
+    preferred_max_outstanding=MODELS_RESIDENCY_MAX_OUTSTANDING,
+)
+
+MODEL_RESIDENCY = ModelResidency(ttl=MODELS_RESIDENCY_TTL)
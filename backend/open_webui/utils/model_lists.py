@@ -0,0 +1,206 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from open_webui.env import (
+    MODELS_REFRESH_INTERVAL,
+    MODELS_REFRESH_MAX_BACKOFF,
+    REDIS_KEY_PREFIX,
+    SRC_LOG_LEVELS,
+)
+from open_webui.utils.cache import LocalCache
+
+log = logging.getLogger(__name__)
+log.setLevel(SRC_LOG_LEVELS["MODELS"])
+
+
+class ModelListEntry:
+    def __init__(self, fetch: Callable[[], Awaitable[Any]]):
+        self.fetch = fetch
+
+        # JSON of the last good response and when it was fetched (epoch seconds)
+        self.value: Optional[str] = None
+        self.fetched_at = 0.0
+
+        self.failures = 0
+        self.retry_at = 0.0
+        self.accessed_at = time.monotonic()
+        self.task: Optional[asyncio.Task] = None
+
+
+class ModelListCache:
+    """
+    Last good response of each model list endpoint of the connections. A list older
+    than interval is refreshed in the background while readers are served the
+    previous one (stale-while-revalidate), so slow or dead connections only delay
+    the very first read. Failing connections are retried with exponential backoff.
+
+    With Redis, fetched lists are shared and only one instance refreshes each list
+    per interval, the others pick up its result.
+
+    invalidate() drops a list that is known to have changed, e.g. after a model is
+    pulled, so the next read waits for a fresh one instead of serving the old list.
+    """
+
+    def __init__(self, interval: float, max_backoff: float):
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.redis = None
+
+        self._entries: dict[str, ModelListEntry] = {}
+
+        # Marks the lists that are still valid, invalidate() evicts the marker on
+        # every instance. Kept for as long as run() keeps an unused entry.
+        self._valid = LocalCache("model_lists", max(interval * 10, max_backoff))
+
+    def _get_key(self, url: str, api_key: Optional[str]) -> str:
+        return hashlib.sha256(f"{url}\n{api_key or ''}".encode()).hexdigest()
+
+    def _get_redis_key(self, key: str) -> str:
+        return f"{REDIS_KEY_PREFIX}:model_lists:{key}"
+
+    def _is_stale(self, entry: ModelListEntry) -> bool:
+        return time.time() - entry.fetched_at >= self.interval
+
+    def _is_backing_off(self, entry: ModelListEntry) -> bool:
+        return time.monotonic() < entry.retry_at
+
+    async def get(
+        self, url: str, api_key: Optional[str], fetch: Callable[[], Awaitable[Any]]
+    ) -> Optional[Any]:
+        """
+        Return the last good response of fetch() for the url and key, None if there
+        is none yet and the connection is failing.
+        """
+        if self.interval <= 0:
+            return await fetch()
+
+        key = self._get_key(url, api_key)
+
+        entry = self._entries.get(key)
+        if entry is None or (entry.value is not None and self._valid.get(key) is None):
+            # Unknown or invalidated, a refresh still running for the old entry
+            # is ignored
+            entry = ModelListEntry(fetch)
+            self._entries[key] = entry
+        elif entry.value is not None:
+            self._valid.set(key, True)
+
+        entry.fetch = fetch
+        entry.accessed_at = time.monotonic()
+
+        if entry.value is None:
+            # Nothing to serve yet, wait for the first fetch
+            if not self._is_backing_off(entry):
+                await asyncio.shield(self._schedule(key, entry, shared=False))
+        elif self._is_stale(entry) and not self._is_backing_off(entry):
+            self._schedule(key, entry)
+
+        return json.loads(entry.value) if entry.value is not None else None
+
+    def _schedule(
+        self, key: str, entry: ModelListEntry, shared: bool = True
+    ) -> asyncio.Task:
+        if entry.task is None or entry.task.done():
+            entry.task = asyncio.create_task(self._refresh(key, entry, shared))
+        return entry.task
+
+    async def _refresh(self, key: str, entry: ModelListEntry, shared: bool = True):
+        redis_key = self._get_redis_key(key)
+
+        if self.redis is not None and shared:
+            try:
+                # Another instance may have refreshed the list already
+                item = await self.redis.get(redis_key)
+                if item:
+                    item = json.loads(item)
+                    if item["fetched_at"] > entry.fetched_at:
+                        entry.value = item["value"]
+                        entry.fetched_at = item["fetched_at"]
+                        if not self._is_stale(entry):
+                            return
+
+                # Only one instance refreshes each list per interval
+                if not await self.redis.set(
+                    f"{redis_key}:lock", 1, nx=True, ex=max(1, int(self.interval))
+                ):
+                    return
+            except Exception as e:
+                log.debug(f"Failed to read the shared model list: {e}")
+
+        # A list invalidated while it is fetched may get the old response
+        was_valid = entry.value is not None and self._valid.get(key) is not None
+
+        try:
+            response = await entry.fetch()
+        except Exception as e:
+            log.debug(f"Failed to fetch the model list: {e}")
+            response = None
+
+        if response is None or (isinstance(response, dict) and "error" in response):
+            entry.failures += 1
+            entry.retry_at = time.monotonic() + min(
+                self.max_backoff, self.interval * 2 ** (entry.failures - 1)
+            )
+            return
+
+        if self._entries.get(key) is not entry or (
+            was_valid and self._valid.get(key) is None
+        ):
+            return
+
+        entry.failures = 0
+        entry.retry_at = 0.0
+        entry.value = json.dumps(response)
+        entry.fetched_at = time.time()
+        self._valid.set(key, True)
+
+        if self.redis is not None:
+            try:
+                await self.redis.set(
+                    redis_key,
+                    json.dumps({"fetched_at": entry.fetched_at, "value": entry.value}),
+                    ex=int(max(self.interval, self.max_backoff) * 2),
+                )
+            except Exception as e:
+                log.debug(f"Failed to share the model list: {e}")
+
+    async def invalidate(
+        self, url: Optional[str] = None, api_key: Optional[str] = None
+    ):
+        """
+        Drop the list of the url and key on every instance, or every list when no
+        url is given. The next read fetches it again.
+        """
+        if url is None:
+            keys = list(self._entries)
+            self._valid.invalidate()
+        else:
+            keys = [self._get_key(url, api_key)]
+            self._valid.invalidate(keys[0])
+
+        if self.redis is not None and keys:
+            try:
+                await self.redis.delete(*[self._get_redis_key(key) for key in keys])
+            except Exception as e:
+                log.debug(f"Failed to drop the shared model list: {e}")
+
+    async def run(self):
+        """Refresh the lists that are still read in the background."""
+        while True:
+            await asyncio.sleep(max(1.0, self.interval / 2))
+
+            for key, entry in list(self._entries.items()):
+                # Stop polling connections that were removed or are no longer used
+                if time.monotonic() - entry.accessed_at > max(
+                    self.interval * 10, self.max_backoff
+                ):
+                    del self._entries[key]
+                elif self._is_stale(entry) and not self._is_backing_off(entry):
+                    self._schedule(key, entry)
+
+
+MODEL_LISTS = ModelListCache(MODELS_REFRESH_INTERVAL, MODELS_REFRESH_MAX_BACKOFF)
@@ -18,7 +18,7 @@ from open_webui.utils.plugin import (
     load_function_module_by_id,
     get_function_module_from_cache,
 )
-from open_webui.utils.access_control import has_access
+from open_webui.utils.access_control import get_group_access, has_access
 
 
 from open_webui.config import (
@@ -78,23 +78,65 @@ async def get_all_base_models(request: Request, user: UserModel = None):
 
 
 async def get_all_models(request, refresh: bool = False, user: UserModel = None):
+    functions_version = Functions.version.get()
+
     if (
         request.app.state.MODELS
         and request.app.state.BASE_MODELS
         and (request.app.state.config.ENABLE_BASE_MODELS_CACHE and not refresh)
     ):
         base_models = request.app.state.BASE_MODELS
+
+        if request.app.state.BASE_MODELS_FUNCTIONS_VERSION != functions_version:
+            # Only the models of pipe functions need to be reloaded
+            base_models = await get_function_models(request) + [
+                model for model in base_models if "pipe" not in model
+            ]
+            request.app.state.BASE_MODELS = base_models
+            request.app.state.BASE_MODELS_FUNCTIONS_VERSION = functions_version
     else:
         base_models = await get_all_base_models(request, user=user)
         request.app.state.BASE_MODELS = base_models
-
-    # deep copy the base models to avoid modifying the original list
-    models = [model.copy() for model in base_models]
+        request.app.state.BASE_MODELS_FUNCTIONS_VERSION = functions_version
 
     # If there are no models, return an empty list
-    if len(models) == 0:
+    if len(base_models) == 0:
         return []
 
+    # The registry is only rebuilt when its inputs changed
+    registry_key = (
+        Models.version.get(),
+        functions_version,
+        request.app.state.config.ENABLE_EVALUATION_ARENA_MODELS,
+        request.app.state.config.EVALUATION_ARENA_MODELS,
+    )
+
+    registry = request.app.state.MODELS_REGISTRY
+    if (
+        registry is not None
+        and registry["base_models"] is base_models
+        and registry["key"] == registry_key
+    ):
+        return list(registry["models"])
+
+    models = build_models(request, base_models)
+
+    log.debug(f"get_all_models() returned {len(models)} models")
+
+    request.app.state.MODELS = {model["id"]: model for model in models}
+    request.app.state.MODELS_REGISTRY = {
+        "base_models": base_models,
+        "key": registry_key,
+        "models": models,
+        "version": (registry["version"] + 1) if registry else 1,
+    }
+    return list(models)
+
+
+def build_models(request, base_models: list[dict]) -> list[dict]:
+    # copy the base models to avoid modifying the original list
+    models = [model.copy() for model in base_models]
+
     # Add arena models
     if request.app.state.config.ENABLE_EVALUATION_ARENA_MODELS:
         arena_models = []
@@ -130,57 +172,66 @@ async def get_all_models(request, refresh: bool = False, user: UserModel = None)
             ]
         models = models + arena_models
 
-    global_action_ids = [
-        function.id for function in Functions.get_global_action_functions()
-    ]
-    enabled_action_ids = [
-        function.id
+    action_functions = {
+        function.id: function
         for function in Functions.get_functions_by_type("action", active_only=True)
-    ]
+    }
+    filter_functions = {
+        function.id: function
+        for function in Functions.get_functions_by_type("filter", active_only=True)
+    }
 
-    global_filter_ids = [
-        function.id for function in Functions.get_global_filter_functions()
+    global_action_ids = [
+        function.id for function in action_functions.values() if function.is_global
     ]
-    enabled_filter_ids = [
-        function.id
-        for function in Functions.get_functions_by_type("filter", active_only=True)
+    global_filter_ids = [
+        function.id for function in filter_functions.values() if function.is_global
     ]
 
+    # Index the models by id and by id without the tag, Ollama may return model ids
+    # in different formats (e.g., 'llama3' vs. 'llama3:7b')
+    models_by_id = {}
+    models_by_name = {}
+    positions = {}
+    removed = set()
+
+    def add_to_index(model):
+        positions[id(model)] = len(positions)
+        models_by_id.setdefault(model["id"], []).append(model)
+        models_by_name.setdefault(model["id"].split(":")[0], []).append(model)
+
+    def find_models(model_id, by_name=lambda model: True):
+        found = {
+            id(model): model
+            for model in models_by_id.get(model_id, [])
+            + [model for model in models_by_name.get(model_id, []) if by_name(model)]
+            if id(model) not in removed
+        }
+        return sorted(found.values(), key=lambda model: positions[id(model)])
+
+    for model in models:
+        add_to_index(model)
+
     custom_models = Models.get_all_models()
     for custom_model in custom_models:
         if custom_model.base_model_id is None:
             # Applied directly to a base model
-            for model in models:
-                if custom_model.id == model["id"] or (
-                    model.get("owned_by") == "ollama"
-                    and custom_model.id
-                    == model["id"].split(":")[
-                        0
-                    ]  # Ollama may return model ids in different formats (e.g., 'llama3' vs. 'llama3:7b')
-                ):
-                    if custom_model.is_active:
-                        model["name"] = custom_model.name
-                        model["info"] = custom_model.model_dump()
-
-                        # Set action_ids and filter_ids
-                        action_ids = []
-                        filter_ids = []
-
-                        if "info" in model and "meta" in model["info"]:
-                            action_ids.extend(
-                                model["info"]["meta"].get("actionIds", [])
-                            )
-                            filter_ids.extend(
-                                model["info"]["meta"].get("filterIds", [])
-                            )
-
-                        model["action_ids"] = action_ids
-                        model["filter_ids"] = filter_ids
-                    else:
-                        models.remove(model)
-
-        elif custom_model.is_active and (
-            custom_model.id not in [model["id"] for model in models]
+            for model in find_models(
+                custom_model.id, lambda model: model.get("owned_by") == "ollama"
+            ):
+                if custom_model.is_active:
+                    model["name"] = custom_model.name
+                    model["info"] = custom_model.model_dump()
+
+                    # Set action_ids and filter_ids
+                    meta = model["info"].get("meta", {})
+                    model["action_ids"] = list(meta.get("actionIds", []))
+                    model["filter_ids"] = list(meta.get("filterIds", []))
+                else:
+                    removed.add(id(model))
+
+        elif custom_model.is_active and not any(
+            id(model) not in removed for model in models_by_id.get(custom_model.id, [])
         ):
             owned_by = "openai"
             pipe = None
@@ -188,15 +239,11 @@ async def get_all_models(request, refresh: bool = False, user: UserModel = None)
             action_ids = []
             filter_ids = []
 
-            for model in models:
-                if (
-                    custom_model.base_model_id == model["id"]
-                    or custom_model.base_model_id == model["id"].split(":")[0]
-                ):
-                    owned_by = model.get("owned_by", "unknown owner")
-                    if "pipe" in model:
-                        pipe = model["pipe"]
-                    break
+            base_models = find_models(custom_model.base_model_id)
+            if base_models:
+                owned_by = base_models[0].get("owned_by", "unknown owner")
+                if "pipe" in base_models[0]:
+                    pipe = base_models[0]["pipe"]
 
             if custom_model.meta:
                 meta = custom_model.meta.model_dump()
@@ -207,20 +254,23 @@ async def get_all_models(request, refresh: bool = False, user: UserModel = None)
                 if "filterIds" in meta:
                     filter_ids.extend(meta["filterIds"])
 
-            models.append(
-                {
-                    "id": f"{custom_model.id}",
-                    "name": custom_model.name,
-                    "object": "model",
-                    "created": custom_model.created_at,
-                    "owned_by": owned_by,
-                    "info": custom_model.model_dump(),
-                    "preset": True,
-                    **({"pipe": pipe} if pipe is not None else {}),
-                    "action_ids": action_ids,
-                    "filter_ids": filter_ids,
-                }
-            )
+            model = {
+                "id": f"{custom_model.id}",
+                "name": custom_model.name,
+                "object": "model",
+                "created": custom_model.created_at,
+                "owned_by": owned_by,
+                "info": custom_model.model_dump(),
+                "preset": True,
+                **({"pipe": pipe} if pipe is not None else {}),
+                "action_ids": action_ids,
+                "filter_ids": filter_ids,
+            }
+            models.append(model)
+            add_to_index(model)
+
+    if removed:
+        models = [model for model in models if id(model) not in removed]
 
     # Process action_ids to get the actions
     def get_action_items_from_module(function, module):
@@ -255,6 +305,9 @@ async def get_all_models(request, refresh: bool = False, user: UserModel = None)
 
     # Process filter_ids to get the filters
     def get_filter_items_from_module(function, module):
+        if not getattr(module, "toggle", None):
+            return []
+
         return [
             {
                 "id": function.id,
@@ -267,49 +320,43 @@ async def get_all_models(request, refresh: bool = False, user: UserModel = None)
             }
         ]
 
-    def get_function_module_by_id(function_id):
-        function_module, _, _ = get_function_module_from_cache(request, function_id)
-        return function_module
+    # Items of each function, modules are only loaded once per function
+    function_items = {}
+
+    def get_function_items(function, get_items):
+        if function.id not in function_items:
+            function_module, _, _ = get_function_module_from_cache(request, function.id)
+            function_items[function.id] = get_items(function, function_module)
+        return function_items[function.id]
 
     for model in models:
         action_ids = [
             action_id
             for action_id in list(set(model.pop("action_ids", []) + global_action_ids))
-            if action_id in enabled_action_ids
+            if action_id in action_functions
         ]
         filter_ids = [
             filter_id
             for filter_id in list(set(model.pop("filter_ids", []) + global_filter_ids))
-            if filter_id in enabled_filter_ids
+            if filter_id in filter_functions
         ]
 
         model["actions"] = []
         for action_id in action_ids:
-            action_function = Functions.get_function_by_id(action_id)
-            if action_function is None:
-                raise Exception(f"Action not found: {action_id}")
-
-            function_module = get_function_module_by_id(action_id)
             model["actions"].extend(
-                get_action_items_from_module(action_function, function_module)
+                get_function_items(
+                    action_functions[action_id], get_action_items_from_module
+                )
             )
 
         model["filters"] = []
         for filter_id in filter_ids:
-            filter_function = Functions.get_function_by_id(filter_id)
-            if filter_function is None:
-                raise Exception(f"Filter not found: {filter_id}")
-
-            function_module = get_function_module_by_id(filter_id)
-
-            if getattr(function_module, "toggle", None):
-                model["filters"].extend(
-                    get_filter_items_from_module(filter_function, function_module)
+            model["filters"].extend(
+                get_function_items(
+                    filter_functions[filter_id], get_filter_items_from_module
                 )
+            )
 
-    log.debug(f"get_all_models() returned {len(models)} models")
-
-    request.app.state.MODELS = {model["id"]: model for model in models}
     return models
 
 
@@ -342,6 +389,10 @@ def get_filtered_models(models, user):
         user.role == "user"
         or (user.role == "admin" and not BYPASS_ADMIN_ACCESS_CONTROL)
     ) and not BYPASS_MODEL_ACCESS_CONTROL:
+        readable_model_ids = Models.get_readable_model_ids(
+            user.id, get_group_access(user.id).group_ids
+        )
+
         filtered_models = []
         for model in models:
             if model.get("arena"):
@@ -355,18 +406,8 @@ def get_filtered_models(models, user):
                     filtered_models.append(model)
                 continue
 
-            model_info = Models.get_model_by_id(model["id"])
-            if model_info:
-                if (
-                    (user.role == "admin" and BYPASS_ADMIN_ACCESS_CONTROL)
-                    or user.id == model_info.user_id
-                    or has_access(
-                        user.id,
-                        type="read",
-                        access_control=model_info.access_control,
-                    )
-                ):
-                    filtered_models.append(model)
+            if model["id"] in readable_model_ids:
+                filtered_models.append(model)
 
         return filtered_models
     else:
@@ -66,6 +66,7 @@ from open_webui.env import (
     OAUTH_CLIENT_INFO_ENCRYPTION_KEY,
 )
 from open_webui.utils.misc import parse_duration
+from open_webui.utils.cache import single_flight
 from open_webui.utils.auth import get_password_hash, create_token
 from open_webui.utils.webhook import post_webhook
 
@@ -224,6 +225,16 @@ def get_discovery_urls(server_url) -> list[str]:
     return urls
 
 
+@single_flight(key=lambda url: url)
+async def get_server_metadata(url: str) -> Optional[dict]:
+    """OpenID configuration of the server, None if it could not be fetched."""
+    async with aiohttp.ClientSession(trust_env=True) as session_http:
+        async with session_http.get(url) as r:
+            if r.status == 200:
+                return await r.json()
+    return None
+
+
 # TODO: Some OAuth providers require Initial Access Tokens (IATs) for dynamic client registration.
 # This is not currently supported.
 async def get_oauth_client_info_with_dynamic_client_registration(
@@ -490,17 +501,15 @@ class OAuthClientManager:
                 return None
 
             token_endpoint = None
-            async with aiohttp.ClientSession(trust_env=True) as session_http:
-                async with session_http.get(
-                    self.get_server_metadata_url(client_id)
-                ) as r:
-                    if r.status == 200:
-                        openid_data = await r.json()
-                        token_endpoint = openid_data.get("token_endpoint")
-                    else:
-                        log.error(
-                            f"Failed to fetch OpenID configuration for client_id {client_id}"
-                        )
+            openid_data = await get_server_metadata(
+                self.get_server_metadata_url(client_id)
+            )
+            if openid_data:
+                token_endpoint = openid_data.get("token_endpoint")
+            else:
+                log.error(
+                    f"Failed to fetch OpenID configuration for client_id {client_id}"
+                )
             if not token_endpoint:
                 log.error(f"No token endpoint found for client_id {client_id}")
                 return None
@@ -766,15 +775,13 @@ class OAuthManager:
 
             server_metadata_url = self.get_server_metadata_url(provider)
             token_endpoint = None
-            async with aiohttp.ClientSession(trust_env=True) as session_http:
-                async with session_http.get(server_metadata_url) as r:
-                    if r.status == 200:
-                        openid_data = await r.json()
-                        token_endpoint = openid_data.get("token_endpoint")
-                    else:
-                        log.error(
-                            f"Failed to fetch OpenID configuration for provider {provider}"
-                        )
+            openid_data = await get_server_metadata(server_metadata_url)
+            if openid_data:
+                token_endpoint = openid_data.get("token_endpoint")
+            else:
+                log.error(
+                    f"Failed to fetch OpenID configuration for provider {provider}"
+                )
             if not token_endpoint:
                 log.error(f"No token endpoint found for provider {provider}")
                 return None
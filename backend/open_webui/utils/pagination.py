@@ -0,0 +1,105 @@
+import base64
+import json
+from typing import Any, Optional
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import and_, or_
+
+from open_webui.constants import ERROR_MESSAGES
+
+# Response header carrying the cursor of the next page, set when the page is full
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(value: Any, id: str) -> str:
+    """Encode the sort key and id of the last row of a page into an opaque token."""
+    payload = json.dumps([value, id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[Any, str]:
+    """Decode a token created by encode_cursor, raising ValueError if it is invalid."""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, id = json.loads(payload)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+    if not isinstance(id, str) or isinstance(value, (dict, list)):
+        raise ValueError("Invalid cursor")
+    return value, id
+
+
+def check_cursor_value(value: Any, column) -> None:
+    """Raise ValueError unless value can be compared with the column in SQL."""
+    try:
+        python_type = column.type.python_type
+    except (AttributeError, NotImplementedError):
+        return
+
+    # bool is an int, but not a valid timestamp
+    if isinstance(value, bool) and python_type is not bool:
+        raise ValueError("Invalid cursor")
+    if not isinstance(value, python_type):
+        raise ValueError("Invalid cursor")
+
+
+def parse_cursor(cursor: Optional[str], column=None) -> Optional[tuple[Any, str]]:
+    """
+    Decode the cursor query parameter of a listing endpoint sorted by column,
+    rejecting cursors whose value does not match the type of the column.
+    """
+    if not cursor:
+        return None
+
+    try:
+        value, id = decode_cursor(cursor)
+        if column is not None:
+            check_cursor_value(value, column)
+        return value, id
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=ERROR_MESSAGES.INVALID_CURSOR,
+        )
+
+
+def apply_keyset_pagination(
+    query,
+    column,
+    id_column,
+    cursor: Optional[tuple[Any, str]] = None,
+    descending: bool = True,
+):
+    """
+    Order the query by (column, id_column) and, given the (value, id) of the last
+    row of the previous page, only keep the rows after it. Unlike offset(), the
+    cost of a page does not grow with its depth when (column, id_column) is indexed.
+    """
+    if descending:
+        query = query.order_by(column.desc(), id_column.desc())
+    else:
+        query = query.order_by(column.asc(), id_column.asc())
+
+    if cursor is not None:
+        value, id = cursor
+        if descending:
+            query = query.filter(
+                or_(column < value, and_(column == value, id_column < id))
+            )
+        else:
+            query = query.filter(
+                or_(column > value, and_(column == value, id_column > id))
+            )
+    return query
+
+
+def set_next_cursor(
+    response: Response, items: list, limit: Optional[int], key: str
+) -> None:
+    """Expose the cursor of the page following items when the page is full."""
+    if limit and len(items) >= limit and hasattr(items[-1], key):
+        last = items[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            getattr(last, key), last.id
+        )
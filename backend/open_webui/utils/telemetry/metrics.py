@@ -8,8 +8,11 @@ Metrics collected:
 
 * http.server.requests (counter)
 * http.server.duration (histogram, milliseconds)
+* webui.tasks.queued, webui.tasks.running (gauges)
+* webui.tasks.wait, webui.tasks.duration (histograms, milliseconds)
 
-Attributes used: http.method, http.route, http.status_code
+Attributes used: http.method, http.route, http.status_code, and task, outcome for
+the generations of background tasks (title, tags, follow-ups...)
 
 If you wish to add more attributes (e.g. user-agent) you can, but beware of
 high-cardinality label sets.
@@ -47,6 +50,7 @@ from open_webui.env import (
 )
 from open_webui.socket.main import get_active_user_ids
 from open_webui.models.users import Users
+from open_webui.utils.admission import TASK_GENERATION_LANE
 
 _EXPORT_INTERVAL_MILLIS = 10_000  # 10 seconds
 
@@ -99,6 +103,20 @@ def _build_meter_provider(resource: Resource) -> MeterProvider:
         View(
             instrument_name="webui.users.active",
         ),
+        View(
+            instrument_name="webui.tasks.queued",
+        ),
+        View(
+            instrument_name="webui.tasks.running",
+        ),
+        View(
+            instrument_name="webui.tasks.wait",
+            attribute_keys=["task", "outcome"],
+        ),
+        View(
+            instrument_name="webui.tasks.duration",
+            attribute_keys=["task", "outcome"],
+        ),
     ]
 
     provider = MeterProvider(
@@ -159,6 +177,50 @@ def setup_metrics(app: FastAPI, resource: Resource) -> None:
         callbacks=[observe_active_users],
     )
 
+    # Lane of the background task generations
+    task_wait_histogram = meter.create_histogram(
+        name="webui.tasks.wait",
+        description="Time background task generations waited in their lane",
+        unit="ms",
+    )
+    task_duration_histogram = meter.create_histogram(
+        name="webui.tasks.duration",
+        description="Background task generation duration",
+        unit="ms",
+    )
+
+    def record_task(task: str, outcome: str, waited: float, duration: float):
+        attrs = {"task": task, "outcome": outcome}
+        task_wait_histogram.record(waited * 1000.0, attrs)
+        if outcome != "dropped":
+            task_duration_histogram.record(duration * 1000.0, attrs)
+
+    TASK_GENERATION_LANE.on_complete = record_task
+
+    def observe_queued_tasks(
+        options: metrics.CallbackOptions,
+    ) -> Sequence[metrics.Observation]:
+        return [metrics.Observation(value=TASK_GENERATION_LANE.waiting)]
+
+    def observe_running_tasks(
+        options: metrics.CallbackOptions,
+    ) -> Sequence[metrics.Observation]:
+        return [metrics.Observation(value=TASK_GENERATION_LANE.running)]
+
+    meter.create_observable_gauge(
+        name="webui.tasks.queued",
+        description="Background task generations waiting in their lane",
+        unit="1",
+        callbacks=[observe_queued_tasks],
+    )
+
+    meter.create_observable_gauge(
+        name="webui.tasks.running",
+        description="Background task generations running",
+        unit="1",
+        callbacks=[observe_running_tasks],
+    )
+
     # FastAPI middleware
     @app.middleware("http")
     async def _metrics_middleware(request: Request, call_next):
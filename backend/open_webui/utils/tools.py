@@ -37,6 +37,7 @@ from langchain_core.utils.function_calling import (
 from open_webui.models.tools import Tools
 from open_webui.models.users import UserModel
 from open_webui.utils.plugin import load_tool_module_by_id
+from open_webui.utils.cache import single_flight
 from open_webui.env import (
     SRC_LOG_LEVELS,
     AIOHTTP_CLIENT_TIMEOUT,
@@ -516,6 +517,11 @@ def convert_openapi_to_tool_payload(openapi_spec):
     return tool_payload
 
 
+@single_flight(
+    key=lambda request: json.dumps(
+        request.app.state.config.TOOL_SERVER_CONNECTIONS, sort_keys=True
+    )
+)
 async def set_tool_servers(request: Request):
     request.app.state.TOOL_SERVERS = await get_tool_servers_data(
         request.app.state.config.TOOL_SERVER_CONNECTIONS